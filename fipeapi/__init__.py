@@ -26,71 +26,101 @@ from .__version__ import (
     __copyright__
 )
 from .api import FipeAPI, CARRO, MOTO, CAMINHAO, GASOLINA, DIESEL, ALCOOL
-from .exceptions import ValueNotFoundException, IncorrectValueException, IncorrectSettingsException
-from typing import List, Dict, Optional
+from .exceptions import ValueNotFoundException, IncorrectValueException, IncorrectSettingsException, CacheException
+from .exceptions import (RequestFailedException, RequestTimeoutException, RequestThrottledException,
+                         ServerErrorException)
+from .cliente import pega_cliente_padrao, define_cliente_padrao, configura_cliente_padrao
+from .consulta import Consulta
+from .assincrono import AsyncFipeAPI, CacheAssincrono, CacheMemoriaAssincrono, CacheRedisAssincrono
+from .lote import EspecificacaoVeiculo, ResultadoLote
+from .limitador import LimitadorTaxa, LimitadorTaxaRedis
+from .politica import PoliticaCache
+from .memoria import CacheMemoria, CacheLRU
+from .backends import BackendCache, BackendMemoria, BackendRedis, BackendRedisAgrupado, BackendSQLite
+from .codec import Codec
+from .crawler import Crawler, ResumoColeta
+from .snapshot import Snapshot
+from .sincronizacao import Delta, sincroniza
+from .historico import HistoricoPrecos
+from .analise import MatrizPrecos
+from .referencias import IndiceReferencias
+from .busca import IndiceBusca, ResultadoBusca
+from .registros import Marca, Modelo, AnoModelo, Preco
+from .requisicao import PoliticaRequisicao
+from typing import List, Dict, Optional, Iterable, Iterator
 
 
 __all__ = ['FipeAPI', 'CARRO', 'MOTO', 'CAMINHAO', 'GASOLINA', 'DIESEL', 'ALCOOL', 'ValueNotFoundException',
            'IncorrectSettingsException', 'IncorrectValueException', 'pega_marcas', 'pega_modelos', 'pega_anos_modelo',
-           'consulta_preco_veiculo']
+           'consulta_preco_veiculo', 'pega_cliente_padrao', 'define_cliente_padrao', 'configura_cliente_padrao',
+           'Consulta', 'AsyncFipeAPI', 'CacheAssincrono', 'CacheMemoriaAssincrono', 'CacheRedisAssincrono',
+           'EspecificacaoVeiculo', 'ResultadoLote', 'consulta_precos_em_lote', 'LimitadorTaxa', 'LimitadorTaxaRedis',
+           'PoliticaCache', 'CacheMemoria', 'CacheLRU', 'BackendCache', 'BackendMemoria', 'BackendRedis',
+           'BackendRedisAgrupado', 'BackendSQLite', 'CacheException', 'Codec', 'Crawler', 'ResumoColeta',
+           'Snapshot', 'Delta', 'sincroniza', 'HistoricoPrecos', 'historico_precos',
+           'MatrizPrecos', 'IndiceReferencias', 'IndiceBusca', 'ResultadoBusca', 'consulta_por_codigo_fipe',
+           'consulta_preco_por_codigo_fipe', 'Marca', 'Modelo', 'AnoModelo', 'Preco', 'PoliticaRequisicao',
+           'RequestFailedException', 'RequestTimeoutException', 'RequestThrottledException', 'ServerErrorException']
 
 
 def pega_marcas(tipo_veiculo: Optional[int] = CARRO,
                 mes_referencia: Optional[int] = None,
-                ano_referencia: Optional[int] = None) -> List:
+                ano_referencia: Optional[int] = None,
+                cliente: Optional[FipeAPI] = None) -> List:
     r""" Requisita todas as marcas de acordo com o tipo de veículo de acordo com o mês/ano da tabela de referência
     de preços da FIPE.
     :param tipo_veiculo: informa o tipo de veículo que pode ser "carro", "moto" ou "caminhao".
     :param mes_referencia: informa o mês da tabela de referência
     :param ano_referencia: informa o ano da tabela de referência
+    :param cliente: instância de FipeAPI a ser utilizada. Por padrão, utiliza o cliente compartilhado do processo
     :return: retorna a lista com as marcas
     :rtype: list
     """
-    fipe_api = FipeAPI()
-    fipe_api.seleciona_tipo_veiculo(tipo_veiculo=tipo_veiculo)
-    fipe_api.seleciona_referencia(mes=mes_referencia, ano=ano_referencia)
-    return fipe_api.pega_marcas()
+    fipe_api = cliente or pega_cliente_padrao()
+    consulta = fipe_api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes_referencia, ano=ano_referencia)
+    return fipe_api.pega_marcas(consulta)
 
 
 def pega_modelos(marca: str,
                  tipo_veiculo: Optional[int] = CARRO,
                  mes_referencia: Optional[int] = None,
-                 ano_referencia: Optional[int] = None) -> List:
+                 ano_referencia: Optional[int] = None,
+                 cliente: Optional[FipeAPI] = None) -> List:
     r""" Requisita todas os modelos de acordo com o tipo de veículo, o mês/ano da tabela de referência e a marca.
     :param marca: nome da marca.
     :param tipo_veiculo: informa o tipo de veículo que pode ser "carro", "moto" ou "caminhao".
     :param mes_referencia: informa o mês da tabela de referência (numérico)
     :param ano_referencia: informa o ano da tabela de referência (numérico com 4 dígitos)
+    :param cliente: instância de FipeAPI a ser utilizada. Por padrão, utiliza o cliente compartilhado do processo
     :return: retorna a lista com as marcas
     :rtype: list
     """
-    fipe_api = FipeAPI()
-    fipe_api.seleciona_tipo_veiculo(tipo_veiculo=tipo_veiculo)
-    fipe_api.seleciona_referencia(mes=mes_referencia, ano=ano_referencia)
-    fipe_api.seleciona_marca(marca=marca)
-    return fipe_api.pega_modelos()
+    fipe_api = cliente or pega_cliente_padrao()
+    consulta = fipe_api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes_referencia, ano=ano_referencia,
+                                      marca=marca)
+    return fipe_api.pega_modelos(consulta)
 
 
 def pega_anos_modelo(marca: str,
                      modelo: str,
                      tipo_veiculo: Optional[int] = CARRO,
                      mes_referencia: Optional[int] = None,
-                     ano_referencia: Optional[int] = None) -> List:
+                     ano_referencia: Optional[int] = None,
+                     cliente: Optional[FipeAPI] = None) -> List:
     r""" Requisita todas os modelos de acordo com o tipo de veículo, o mês/ano da tabela de referência e a marca.
     :param marca: nome da marca.
     :param modelo: nome do modelo
     :param tipo_veiculo: informa o tipo de veículo que pode ser "CARRO", "MOTO" ou "CAMINHAO".
     :param mes_referencia: informa o mês da tabela de referência (numérico)
     :param ano_referencia: informa o ano da tabela de referência (numérico com 4 dígitos)
+    :param cliente: instância de FipeAPI a ser utilizada. Por padrão, utiliza o cliente compartilhado do processo
     :return: retorna a lista com as marcas
     :rtype: list
     """
-    fipe_api = FipeAPI()
-    fipe_api.seleciona_tipo_veiculo(tipo_veiculo=tipo_veiculo)
-    fipe_api.seleciona_referencia(mes=mes_referencia, ano=ano_referencia)
-    fipe_api.seleciona_marca(marca=marca)
-    fipe_api.seleciona_modelo(modelo=modelo)
-    return fipe_api.pega_anos_modelo()
+    fipe_api = cliente or pega_cliente_padrao()
+    consulta = fipe_api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes_referencia, ano=ano_referencia,
+                                      marca=marca, modelo=modelo)
+    return fipe_api.pega_anos_modelo(consulta)
 
 
 def consulta_preco_veiculo(marca: str,
@@ -99,7 +129,8 @@ def consulta_preco_veiculo(marca: str,
                            combustivel: Optional[int] = GASOLINA,
                            tipo_veiculo: Optional[int] = CARRO,
                            mes_referencia: Optional[int] = None,
-                           ano_referencia: Optional[int] = None) -> Dict:
+                           ano_referencia: Optional[int] = None,
+                           cliente: Optional[FipeAPI] = None) -> Dict:
     r""" Requisita todas os modelos de acordo com o tipo de veículo, o mês/ano da tabela de referência e a marca.
     :param marca: nome da marca.
     :param modelo: nome do modelo
@@ -108,12 +139,96 @@ def consulta_preco_veiculo(marca: str,
     :param tipo_veiculo: informa o tipo de veículo que pode ser "CARRO", "MOTO" ou "CAMINHAO".
     :param mes_referencia: informa o mês da tabela de referência (numérico)
     :param ano_referencia: informa o ano da tabela de referência (numérico com 4 dígitos)
+    :param cliente: instância de FipeAPI a ser utilizada. Por padrão, utiliza o cliente compartilhado do processo
     :return: retorna um dicionário com as informações do veículo
     :rtype: dict
     """
-    fipe_api = FipeAPI()
-    fipe_api.seleciona_tipo_veiculo(tipo_veiculo=tipo_veiculo)
-    fipe_api.seleciona_referencia(mes=mes_referencia, ano=ano_referencia)
-    fipe_api.seleciona_marca(marca=marca)
-    fipe_api.seleciona_modelo(modelo=modelo)
-    return fipe_api.consulta_preco_veiculo(ano=ano_do_modelo, combustivel=combustivel)
+    fipe_api = cliente or pega_cliente_padrao()
+    consulta = fipe_api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes_referencia, ano=ano_referencia,
+                                      marca=marca, modelo=modelo)
+    return fipe_api.consulta_preco_veiculo(ano=ano_do_modelo, combustivel=combustivel, consulta=consulta)
+
+
+def consulta_preco_por_codigo_fipe(codigo_fipe: str,
+                                   ano_do_modelo: int,
+                                   combustivel: Optional[int] = GASOLINA,
+                                   tipo_veiculo: Optional[int] = CARRO,
+                                   mes_referencia: Optional[int] = None,
+                                   ano_referencia: Optional[int] = None,
+                                   cliente: Optional[FipeAPI] = None) -> Dict:
+    r""" Consulta o preço do veículo pelo Código FIPE, com uma única requisição à FIPE.
+    :param codigo_fipe: Código FIPE do veículo (por exemplo, "004381-8")
+    :param ano_do_modelo: Ano do modelo
+    :param combustivel: Combustível do veículo que pode ser "GASOLINA", "ALCOOL" ou "DIESEL".
+    :param tipo_veiculo: informa o tipo de veículo que pode ser "CARRO", "MOTO" ou "CAMINHAO".
+    :param mes_referencia: informa o mês da tabela de referência (numérico)
+    :param ano_referencia: informa o ano da tabela de referência (numérico com 4 dígitos)
+    :param cliente: instância de FipeAPI a ser utilizada. Por padrão, utiliza o cliente compartilhado do processo
+    :return: retorna um dicionário com as informações do veículo
+    :rtype: dict
+    """
+    fipe_api = cliente or pega_cliente_padrao()
+    consulta = fipe_api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes_referencia, ano=ano_referencia)
+    return fipe_api.consulta_preco_por_codigo_fipe(codigo_fipe, ano=ano_do_modelo, combustivel=combustivel,
+                                                   consulta=consulta)
+
+
+def consulta_precos_em_lote(especificacoes: Iterable[EspecificacaoVeiculo],
+                            max_workers: Optional[int] = 8,
+                            cliente: Optional[FipeAPI] = None) -> Iterator[ResultadoLote]:
+    r""" Consulta o preço de vários veículos de uma vez, buscando cada lista de marcas/modelos/anos uma única vez e
+    consultando os preços em paralelo.
+    :param especificacoes: lista de EspecificacaoVeiculo (ou dicionários/tuplas com os mesmos campos)
+    :param max_workers: número máximo de requisições simultâneas
+    :param cliente: instância de FipeAPI a ser utilizada. Por padrão, utiliza o cliente compartilhado do processo
+    :return: gerador com um ResultadoLote por especificação, na mesma ordem
+    :rtype: Iterator[ResultadoLote]
+    """
+    fipe_api = cliente or pega_cliente_padrao()
+    return fipe_api.consulta_precos_em_lote(especificacoes, max_workers=max_workers)
+
+
+def historico_precos(marca: str,
+                     modelo: str,
+                     ano_do_modelo: int,
+                     mes_inicial: int,
+                     ano_inicial: int,
+                     mes_final: Optional[int] = None,
+                     ano_final: Optional[int] = None,
+                     combustivel: Optional[int] = GASOLINA,
+                     tipo_veiculo: Optional[int] = CARRO,
+                     cliente: Optional[FipeAPI] = None) -> HistoricoPrecos:
+    r""" Consulta o preço de um veículo em cada mês de referência do mês inicial ao final, em paralelo.
+    :param marca: nome da marca.
+    :param modelo: nome do modelo
+    :param ano_do_modelo: Ano do modelo
+    :param mes_inicial: mês inicial (numérico)
+    :param ano_inicial: ano inicial (numérico com 4 dígitos)
+    :param mes_final: mês final (numérico). Por padrão, o mês inicial
+    :param ano_final: ano final (numérico com 4 dígitos). Por padrão, o ano inicial
+    :param combustivel: Combustível do veículo que pode ser "GASOLINA", "ALCOOL" ou "DIESEL".
+    :param tipo_veiculo: informa o tipo de veículo que pode ser "CARRO", "MOTO" ou "CAMINHAO".
+    :param cliente: instância de FipeAPI a ser utilizada. Por padrão, utiliza o cliente compartilhado do processo
+    :return: arrays NumPy alinhados com os meses (datas), os códigos de referência e os preços em reais
+    :rtype: HistoricoPrecos
+    """
+    fipe_api = cliente or pega_cliente_padrao()
+    return fipe_api.historico_precos(marca=marca, modelo=modelo, ano=ano_do_modelo, combustivel=combustivel,
+                                     tipo_veiculo=tipo_veiculo, mes_inicial=mes_inicial, ano_inicial=ano_inicial,
+                                     mes_final=mes_final, ano_final=ano_final)
+
+
+def consulta_por_codigo_fipe(codigo_fipe: str,
+                             mes_referencia: Optional[int] = None,
+                             ano_referencia: Optional[int] = None,
+                             cliente: Optional[FipeAPI] = None) -> Dict:
+    r""" Consulta os preços de um Código FIPE já consultado, sem localizar marca, modelo e ano.
+    :param codigo_fipe: Código FIPE do veículo
+    :param mes_referencia: mês de referência (numérico)
+    :param ano_referencia: ano de referência (numérico com 4 dígitos)
+    :param cliente: instância de FipeAPI a ser utilizada. Por padrão, utiliza o cliente compartilhado do processo
+    :return: códigos do veículo e os preços de cada ano/modelo e combustível no mês
+    :rtype: dict
+    """
+    fipe_api = cliente or pega_cliente_padrao()
+    return fipe_api.consulta_por_codigo_fipe(codigo_fipe, mes=mes_referencia, ano=ano_referencia)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.analise
+~~~~~~~~~~~~~~~~
+Análises vetorizadas (NumPy) dos preços coletados. Os preços de um ou mais meses, lidos do snapshot ou dos registros
+do Crawler, são organizados em uma matriz veículos x meses de referência, sobre a qual são calculadas a variação
+percentual, as médias e os índices de preço por tipo de veículo, marca ou modelo e as curvas de depreciação por
+ano/modelo, sem laços em Python por preço.
+"""
+from typing import Dict, Iterable, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from .exceptions import IncorrectValueException
+
+
+ZERO_KM = 32000
+
+# Colunas que identificam os grupos de cada agregação
+_AGRUPAMENTOS = {
+    'tipo_veiculo': ('tipo_veiculo',),
+    'marca': ('tipo_veiculo', 'marca'),
+    'modelo': ('tipo_veiculo', 'marca', 'modelo'),
+}
+
+
+def valores_em_reais(valores: Sequence[str]) -> np.ndarray:
+    """ Converte os valores retornados pela FIPE ("R$ 12.345,00") em reais (float64), sem laço por valor
+
+    >>> valores_em_reais(['R$ 12.345,67', 'R$ 900,00']).tolist()
+    [12345.67, 900.0]
+    """
+    texto = np.char.strip(np.asarray(valores, dtype=str))
+    texto = np.char.replace(np.char.replace(np.char.replace(texto, 'R$', ''), '.', ''), ',', '.')
+    return np.char.strip(texto).astype(np.float64)
+
+
+def _chave_veiculo(tipo_veiculo: np.ndarray, marca: np.ndarray, modelo: np.ndarray, ano: np.ndarray,
+                   combustivel: np.ndarray) -> np.ndarray:
+    """ Chave int64 de cada veículo (tipo, marca, modelo, ano/modelo e combustível) """
+    ano = np.where(ano == ZERO_KM, 255, np.clip(ano.astype(np.int64) - 1900, 0, 254))
+    chave = (tipo_veiculo.astype(np.int64) << 20 | marca.astype(np.int64)) << 24 | modelo.astype(np.int64)
+    return (chave << 8 | ano) << 3 | combustivel.astype(np.int64)
+
+
+class Agregado(NamedTuple):
+    """
+    Resultado de uma agregação por grupo.
+
+    Atributes:
+    ---------
+    grupos : numpy.ndarray
+        Códigos de cada grupo, uma linha por grupo (tipo de veículo, marca e modelo, conforme a agregação)
+    referencias : numpy.ndarray
+        Códigos das referências (colunas de valores)
+    valores : numpy.ndarray
+        Valores de cada grupo (linhas) em cada referência (colunas). NaN quando o grupo não possui preços no mês
+    """
+
+    grupos: np.ndarray
+    referencias: np.ndarray
+    valores: np.ndarray
+
+
+class MatrizPrecos:
+    """
+    Preços organizados em uma matriz veículos x meses de referência.
+
+    Atributes:
+    ---------
+    referencias : numpy.ndarray
+        Códigos das referências, em ordem crescente (colunas de precos)
+    tipo_veiculo, marca, modelo, ano, combustivel : numpy.ndarray
+        Códigos de cada veículo (linhas de precos)
+    precos : numpy.ndarray
+        Preços em reais. NaN quando o veículo não possui preço na referência
+    """
+
+    def __init__(self,
+                 referencia: Sequence[int],
+                 tipo_veiculo: Sequence[int],
+                 marca: Sequence[int],
+                 modelo: Sequence[int],
+                 ano: Sequence[int],
+                 combustivel: Sequence[int],
+                 preco: Sequence[float]):
+        colunas = {'tipo_veiculo': tipo_veiculo, 'marca': marca, 'modelo': modelo, 'ano': ano,
+                   'combustivel': combustivel}
+        colunas = {nome: np.asarray(valores, dtype=np.int64) for nome, valores in colunas.items()}
+        self.referencias, coluna = np.unique(np.asarray(referencia, dtype=np.int32), return_inverse=True)
+        _, primeiros, linha = np.unique(_chave_veiculo(**colunas), return_index=True, return_inverse=True)
+
+        self.tipo_veiculo = colunas['tipo_veiculo'][primeiros].astype(np.int32)
+        self.marca = colunas['marca'][primeiros].astype(np.int32)
+        self.modelo = colunas['modelo'][primeiros].astype(np.int32)
+        self.ano = colunas['ano'][primeiros].astype(np.int32)
+        self.combustivel = colunas['combustivel'][primeiros].astype(np.int32)
+        self.precos = np.full((len(primeiros), len(self.referencias)), np.nan)
+        self.precos[linha.ravel(), coluna.ravel()] = np.asarray(preco, dtype=np.float64)
+
+    @classmethod
+    def do_snapshot(cls, snapshot, referencias: Iterable[int] = None) -> 'MatrizPrecos':
+        """ Carrega os preços de um Snapshot. Sem as referências, carrega todos os meses do snapshot """
+        colunas = snapshot.colunas_precos()
+        if referencias is not None:
+            filtro = np.isin(colunas['referencia'], np.fromiter(referencias, dtype=np.int32))
+            colunas = {nome: valores[filtro] for nome, valores in colunas.items()}
+        return cls(preco=colunas.pop('centavos') / 100, **colunas)
+
+    @classmethod
+    def dos_registros(cls, registros: Iterable[Dict]) -> 'MatrizPrecos':
+        """ Carrega os preços dos registros gravados pelo Crawler (crawler.le_coleta) """
+        campos = ('referencia', 'tipo_veiculo', 'codigo_marca', 'codigo_modelo', 'ano', 'combustivel')
+        colunas = {campo: list() for campo in campos}
+        valores = list()
+        for registro in registros:
+            for campo in campos:
+                colunas[campo].append(registro[campo])
+            valores.append(registro['preco']['Valor'])
+        return cls(referencia=colunas['referencia'], tipo_veiculo=colunas['tipo_veiculo'],
+                   marca=colunas['codigo_marca'], modelo=colunas['codigo_modelo'], ano=colunas['ano'],
+                   combustivel=colunas['combustivel'], preco=valores_em_reais(valores) if valores else [])
+
+    def __len__(self) -> int:
+        return len(self.precos)
+
+    def coluna(self, referencia: int) -> int:
+        """ Posição da referência nas colunas de precos """
+        posicao = int(np.searchsorted(self.referencias, referencia))
+        if posicao == len(self.referencias) or self.referencias[posicao] != referencia:
+            raise IncorrectValueException(f'A referência {referencia} não foi carregada.')
+        return posicao
+
+    def variacao_percentual(self, periodos: int = 1) -> np.ndarray:
+        """ Variação percentual do preço de cada veículo em relação a periodos meses antes. A coluna i do
+        resultado corresponde à referência i + periodos """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self.precos[:, periodos:] / self.precos[:, :-periodos] - 1) * 100
+
+    def _grupos(self, por: str) -> Tuple[np.ndarray, np.ndarray]:
+        """ Códigos de cada grupo (uma linha por grupo) e o grupo de cada veículo """
+        if por not in _AGRUPAMENTOS:
+            raise IncorrectValueException(f'Agrupamento inválido: {por}. Opções: {", ".join(_AGRUPAMENTOS)}.')
+        codigos = np.stack([getattr(self, coluna) for coluna in _AGRUPAMENTOS[por]], axis=1)
+        chave = np.zeros(len(self), dtype=np.int64)
+        for coluna in codigos.T:
+            chave = chave << 24 | coluna.astype(np.int64)
+        _, primeiros, grupo = np.unique(chave, return_index=True, return_inverse=True)
+        return codigos[primeiros], grupo.ravel()
+
+    @staticmethod
+    def _por_grupo(valores: np.ndarray, grupo: np.ndarray, quantidade: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Soma e contagem dos valores não NaN de cada grupo, coluna a coluna """
+        validos = ~np.isnan(valores)
+        somas = np.empty((quantidade, valores.shape[1]))
+        contagens = np.empty((quantidade, valores.shape[1]))
+        for i in range(valores.shape[1]):
+            somas[:, i] = np.bincount(grupo, weights=np.where(validos[:, i], valores[:, i], 0), minlength=quantidade)
+            contagens[:, i] = np.bincount(grupo, weights=validos[:, i], minlength=quantidade)
+        return somas, contagens
+
+    def media(self, por: str = 'marca') -> Agregado:
+        """ Preço médio de cada grupo ('tipo_veiculo', 'marca' ou 'modelo') em cada referência """
+        codigos, grupo = self._grupos(por)
+        somas, contagens = self._por_grupo(self.precos, grupo, len(codigos))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return Agregado(grupos=codigos, referencias=self.referencias, valores=somas / contagens)
+
+    def indice(self, por: str = 'marca', base: int = None) -> Agregado:
+        """ Índice de preço de cada grupo em cada referência, com a referência base igual a 100. É a média
+        geométrica das razões entre o preço de cada veículo e o seu preço na base (índice de Jevons), apenas com
+        os veículos presentes nos dois meses. Default da base: primeira referência carregada """
+        coluna_base = 0 if base is None else self.coluna(base)
+        codigos, grupo = self._grupos(por)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            razoes = np.log(self.precos / self.precos[:, coluna_base:coluna_base + 1])
+        somas, contagens = self._por_grupo(razoes, grupo, len(codigos))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return Agregado(grupos=codigos, referencias=self.referencias, valores=100 * np.exp(somas / contagens))
+
+    def depreciacao(self, referencia: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ Curva de depreciação por ano/modelo em uma referência. Para cada modelo e combustível, o preço de cada
+        ano/modelo é dividido pelo preço do ano/modelo mais novo; o resultado é a média dessas razões por
+        ano/modelo. Default da referência: a mais recente carregada
+
+        Returns
+        --------
+        Tuple[numpy.ndarray, numpy.ndarray]:
+            Anos/modelo (ordem crescente, 32000 é zero km) e o fator médio em relação ao ano/modelo mais novo
+        """
+        precos = self.precos[:, len(self.referencias) - 1 if referencia is None else self.coluna(referencia)]
+        presentes = ~np.isnan(precos)
+        _, grupo = np.unique(_chave_veiculo(self.tipo_veiculo, self.marca, self.modelo,
+                                            np.zeros(len(self), dtype=np.int64), self.combustivel)[presentes],
+                             return_inverse=True)
+        grupo = grupo.ravel()
+        anos, precos = self.ano[presentes], precos[presentes]
+
+        mais_novo = np.full(grupo.max() + 1 if len(grupo) else 0, -1, dtype=np.int64)
+        np.maximum.at(mais_novo, grupo, anos)
+        preco_mais_novo = np.empty(len(mais_novo))
+        preco_mais_novo[grupo[anos == mais_novo[grupo]]] = precos[anos == mais_novo[grupo]]
+
+        anos_unicos, posicao = np.unique(anos, return_inverse=True)
+        razoes = np.bincount(posicao.ravel(), weights=precos / preco_mais_novo[grupo], minlength=len(anos_unicos))
+        return anos_unicos, razoes / np.bincount(posicao.ravel(), minlength=len(anos_unicos))
@@ -18,20 +18,36 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 import requests
 import logging
 import sys
-import json
 import os
-import redis
-
+import threading
+import time
 from datetime import datetime
 
 from .exceptions import (
     IncorrectValueException,
     NotConnectedException,
     ValueNotFoundException,
-    RequestFailedException)
-
-from typing import List, Any, Dict
-from .utils import meses_do_ano
+    RequestFailedException,
+    RequestTimeoutException,
+    CacheException)
+
+from typing import List, Any, Dict, Callable, Union, Iterable, Iterator, Optional, Tuple
+from .consulta import Consulta
+from .lote import EspecificacaoVeiculo, ResultadoLote, consulta_precos_em_lote
+from .historico import HistoricoPrecos, historico_precos
+from .limitador import LimitadorTaxa, LimitadorTaxaRedis
+from .coalescencia import Coalescedor, TravaRedis
+from .politica import PoliticaCache, TABELA_REFERENCIA
+from .memoria import CacheMemoria, CacheLRU
+from .backends import BackendCache, BackendRedis, BackendRedisAgrupado, BackendSQLite
+from .codec import Codec
+from .snapshot import Snapshot
+from .referencias import IndiceReferencias, ordinal
+from .busca import IndiceBusca, ResultadoBusca
+from .registros import Marca, Modelo, AnoModelo, Preco
+from .requisicao import PoliticaRequisicao, falha_transitoria, le_retry_after
+from . import chaves, colunar, protocolo, registros
+from .protocolo import CARRO, MOTO, CAMINHAO, GASOLINA, ALCOOL, DIESEL  # noqa
 
 
 log_format = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
@@ -43,18 +59,6 @@ handler.setFormatter(log_format)
 logger.addHandler(handler)
 
 
-# Tipos de veículo
-CARRO: int = 1
-MOTO: int = 2
-CAMINHAO: int = 3
-
-
-# Combustíveis
-GASOLINA = 1
-ALCOOL = 2
-DIESEL = 3
-
-
 class FipeAPI:
     """
     Classe de Manipulação de Seção e Consulta com o website e API oficial FIPE
@@ -63,6 +67,42 @@ class FipeAPI:
     ---------
     is_verbose : bool, optional
         Informa se quer que seja mostrada as mensagens completas. Default: False
+    requisicoes_por_segundo : float, optional
+        Limite de requisições por segundo à FIPE. Default: variável de ambiente FIPE_REQUISICOES_POR_SEGUNDO ou sem
+        limite
+    limite_global : bool, optional
+        Guarda o limite de requisições no Redis, compartilhando-o entre todos os processos e servidores. Default:
+        variável de ambiente FIPE_LIMITE_GLOBAL
+    limitador : LimitadorTaxa, optional
+        Limitador de taxa já configurado. Tem prioridade sobre os dois parâmetros anteriores
+    politica_cache : PoliticaCache, optional
+        Política de validade (TTL) das entradas salvas no cache. Default: PoliticaCache()
+    memoria : CacheMemoria, optional
+        Cache em memória, limitado por origem, compartilhado por todas as consultas. Default: CacheMemoria()
+    cache : BackendCache, optional
+        Backend do cache compartilhado (BackendMemoria, BackendRedis, BackendSQLite ou outra implementação de
+        BackendCache). Default: Redis (USE_REDIS/REDIS_HOST) ou arquivo SQLite (FIPE_CACHE_SQLITE) configurados
+        nas variáveis de ambiente
+    codec : Codec, optional
+        Serialização e compressão dos valores salvos no cache. Default: variável de ambiente FIPE_CACHE_CODEC ou
+        JSON puro
+    infere_referencia : bool, optional
+        Quando a tabela de referência em cache está desatualizada, infere o código dos meses posteriores a ela a
+        partir do último mês conhecido, sem consultar a tabela na FIPE. Default: variável de ambiente
+        FIPE_INFERE_REFERENCIA ou False
+    colunar : bool, optional
+        Guarda as listas de modelos e de anos/modelo em colunas (colunar.ListaColunar), na memória e no cache, e as
+        retorna nesse formato. Default: variável de ambiente FIPE_COLUNAR ou False
+    le_chaves_legadas : bool, optional
+        Quando a chave não está no cache, procura o valor na chave do esquema antigo (fipeAPI-<códigos>) e o migra
+        para a chave nova. Custa uma leitura extra a cada falta no cache, então deve ser ativado apenas durante a
+        migração de um cache antigo. Default: variável de ambiente FIPE_LE_CHAVES_LEGADAS ou False
+    politica_requisicao : PoliticaRequisicao, optional
+        Tempos limite e novas tentativas das requisições à FIPE. Default: variáveis de ambiente FIPE_TIMEOUT_CONEXAO,
+        FIPE_TIMEOUT_LEITURA e FIPE_TENTATIVAS ou PoliticaRequisicao()
+    snapshot : Snapshot ou str, optional
+        Modo offline: responde as consultas a partir do snapshot (ou do diretório do snapshot) criado com
+        Snapshot.cria, sem acessar a FIPE nem o cache
 
     Methods:
     --------
@@ -82,7 +122,19 @@ class FipeAPI:
 
     __version__ = '0.1.0'
 
-    def __init__(self, is_verbose=False, silently=False):
+    def __init__(self, is_verbose=False, silently=False,
+                 requisicoes_por_segundo: float = None,
+                 limite_global: bool = None,
+                 limitador: LimitadorTaxa = None,
+                 politica_cache: PoliticaCache = None,
+                 memoria: CacheMemoria = None,
+                 cache: BackendCache = None,
+                 codec: Codec = None,
+                 infere_referencia: bool = None,
+                 colunar: bool = None,
+                 le_chaves_legadas: bool = None,
+                 politica_requisicao: PoliticaRequisicao = None,
+                 snapshot: Union[Snapshot, str] = None):
         # configuring log
         if silently:
             log_level = logging.WARNING
@@ -95,17 +147,40 @@ class FipeAPI:
 
         # Chama a rotina para preparar os dados de conexão e o objeto
         self._prepara_conexao()
+        self._politica_requisicao = politica_requisicao or PoliticaRequisicao.do_ambiente()
+
+        # no modo offline as consultas são respondidas pelo snapshot, sem conexão com a FIPE
+        self._snapshot = Snapshot.abre(snapshot) if isinstance(snapshot, str) else snapshot
 
         # faz a conexão com o website FIPE para pegar os cookies de sessão
-        self._conectar()
+        if self._snapshot is None:
+            self._conectar()
 
         # seta os dados necessários
         self._prepara_dados()
 
+        # Prepara o cache em memória
+        self._prepara_memoria(memoria)
+        if infere_referencia is not None:
+            self._infere_referencia = infere_referencia
+        if colunar is not None:
+            self._colunar = colunar
+        if le_chaves_legadas is not None:
+            self._le_chaves_legadas = le_chaves_legadas
+
         # Chama a rotina para preparar o cache
-        self._prepara_cache()
+        self._politica_cache = politica_cache or PoliticaCache()
+        self._codec = codec or Codec.do_ambiente()
+        self._prepara_cache(cache)
+
+        # Prepara o limitador de requisições à FIPE
+        self._prepara_limitador(requisicoes_por_segundo=requisicoes_por_segundo,
+                                limite_global=limite_global,
+                                limitador=limitador)
 
     def __del__(self):
+        if self._req is None:
+            return
         try:
             self._req.close()
         except Exception as error:
@@ -124,20 +199,44 @@ class FipeAPI:
         self._redis_host = os.environ.get('REDIS_HOST')
         self._redis_port = os.environ.get('REDIS_PORT', 6379)
         self._redis_db = os.environ.get('REDIS_DB', 0)
+        self._cache_sqlite = os.environ.get('FIPE_CACHE_SQLITE')
+        self._redis_agrupado = os.environ.get('FIPE_REDIS_AGRUPADO', 'False').strip().lower() == 'true'
+        self._requisicoes_por_segundo = os.environ.get('FIPE_REQUISICOES_POR_SEGUNDO')
+        self._limite_global = os.environ.get('FIPE_LIMITE_GLOBAL', 'False').strip().lower() == 'true'
+        self._le_chaves_legadas = os.environ.get('FIPE_LE_CHAVES_LEGADAS', 'False').strip().lower() == 'true'
+        self._infere_referencia = os.environ.get('FIPE_INFERE_REFERENCIA', 'False').strip().lower() == 'true'
+        self._colunar = os.environ.get('FIPE_COLUNAR', 'False').strip().lower() == 'true'
 
         self._tabela_referencia = None
+        self._indice_referencias = IndiceReferencias([])
+        self._tabela_atualizada = False
         self._codigo_referencia_corrente = None
         self._prefixo_redis = 'fipeAPI'
         self._codigo_tipo_veiculo_corrente = None
-        self._chave_tabela_referencia = 'TabelaReferencia'
+        self._chave_tabela_referencia = protocolo.chave_tabela_referencia()
         self._codigo_marca_corrente = None
         self._codigo_modelo_corrente = None
         self._codigo_ano_modelo_corrente = None
 
-        self._marcas = dict()
-        self._modelos = dict()
-        self._anos_modelo = dict()
-        self._preco = dict()
+        # Coalescência das requisições idênticas em andamento (threads e processos)
+        self._coalescedor = Coalescedor()
+        self._trava_redis = None
+
+    def _prepara_memoria(self, memoria: CacheMemoria = None) -> None:
+        """ Método interno para preparar o cache em memória de cada origem de dados """
+        self._memoria = memoria or CacheMemoria()
+        self._marcas = self._memoria.origem(chaves.MARCAS)
+        self._modelos = self._memoria.origem(chaves.MODELOS)
+        self._anos_modelo = self._memoria.origem(chaves.ANOS_MODELO)
+        self._preco = self._memoria.origem(chaves.PRECO)
+        self._preco_codigo_fipe = self._memoria.origem(chaves.PRECO_CODIGO_FIPE)
+        # índices de busca das listas de marcas e modelos, junto com as listas indexadas
+        self._indices_busca = CacheLRU(max_itens=256, tamanho=lambda valor: 0)
+
+    @property
+    def memoria(self) -> CacheMemoria:
+        """ Cache em memória da instância, com os contadores de acertos, falhas e remoções de cada origem """
+        return self._memoria
 
     def limpa_dados_selecionados(self):
         """ Função para limpar os dados da seleção """
@@ -149,61 +248,28 @@ class FipeAPI:
 
     def _prepara_conexao(self):
         """ Método para preparar as variáveis de conexão e o objeto de request """
-        self._url = 'https://veiculos.fipe.org.br'
-        self._api_root = 'api/veiculos/'
+        self._url = protocolo.URL
+        self._api_root = protocolo.API_ROOT
         self._session = requests.Session()
-        self._headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
-                                       'Chrome/51.0.2704.103 Safari/537.36',
-                         'Accept': 'text/html, application/xhtml+xml, application/json, text/javascript',
-                         'referrer': self._url,
-                         'Connection': 'keep-alive',
-                         'Accept-Language': 'pt-BR,pt;q=0.8,en-US;q=0.5,en;q=0.3',
-                         'Host': self._url.split("://")[1],
-                         'Origin': self._url,
-                         }
+        self._headers = dict(protocolo.CABECALHOS)
         self._req = None
+        self._limitador = None
 
-    def _prepara_cache(self):
-        """ Método para preparar o objeto de conexão com o Redis e as objetos e dados para cache """
+        # trava para proteger a conexão e a tabela de referência quando a instância é compartilhada entre threads
+        self._trava = threading.RLock()
 
-        if self._use_redis == 'true':
-            if not self._redis_host:
-                logger.error(
-                    """
-                    Para fazer conexão com o Redis, é necessário informar o host na variável de ambiente REDIS_HOST
-                    """
-                )
-                self._cache = False
-                return
+    def _prepara_cache(self, cache: BackendCache = None):
+        """ Método para preparar o backend de cache. Se não for informado, utiliza o Redis (USE_REDIS) ou o arquivo
+        SQLite (FIPE_CACHE_SQLITE) configurados nas variáveis de ambiente """
 
-            logger.debug(f"""
-            Iniciando a conexão com o Redis host: {self._redis_host} porta: {self._redis_port} 
-            db: {self._redis_db} ...
-            """)
+        self._redis = None
+        if self._snapshot is not None:
+            self._cache = None
+            return
 
-            try:
-                connection_pool = redis.ConnectionPool(host=self._redis_host,
-                                                       port=self._redis_port,
-                                                       db=self._redis_db)
-                self._redis = redis.Redis(connection_pool=connection_pool)
-                self._redis.time()
-                logger.debug("""
-                        Conexão com o Redis realizada com sucesso. Vamos utilizar o Cache.  
-                """)
-                self._cache = True
-            except redis.exceptions.ConnectionError:
-                logger.error(f"""
-                    Falha na conexão com o Redis -> host: {self._redis_host} porta: {self._redis_port} 
-                    db: {self._redis_db}
-                """)
-                logger.warning("""
-                É altamente recomendado a utilização de cache para evitar muitas requisições à API da FIPE. Então, caso não
-                tenha informado o servidor Redis para cache, faça o quanto antes, pois, seu IP pode ser bloqueado pela
-                API. Além disso, sobrecarrega o servidor da FIPE. LEMBRE-SE: A FIPE NÃO DISPONIBILIZA API OFICIAL PREPARADA 
-                PARA RECEBER ALTAS CARGAS DE REQUISIÇÕES. ENTÃO, VAMOS SER CONSCIENTES. 
-                """)
-                self._cache = False
-        else:
+        self._cache = cache if cache is not None else self._backend_do_ambiente()
+
+        if self._cache is None:
             logger.warning("""
                 É altamente recomendado a utilização de cache para evitar muitas 
                 requisições à API da FIPE. Então, caso não
@@ -213,138 +279,293 @@ class FipeAPI:
                 A FIPE NÃO DISPONIBILIZA API OFICIAL PREPARADA 
                 PARA RECEBER ALTAS CARGAS DE REQUISIÇÕES. ENTÃO, VAMOS SER CONSCIENTES. 
                         """)
-            self._cache = False
             return
 
-    def _pega_codigo_referencia(self,
-                                mes_referencia: int = None,
-                                ano_referencia: int = None) -> int:
-        """ Função interna para pegar o mes/ano de referência informado e retornar o código FIPE """
+        # a trava entre processos e o limite global necessitam do Redis
+        if isinstance(self._cache, BackendRedis):
+            self._redis = self._cache.cliente
+            # a trava dura o tempo máximo de uma requisição com todas as tentativas, para que outro processo não
+            # repita a requisição enquanto a primeira ainda está tentando
+            duracao = self._politica_requisicao.duracao_maxima()
+            self._trava_redis = TravaRedis(self._redis, prefixo=chaves.completa(self._prefixo_redis, 'trava'),
+                                           validade=duracao, espera=duracao)
 
-        if not mes_referencia or mes_referencia < 1:
-            mes_referencia = datetime.today().month
-        elif mes_referencia > 12:
-            raise IncorrectValueException(
-                f"""
-                O valor do mês de referência informado "{mes_referencia}" não pode ser maior que 12. 
-                """
-            )
-        else:
-            mes_referencia = mes_referencia
+    def _backend_do_ambiente(self) -> Optional[BackendCache]:
+        """ Método interno para criar o backend de cache a partir das variáveis de ambiente """
 
-        current_year = datetime.today().year
+        if self._use_redis == 'true':
+            if not self._redis_host:
+                logger.error(
+                    """
+                    Para fazer conexão com o Redis, é necessário informar o host na variável de ambiente REDIS_HOST
+                    """
+                )
+            else:
+                logger.debug(f"""
+                Iniciando a conexão com o Redis host: {self._redis_host} porta: {self._redis_port} 
+                db: {self._redis_db} ...
+                """)
+                if self._redis_agrupado:
+                    backend = BackendRedisAgrupado(host=self._redis_host, port=self._redis_port, db=self._redis_db,
+                                                   prefixo=self._prefixo_redis)
+                else:
+                    backend = BackendRedis(host=self._redis_host, port=self._redis_port, db=self._redis_db)
+                if backend.verifica():
+                    logger.debug("""
+                            Conexão com o Redis realizada com sucesso. Vamos utilizar o Cache.  
+                    """)
+                    return backend
+                logger.error(f"""
+                    Falha na conexão com o Redis -> host: {self._redis_host} porta: {self._redis_port} 
+                    db: {self._redis_db}
+                """)
 
-        if not ano_referencia or ano_referencia < 1:
-            ano_referencia = current_year
-        elif ano_referencia > current_year:
-            raise IncorrectValueException(
-                f"""
-                O valor do ano de referência informado "{ano_referencia}" não pode ser no futuro. 
-                """
-            )
-        else:
+        if self._cache_sqlite:
+            logger.debug(f'Utilizando o cache no arquivo SQLite {self._cache_sqlite}.')
             try:
-                first_year = int(self._tabela_referencia[-1]['Mes'].split("/")[1]) # noqa
-            except Exception as error:
-                logger.error(f'Erro ao verificar o primeiro Mes/Ano de referência: \n '
-                             f'Dados: {self._tabela_referencia}'
-                             f'\n Error Message: {error}.') # noqa
-                return False
+                return BackendSQLite(self._cache_sqlite)
+            except CacheException as error:
+                logger.error(f'Falha ao abrir o cache no arquivo SQLite {self._cache_sqlite}: {error}')
+        return None
+
+    def _prepara_limitador(self,
+                           requisicoes_por_segundo: float = None,
+                           limite_global: bool = None,
+                           limitador: LimitadorTaxa = None) -> None:
+        """ Método para preparar o limitador de taxa aplicado a todas as requisições à FIPE """
+        if limitador is not None:
+            self._limitador = limitador
+            return
 
-            if ano_referencia < first_year:
-                raise IncorrectValueException(
-                    f"""
-                    O valor de ano informado não pode ser menor do que o primeiro ano da 
-                    série {first_year}.
-                    """
-                )
+        taxa = requisicoes_por_segundo or self._requisicoes_por_segundo
+        if not taxa:
+            return
 
-        search = f'{meses_do_ano[mes_referencia]}/{ano_referencia}'
+        if limite_global is None:
+            limite_global = self._limite_global
 
-        logger.debug(f'Efetuando a busca do código de referência para {search} ...')
+        if limite_global and self._redis is not None:
+            logger.debug(f'Limite global de {taxa} requisições por segundo compartilhado pelo Redis.')
+            self._limitador = LimitadorTaxaRedis(self._redis, taxa=float(taxa))
+        else:
+            if limite_global:
+                logger.warning('O limite global de requisições necessita do Redis. Aplicando o limite local.')
+            self._limitador = LimitadorTaxa(taxa=float(taxa))
 
-        codigo_tabela_referencia = 0
+    def _aguarda_limite(self) -> None:
+        """ Método interno para aguardar o limitador de taxa antes de cada requisição à FIPE """
+        if self._limitador is not None:
+            self._limitador.adquire()
 
-        for item in self._tabela_referencia:
-            if item['Mes'].strip() == search:
-                codigo_tabela_referencia = item['Codigo']
-                break
+    def _pega_codigo_referencia(self,
+                                mes_referencia: int = None,
+                                ano_referencia: int = None) -> int:
+        """ Função interna para pegar o mes/ano de referência informado e retornar o código FIPE. Enquanto a tabela
+        atualizada não foi carregada, tenta resolver o mês com a tabela em cache (mesmo desatualizada) antes de
+        consultar a tabela na FIPE """
+        mes, ano = protocolo.normaliza_referencia(mes_referencia, ano_referencia)
+        if not self._tabela_atualizada:
+            codigo = self._codigo_sem_atualizar(mes, ano)
+            if codigo is not None:
+                return codigo
+            self._carrega_tabela_referencia()
+        return protocolo.pega_codigo_referencia(self._indice_referencias, mes_referencia=mes, ano_referencia=ano)
+
+    def _codigo_sem_atualizar(self, mes: int, ano: int) -> Optional[int]:
+        """ Método interno que resolve o mês com a tabela de referência em cache, sem consultar a FIPE. Os códigos
+        dos meses já publicados não mudam; os meses posteriores à tabela são inferidos se infere_referencia estiver
+        ativo """
+        if not self._tabela_referencia:
+            with self._trava:
+                if not self._tabela_referencia:
+                    self._pega_cache_tabela()
+        codigo = self._indice_referencias.pega(mes, ano)
+        if codigo is not None or not self._infere_referencia or self._indice_referencias.ultima is None:
+            return codigo
+        hoje = datetime.today()
+        if self._indice_referencias.ultima.ordinal < ordinal(mes, ano) <= ordinal(hoje.month, hoje.year):
+            codigo = self._indice_referencias.infere(mes, ano)
+            logger.debug(f'Código de referência de {mes}/{ano} inferido: {codigo}.')
+            return codigo
+        return None
+
+    def _define_tabela_referencia(self, tabela: List[Dict], atualizada: bool) -> None:
+        """ Método interno que guarda a tabela de referência e monta o seu índice """
+        self._indice_referencias = IndiceReferencias(tabela)
+        self._tabela_referencia = tabela
+        self._tabela_atualizada = atualizada
 
-        if codigo_tabela_referencia == 0:
-            raise ValueNotFoundException(
-                f"""
-                    Não foi possível encontrar o Código da Tabela de Referência para {search}.
-                """
-            )
-        return codigo_tabela_referencia
+    @property
+    def indice_referencias(self) -> IndiceReferencias:
+        """ Índice da tabela de referência atualizada: mês/ano -> código, código -> mês/ano e intervalos """
+        self._carrega_tabela_referencia()
+        return self._indice_referencias
+
+    def _carrega_tabela_referencia(self) -> None:
+        """ Método interno para garantir que a tabela de referência foi carregada antes de resolver um mês/ano """
+        if not self._tabela_atualizada:
+            with self._trava:
+                if not self._tabela_atualizada and not self._atualiza_tabela_referencia():
+                    raise ValueNotFoundException(
+                        """
+                            Não foi possível pegar o código da tabela de referência. Sem esta informação, não é
+                            possível fazer requisições à FIPE.
+                        """
+                    )
 
     def seleciona_referencia(self, mes: int = None, ano: int = None) -> bool:
         """ Função para definir o mês e ano desejado para a pesquisa """
-        if not self._tabela_referencia:
-            if not self._atualiza_tabela_referencia():
-                raise ValueNotFoundException(
-                    f"""
-                        Não foi possível pegar o código da tabela de referência. Sem esta informação, não é possível
-                        fazer requisições à FIPE.
-                    """
-                )
         self._codigo_referencia_corrente = self._pega_codigo_referencia(mes_referencia=mes, ano_referencia=ano)  # noqa
         return True
 
     def seleciona_tipo_veiculo(self, tipo_veiculo: int) -> bool:
         """ Método para definir o típo de veículo a ser pesquisado """
-        if tipo_veiculo not in [CARRO, MOTO, CAMINHAO]:
-            raise IncorrectValueException(
-                f"""
-                Valor de tipo de veículo está incorreto.
-                """
-            )
-        self._codigo_tipo_veiculo_corrente = tipo_veiculo  # noqa
+        self._codigo_tipo_veiculo_corrente = protocolo.verifica_tipo_veiculo(tipo_veiculo)  # noqa
         return True
 
+    def _localiza_marca(self, consulta: Consulta, marca: str) -> int:
+        """ Método interno para localizar o código da marca pelo nome dentro das marcas da consulta """
+        return protocolo.localiza_marca(self.indice_marcas(consulta), marca)
+
+    def _localiza_modelo(self, consulta: Consulta, modelo: str) -> int:
+        """ Método interno para localizar o código do modelo pelo nome dentro dos modelos da consulta """
+        return protocolo.localiza_modelo(self.indice_modelos(consulta), modelo)
+
+    def _indice_busca(self, chave: Any, listas: Callable[[], List[Tuple[Optional[int], List[Dict]]]],
+                      campo: str) -> IndiceBusca:
+        """ Método interno que retorna o índice de busca das listas (marca, lista), montado uma vez enquanto as
+        listas em memória forem as mesmas """
+        atuais = listas()
+        guardado = self._indices_busca.get(chave)
+        if guardado is not None and len(guardado[0]) == len(atuais) and (
+                self._snapshot is not None or all(a[1] is b[1] for a, b in zip(guardado[0], atuais))):
+            return guardado[1]
+        itens = (item if marca is None else dict(item, codigo_marca=marca) for marca, lista in atuais for item in lista)
+        indice = IndiceBusca(itens, campo)
+        self._indices_busca[chave] = (atuais, indice)
+        return indice
+
+    def indice_marcas(self, consulta: Consulta = None) -> IndiceBusca:
+        """ Índice de busca das marcas da consulta (tipo de veículo e referência) """
+        consulta = self._verifica_consulta(consulta) if consulta else self._consulta_corrente()
+        return self._indice_busca(protocolo.chave_marcas(consulta), lambda: [(None, self.pega_marcas(consulta))],
+                                  'marca')
+
+    def indice_modelos(self, consulta: Consulta = None) -> IndiceBusca:
+        """ Índice de busca dos modelos da marca da consulta. Se a consulta não possuir marca, indexa os modelos de
+        todas as marcas do tipo de veículo; cada resultado informa a marca do modelo """
+        consulta = self._verifica_consulta(consulta) if consulta else self._consulta_corrente()
+        if consulta.marca:
+            return self._indice_busca(protocolo.chave_modelos(consulta), lambda: [(None, self.pega_modelos(consulta))],
+                                      'modelo')
+
+        def listas() -> List[Tuple[Optional[int], List[Dict]]]:
+            marcas = [consulta.com_marca(int(marca['codigo'])) for marca in self.pega_marcas(consulta)]
+            self.pre_carrega_cache(chaves.MODELOS, (protocolo.chave_modelos(marca) for marca in marcas))
+            return [(marca.marca, self.pega_modelos(marca)) for marca in marcas]
+
+        return self._indice_busca((chaves.MODELOS, consulta.tipo_veiculo, consulta.referencia), listas, 'modelo')
+
+    def busca_marcas(self, texto: str, consulta: Consulta = None, limite: int = 10) -> List[ResultadoBusca]:
+        """ Busca aproximada (sem acentos, por palavras, início de palavras e trigramas) das marcas
+
+        Parameters
+        ----------
+        texto: str
+            Texto buscado
+        consulta: Consulta, optional
+            Consulta criada com cria_consulta. Se não for informada, utiliza os dados selecionados
+        limite: int, optional
+            Número máximo de resultados. Default: 10
+
+        Returns
+        --------
+        List[ResultadoBusca]:
+            Marcas em ordem decrescente de pontuação (0 a 1)
+        """
+        return self.indice_marcas(consulta).busca(texto, limite=limite)
+
+    def busca_modelos(self, texto: str, consulta: Consulta = None, limite: int = 10) -> List[ResultadoBusca]:
+        """ Busca aproximada dos modelos da marca da consulta ou, se a consulta não possuir marca, dos modelos de
+        todas as marcas do tipo de veículo
+
+        Parameters
+        ----------
+        texto: str
+            Texto buscado
+        consulta: Consulta, optional
+            Consulta criada com cria_consulta. Se não for informada, utiliza os dados selecionados
+        limite: int, optional
+            Número máximo de resultados. Default: 10
+
+        Returns
+        --------
+        List[ResultadoBusca]:
+            Modelos em ordem decrescente de pontuação (0 a 1), com a marca de cada modelo na busca entre marcas
+        """
+        return self.indice_modelos(consulta).busca(texto, limite=limite)
+
     def seleciona_marca(self, marca: str) -> bool:
         """ Método para definir a marca de veículo a ser pesquisada """
-        marca = marca.strip().lower()
-        marcas = self.pega_marcas()
-        for m in marcas:
-            name = m['marca'].lower()
-            if name == marca or marca in name:
-                self._codigo_marca_corrente = int(m['codigo']) # noqa
-                return True
-        raise IncorrectValueException(
-            f"""
-              A marca de carro informada "{marca}" não foi localizada.
-            """
-        )
+        self._codigo_marca_corrente = self._localiza_marca(self._consulta_corrente(), marca)  # noqa
+        return True
 
     def seleciona_modelo(self, modelo: str) -> bool:
         """ Método para definir o modelo de veículo a ser pesquisado """
-        modelo = modelo.strip().lower()
-        modelos = self.pega_modelos()
-        for m in modelos:
-            name = m['modelo'].lower()
-            if name == modelo or modelo in name:
-                self._codigo_modelo_corrente = int(m['codigo']) # noqa
-                return True
-        raise IncorrectValueException(
-            f"""
-              O modelo de veículo informado "{modelo}" não foi localizado.
-            """
-        )
+        self._codigo_modelo_corrente = self._localiza_modelo(self._consulta_corrente(marca=True), modelo)  # noqa
+        return True
+
+    def cria_consulta(self,
+                      tipo_veiculo: int = CARRO,
+                      mes: int = None,
+                      ano: int = None,
+                      marca: Union[str, int] = None,
+                      modelo: Union[str, int] = None) -> Consulta:
+        """
+        Resolve os parâmetros informados para os códigos da FIPE e retorna uma consulta imutável, sem alterar a
+        seleção corrente da instância. A consulta retornada pode ser passada para pega_marcas, pega_modelos,
+        pega_anos_modelo e consulta_preco_veiculo, inclusive a partir de várias threads.
+
+        Parameters
+        ----------
+        tipo_veiculo: int
+            Tipo de veículo (CARRO, MOTO ou CAMINHAO)
+        mes: int, optional
+            Mês da tabela de referência. Default: mês atual
+        ano: int, optional
+            Ano da tabela de referência. Default: ano atual
+        marca: str ou int, optional
+            Nome ou código da marca
+        modelo: str ou int, optional
+            Nome ou código do modelo. Necessita que a marca seja informada
 
-    def _verifica_ano_modelo(self, ano: int, combustivel: int) -> bool:
+        Returns
+        -------
+        Consulta:
+            Consulta com os códigos resolvidos
+        """
+        consulta = Consulta(tipo_veiculo=protocolo.verifica_tipo_veiculo(tipo_veiculo),
+                            referencia=self._pega_codigo_referencia(mes_referencia=mes, ano_referencia=ano))
+        if marca is not None:
+            if isinstance(marca, str):
+                marca = self._localiza_marca(consulta, marca)
+            consulta = consulta.com_marca(marca)
+        if modelo is not None:
+            self._verifica_consulta(consulta, marca=True)
+            if isinstance(modelo, str):
+                modelo = self._localiza_modelo(consulta, modelo)
+            consulta = consulta.com_modelo(modelo)
+        return consulta
+
+    def _verifica_ano_modelo(self, consulta: Consulta, ano: int, combustivel: int) -> bool:
         """ Método interno para verificar se o ano e modelo estão corretos """
-        anos = self.pega_anos_modelo()
-        for a in anos:
-            if a['ano'] == int(ano) and combustivel == a['combustivel']:
-                return True
-        return False
+        return protocolo.possui_ano_modelo(self.pega_anos_modelo(consulta), ano=ano, combustivel=combustivel)
 
     def _verifica_condicoes_pesquisa(self) -> bool:
         """ Método interno para verificar se foi estabelecida conexão, se foi definida a tabela de referência e
         se foi definido o tipo de veículo """
 
-        if not self._req:
+        if not self._garante_conexao():
             raise NotConnectedException(
                 """
             Para fazer requisições de dados é necessário estabelecer conexão.  Para Criar conexão, chame o objeto 
@@ -367,12 +588,59 @@ class FipeAPI:
 
         return True
 
+    def _consulta_corrente(self, marca: bool = False, modelo: bool = False) -> Consulta:
+        """ Método interno para montar uma consulta a partir dos dados selecionados com os métodos seleciona_* """
+        self._verifica_condicoes_pesquisa()
+        consulta = Consulta(tipo_veiculo=self._codigo_tipo_veiculo_corrente,
+                            referencia=self._codigo_referencia_corrente,
+                            marca=self._codigo_marca_corrente,
+                            modelo=self._codigo_modelo_corrente)
+        return self._verifica_consulta(consulta, marca=marca, modelo=modelo)
+
+    def _verifica_consulta(self, consulta: Consulta, marca: bool = False, modelo: bool = False) -> Consulta:
+        """ Método interno para verificar se há conexão e se a consulta possui a marca e o modelo necessários """
+
+        if not self._garante_conexao():
+            raise NotConnectedException(
+                """
+            Para fazer requisições de dados é necessário estabelecer conexão.  Para Criar conexão, chame o objeto 
+            instanciado. 
+                 """)
+
+        if marca and not consulta.marca:
+            raise IncorrectValueException(
+                """
+                A marca não foi selecionada. Selecione a marca com a função "seleciona_marca"
+                """
+            )
+
+        if modelo and not consulta.modelo:
+            raise IncorrectValueException(
+                """
+                O modelo do veículo não foi selecionado. Selecione a marca com a função "seleciona_modelo"
+                """
+            )
+
+        return consulta
+
+    def _garante_conexao(self) -> bool:
+        """ Método interno para refazer a conexão caso a tentativa anterior tenha falhado. Permite que uma instância
+        de vida longa se recupere de uma falha momentânea do website da FIPE. No modo offline não há conexão """
+        if self._req or self._snapshot is not None:
+            return True
+        with self._trava:
+            if not self._req:
+                self._conectar()
+        return bool(self._req)
+
     def _conectar(self) -> bool:
         """ Estabelece conexão com o web site da FIPE utilizando o header gerado """
         try:
             logger.info(f'iniciando conexão para o site {self._url} ...')
             logger.debug(f'Cabeçalho da requisição: {self._headers}')
-            self._req = self._session.get(self._url, headers=self._headers)
+            self._aguarda_limite()
+            self._req = self._session.get(self._url, headers=self._headers,
+                                          timeout=self._politica_requisicao.timeout())
         except requests.exceptions.ConnectTimeout:
             logger.error(f'tempo esgotado de conexão ... faça uma nova tentativa mais tarde.')
             return False
@@ -390,22 +658,28 @@ class FipeAPI:
 
     def _verifica_cache(self) -> bool:
         """ Método interno para verificar se está utilzando cache e enviar mensagem de alerta """
-        if not self._use_redis or not self._cache:
-            return False
-        return True
+        return self._cache is not None
 
-    def _salva_cache(self, origem: str, chave: str, valor: Any) -> bool:
-        """ Função interna para salvar os dados em cache """
+    def _referencia_atual(self) -> Union[int, None]:
+        """ Método interno que retorna o código da referência mais recente da tabela carregada """
+        ultima = self._indice_referencias.ultima
+        return ultima.codigo if ultima else None
+
+    def _salva_cache(self, origem: str, chave: str, valor: Any, referencia: int = None) -> bool:
+        """ Função interna para salvar os dados em cache. A validade da entrada é definida pela política de cache
+        conforme a origem e o mês de referência dos dados """
         if not self._verifica_cache():
             return False
+        ttl = self._politica_cache.ttl(origem, referencia=referencia, referencia_atual=self._referencia_atual())
         try:
-            self._redis.set(f'{self._prefixo_redis}-{chave}', json.dumps(valor))
+            self._cache.set(chaves.completa(self._prefixo_redis, chave), self._codec.codifica(valor), ttl=ttl)
             logger.debug(f"""
             Dados de {origem} salvos com sucesso em cache -> \n
             chave: {chave} \n
+            ttl: {ttl} \n
             valor: {valor} 
             """)
-        except redis.RedisError as error:
+        except CacheException as error:
             logger.error(f"""
             Erro ao salvar o de {origem}: \n
             chave: {chave} \n
@@ -424,68 +698,198 @@ class FipeAPI:
         logger.debug(f'pesquisando cache para {origem} com a chave {chave} ... ')
 
         try:
-            _cache = self._redis.get(f'{self._prefixo_redis}-{chave}')
-        except redis.RedisError as error:
+            _cache = self._cache.get(chaves.completa(self._prefixo_redis, chave))
+        except CacheException as error:
             logger.error(f"""
-            Falha em obter o cache do servidor Redis. \n
+            Falha em obter o cache. \n
             origem: {origem} \n
             chave: {chave} \n
             Mensagem de erro: {error}
             """)
             return False
 
+        if _cache:
+            return self._codec.decodifica(_cache)
+
+        if self._le_chaves_legadas:
+            return self._migra_cache_legado(origem, chave)
+
+        logger.debug(f'Não há cache para a chave {chave} ({origem}).')
+        return False
+
+    def _migra_cache_legado(self, origem: str, chave: str) -> Any:
+        """ Método interno que procura o valor na chave equivalente do esquema antigo (fipeAPI-<códigos>) e, se ele
+        for compatível, copia-o para a chave nova """
+        legada = chaves.legada(chave)
+        if legada is None:
+            return False
+
+        try:
+            _cache = self._cache.get(f'{self._prefixo_redis}-{legada}')
+        except CacheException as error:
+            logger.error(f'Falha em obter o cache antigo {legada} ({origem}): {error}')
+            return False
+
         if not _cache:
             logger.debug(f'Não há cache para a chave {chave} ({origem}).')
             return False
-        else:
-            return json.loads(_cache)
 
-    def _pega_cache_tabela(self) -> bool:
-        """ Método interno para pegar o cache das informações  """
+        try:
+            valor = self._codec.decodifica(_cache)
+        except ValueError:
+            return False
 
-        _cache_tabela = self._pega_cache('TabelaDeReferencia', self._chave_tabela_referencia)
+        if not chaves.valida_legado(chave, valor):
+            logger.debug(f'O cache antigo {legada} não corresponde à chave {chave} ({origem}). Ignorando ...')
+            return False
 
-        if not _cache_tabela:
+        logger.debug(f'Migrando o cache antigo {legada} para a chave {chave} ({origem}).')
+        self._salva_cache(origem, chave, valor, referencia=chaves.referencia(chave))
+        return valor
+
+    def _salva_cache_em_lote(self, origem: str, itens: Dict[str, Any], referencia: int = None) -> bool:
+        """ Método interno para salvar vários valores de uma mesma origem e referência com uma única ida ao cache
+        (SET com TTL em pipeline no Redis) """
+        if not self._verifica_cache() or not itens:
+            return False
+        ttl = self._politica_cache.ttl(origem, referencia=referencia, referencia_atual=self._referencia_atual())
+        try:
+            self._cache.mset({chaves.completa(self._prefixo_redis, chave): self._codec.codifica(valor)
+                              for chave, valor in itens.items()}, ttl=ttl)
+        except CacheException as error:
+            logger.error(f'Erro ao salvar {len(itens)} valores de {origem} em cache: {error}')
             return False
+        logger.debug(f'{len(itens)} valores de {origem} salvos em cache (ttl: {ttl}).')
+        return True
 
-        self._tabela_referencia = _cache_tabela
+    def _pega_cache_em_lote(self, origem: str, chaves_cache: List[str]) -> Dict[str, Any]:
+        """ Método interno para pegar vários valores do cache com uma única ida ao cache (MGET no Redis). Retorna
+        apenas as chaves encontradas """
+        if not self._verifica_cache() or not chaves_cache:
+            return dict()
+        try:
+            valores = self._cache.mget([chaves.completa(self._prefixo_redis, chave) for chave in chaves_cache])
+        except CacheException as error:
+            logger.error(f'Falha em obter {len(chaves_cache)} valores de {origem} do cache: {error}')
+            return dict()
+        return {chave: self._codec.decodifica(valor) for chave, valor in zip(chaves_cache, valores) if valor}
+
+    def pre_carrega_cache(self, origem: str, chaves_cache: Iterable[str], renova: bool = False) -> int:
+        """ Carrega para a memória, com uma única ida ao cache, os valores das chaves que ainda não estão na
+        memória. As chaves não encontradas seguem o caminho normal (cache antigo e FIPE) quando forem consultadas.
+
+        Parameters
+        ----------
+        origem: str
+            Origem dos dados ('marcas', 'modelos', 'anos-modelo' ou 'preco')
+        chaves_cache: Iterable[str]
+            Chaves montadas com protocolo.chave_marcas, chave_modelos, chave_anos_modelo ou chave_preco
+        renova: bool, optional
+            Salva novamente os valores carregados com a validade atual da política de cache. Uma entrada salva
+            enquanto o seu mês era o corrente expira no fim do mês; renovada depois que o mês fecha, passa a usar
+            ttl_referencia_fechada. Default: False
 
-        # Pega o mês e ano atual
-        today = datetime.today()
-        current_month = today.month
-        current_year = today.year
+        Returns
+        --------
+        int:
+            Número de valores carregados do cache
+        """
+        memoria = self._memoria.origem(origem)
+        faltantes = [chave for chave in dict.fromkeys(chaves_cache) if chave not in memoria]
+        valores = self._pega_cache_em_lote(origem, faltantes)
+        for chave, valor in valores.items():
+            memoria[chave] = self._converte(origem, valor)  # noqa
+        if renova:
+            por_referencia = dict()
+            for chave, valor in valores.items():
+                por_referencia.setdefault(chaves.referencia(chave), dict())[chave] = valor
+            for referencia, itens in por_referencia.items():
+                self._salva_cache_em_lote(origem, itens, referencia=referencia)
+        return len(valores)
+
+    def pre_carrega_grupo(self, consulta: Consulta) -> int:
+        """ Carrega para a memória, com uma única leitura, todas as entradas cacheadas do mês de referência (marcas
+        e modelos) ou, se a consulta possuir a marca, da marca (anos/modelo e preços). Necessita de um backend que
+        agrupe as entradas, como o BackendRedisAgrupado; com os demais, não carrega nada.
 
+        Returns
+        --------
+        int:
+            Número de valores carregados do cache
+        """
+        if not self._verifica_cache():
+            return 0
         try:
-            last_reference = self._tabela_referencia[0]['Mes'].split("/")
-            logger.debug(f'Checando se a última referência salva "{last_reference}" é igual ao mês/ano atual.')
-            if meses_do_ano[current_month] == last_reference[0] and current_year == int(last_reference[1]):
-                logger.info(f'A tabela de referências está atualizada ({last_reference[0]}/{last_reference[1]}).')
-                return True
-            else:
-                return False
-        except Exception as error:
-            logger.error(f"""Erro ao verificar o último Mes/Ano de referência:\n "
-            Dados: {self._tabela_referencia} \n
-            Error Message: {error}.""")
+            valores = self._cache.carrega_grupo(consulta.tipo_veiculo, consulta.referencia, consulta.marca)
+        except CacheException as error:
+            logger.error(f'Falha em carregar o grupo {consulta} do cache: {error}')
+            return 0
+        raiz = chaves.completa(self._prefixo_redis, '')
+        for chave, valor in valores.items():
+            chave = chave[len(raiz):]
+            origem = chaves.separa(chave)[0]
+            self._memoria.origem(origem)[chave] = self._converte(origem, self._codec.decodifica(valor))
+        return len(valores)
+
+    def _pega_cache_tabela(self) -> bool:
+        """ Método interno para pegar o cache das informações  """
+
+        _cache_tabela = self._pega_cache(TABELA_REFERENCIA, self._chave_tabela_referencia)
+
+        if not _cache_tabela:
             return False
 
+        self._define_tabela_referencia(_cache_tabela, protocolo.tabela_atualizada(_cache_tabela))
+        return self._tabela_atualizada
+
     def _faz_requisicao(self, **kwargs) -> requests.Response:
-        """ Método interno para fazer requisição á API"""
-        consulta = self._session.post(**kwargs,
-                                      headers=self._headers,
-                                      cookies=self._req.cookies)
-        if consulta.status_code == 200:
-            logger.debug(f'requisição realizada com sucesso.')
-            return consulta
-        else:
-            logger.error(f"""
-                    Falha na requisição:
-                    status code: {consulta.status_code} \n
-                    url: {kwargs.get('url')}
-                    data:{kwargs.get('data')}
-                    headers: {consulta.headers}
-                    """)
-            return
+        """ Método interno para fazer requisição á API. As falhas transitórias (tempo esgotado, conexão interrompida,
+        HTTP 429 e 5xx) são tentadas novamente conforme a política de requisição; esgotadas as tentativas, levanta
+        RequestTimeoutException, RequestThrottledException, ServerErrorException ou RequestFailedException """
+        politica = self._politica_requisicao
+        endpoint = kwargs.get('url', '').rstrip('/').split('/')[-1]
+        for tentativa in range(1, politica.tentativas + 1):
+            retry_after = None
+            self._aguarda_limite()
+            try:
+                consulta = self._session.post(**kwargs,
+                                              headers=self._headers,
+                                              cookies=self._req.cookies,
+                                              timeout=politica.timeout(endpoint))
+            except requests.exceptions.Timeout as error:
+                causa, falha = error, RequestTimeoutException(
+                    f"""
+                    Tempo esgotado na requisição de {endpoint}.
+                    """
+                )
+            except requests.exceptions.ConnectionError as error:
+                causa, falha = error, RequestFailedException(
+                    f"""
+                    Falha de conexão na requisição de {endpoint}: {error}.
+                    """
+                )
+            else:
+                if consulta.status_code == 200:
+                    logger.debug('requisição realizada com sucesso.')
+                    return consulta
+                causa, falha = None, falha_transitoria(consulta.status_code, endpoint)
+                if falha is None:
+                    logger.error(f"""
+                            Falha na requisição:
+                            status code: {consulta.status_code} \n
+                            url: {kwargs.get('url')}
+                            data:{kwargs.get('data')}
+                            headers: {consulta.headers}
+                            """)
+                    return
+                retry_after = le_retry_after(consulta.headers.get('Retry-After'))
+
+            if tentativa == politica.tentativas:
+                raise falha from causa
+            espera = politica.espera(tentativa, retry_after)
+            logger.warning(f'{type(falha).__name__} na requisição de {endpoint}. '
+                           f'Nova tentativa ({tentativa + 1}/{politica.tentativas}) em {espera:.2f}s.')
+            time.sleep(espera)
 
     def _atualiza_tabela_referencia(self) -> bool:
         """ Função para atualizar o código da tabela de referência para efetuar buscas no web site oficial da FIPE. Ela
@@ -498,7 +902,11 @@ class FipeAPI:
         bool
             True (verdadeiro) se a atualização foi bem sucedida e False (falso) se tiver ocorrido algum erro
         """
-        if not self._req:
+        if self._snapshot is not None:
+            self._define_tabela_referencia(self._snapshot.tabela_referencia, atualizada=True)
+            return True
+
+        if not self._garante_conexao():
             raise NotConnectedException(
                 """
                     Não há conexão ativa para atualizar a tabela de referência.
@@ -510,7 +918,7 @@ class FipeAPI:
 
         logger.debug("Fazendo a requisição de tabela de referência à FIPE ...")
 
-        consulta = self._faz_requisicao(url=f'{self._url}/{self._api_root}/ConsultarTabelaDeReferencia')
+        consulta = self._faz_requisicao(url=protocolo.url_endpoint(protocolo.TABELA_REFERENCIA))
 
         if not consulta:
             raise RequestFailedException(f"""
@@ -519,233 +927,211 @@ class FipeAPI:
 
         resultado = consulta.json()
         logger.debug(f'consulta realizada com sucesso. Dados obtidos > {resultado}')
-        self._tabela_referencia = resultado
-        self._salva_cache('tabela de referência', self._chave_tabela_referencia, resultado)
+        self._define_tabela_referencia(resultado, atualizada=True)
+        self._salva_cache(TABELA_REFERENCIA, self._chave_tabela_referencia, resultado)
         return True
 
-    def pega_marcas(self) -> List:
+    def _busca(self, origem: str, chave: str, memoria: CacheLRU, requisita: Callable[[], Any],
+               referencia: int = None) -> Any:
+        """ Método interno que procura o valor na memória, depois no cache e, por último, faz a requisição à FIPE.
+        Threads que pedem a mesma chave ao mesmo tempo aguardam uma única busca. No modo offline, consulta direto o
+        snapshot """
+        if self._snapshot is not None:
+            return self._converte(origem, requisita())
+
+        try:
+            return memoria[chave]
+        except KeyError:
+            pass
+
+        valor = self._coalescedor.executa((origem, chave),
+                                          lambda: self._pega_ou_requisita(origem, chave, requisita, referencia))
+        memoria[chave] = valor  # noqa
+        return valor
+
+    def _pega_ou_requisita(self, origem: str, chave: str, requisita: Callable[[], Any],
+                           referencia: int = None) -> Any:
+        """ Método interno que procura o valor no cache e, se não encontrar, faz a requisição à FIPE """
+        _cache = self._pega_cache(origem, chave)
+
+        if not _cache:
+            _cache = self._requisita_coordenado(origem, chave, lambda: self._converte(origem, requisita()), referencia)
+
+        return self._converte(origem, _cache)
+
+    def _converte(self, origem: str, valor: Any) -> Any:
+        """ Método interno que converte as listas de modelos e de anos/modelo em colunas, se colunar estiver ativo """
+        if self._colunar and origem in (chaves.MODELOS, chaves.ANOS_MODELO):
+            return colunar.colunar(valor)
+        return valor
+
+    def _requisita_coordenado(self, origem: str, chave: str, requisita: Callable[[], Any],
+                              referencia: int = None) -> Any:
+        """ Método interno que faz a requisição à FIPE e salva o resultado em cache. Com o Redis, apenas um processo
+        por vez faz a requisição de uma chave; os demais aguardam o valor aparecer no cache """
+        token = None
+        if self._trava_redis is not None:
+            token = self._trava_redis.adquire(chave)
+            if token is None:
+                logger.debug(f'Outro processo está consultando {origem} com a chave {chave}. Aguardando o cache ...')
+                _cache = self._trava_redis.aguarda(chave, lambda: self._pega_cache(origem, chave))
+                if _cache:
+                    return _cache
+
+        try:
+            logger.info('Efetuando consulta à FIPE.')
+            valor = requisita()
+            self._salva_cache(origem=origem, chave=chave, valor=valor, referencia=referencia)
+            return valor
+        finally:
+            if token:
+                self._trava_redis.libera(chave, token)
+
+    def pega_marcas(self, consulta: Consulta = None, tipado: bool = False) -> List:
         """
         Faz requisição para a API oficial FIPE para pegar todas as marcas de acordo com os parâmetros
+
+        Parameters
+        ----------
+        consulta: Consulta, optional
+            Consulta criada com cria_consulta. Se não for informada, utiliza os dados selecionados
+        tipado: bool, optional
+            Se True, retorna a lista de registros Marca (registros.py) em vez de dicionários. Default: False
+
         Returns
         -------
         List:
             Lista dos modelos com dicionário com codigo e marca
         """
 
-        self._verifica_condicoes_pesquisa()
-
-        chave = f'{self._codigo_tipo_veiculo_corrente}{self._codigo_referencia_corrente}'
-
-        try:
-            return self._marcas[chave]
-        except KeyError:
-            pass
-
-        _cache = self._pega_cache('marcas', chave)
-
-        if _cache:
-            self._marcas[chave] = _cache # noqa
-            return _cache
+        consulta = self._verifica_consulta(consulta) if consulta else self._consulta_corrente()
 
-        logger.info('Efetuando consulta à FIPE.')
+        chave = protocolo.chave_marcas(consulta)
 
-        # Faz a requisição a API da FIPE
-        data = {
-            'codigoTabelaReferencia': self._codigo_referencia_corrente,
-            'codigoTipoVeiculo': self._codigo_tipo_veiculo_corrente
-        }
+        marcas = self._busca(origem='marcas', chave=chave, memoria=self._marcas,
+                             requisita=lambda: self._requisita_marcas(consulta), referencia=consulta.referencia)
+        return registros.lista(Marca, marcas) if tipado else marcas
 
-        res = self._faz_requisicao(url=f'{self._url}/{self._api_root}/ConsultarMarcas',
-                                   data=data)
+    def _requisita_marcas(self, consulta: Consulta) -> List:
+        """ Método interno para fazer a requisição das marcas à API da FIPE """
+        if self._snapshot is not None:
+            return self._snapshot.marcas(consulta)
+        res = self._faz_requisicao(url=protocolo.url_endpoint(protocolo.MARCAS),
+                                   data=protocolo.dados_marcas(consulta))
 
         if not res:
             raise RequestFailedException(f"""
             Falha na requisição de marcas
             """)
 
-        conteudo = res.json()
-        _dados_reformatados = list()
-
-        # Reformatando os dados para ficarem mais apresentáveis
-        for item in conteudo:
-            _dados_reformatados.append({'codigo': int(item['Value']), 'marca': item['Label'].strip()})
-
-        self._salva_cache(origem='marcas', chave=chave, valor=_dados_reformatados)
-        self._marcas[chave] = _dados_reformatados # noqa
-        return _dados_reformatados
+        return protocolo.formata_marcas(res.json())
 
-    def pega_modelos(self) -> List:
+    def pega_modelos(self, consulta: Consulta = None, tipado: bool = False) -> List:
         """
         Função interna para pegar todos os modelos de uma determinada marca de veículos
 
+        Parameters
+        ----------
+        consulta: Consulta, optional
+            Consulta criada com cria_consulta. Se não for informada, utiliza os dados selecionados
+        tipado: bool, optional
+            Se True, retorna a lista de registros Modelo (registros.py) em vez de dicionários. Default: False
+
         Returns
         --------
         List:
             Lista dos modelos
         """
 
-        self._verifica_condicoes_pesquisa()
+        consulta = self._verifica_consulta(consulta, marca=True) if consulta \
+            else self._consulta_corrente(marca=True)
 
-        if not self._codigo_marca_corrente:
-            raise IncorrectValueException(
-                f"""
-                A marca não foi selecionada. Selecione a marca com a função "seleciona_marca"
-                """
-            )
+        chave = protocolo.chave_modelos(consulta)
 
-        chave = f'{self._codigo_tipo_veiculo_corrente}' \
-                f'{self._codigo_referencia_corrente}' \
-                f'{self._codigo_marca_corrente}'
-
-        try:
-            return self._modelos[chave]
-        except KeyError:
-            pass
+        modelos = self._busca(origem='modelos', chave=chave, memoria=self._modelos,
+                              requisita=lambda: self._requisita_modelos(consulta), referencia=consulta.referencia)
+        return registros.lista(Modelo, modelos) if tipado else modelos
 
-        _cache = self._pega_cache('modelos', chave)
+    def _requisita_modelos(self, consulta: Consulta) -> List:
+        """ Método interno para fazer a requisição dos modelos à API da FIPE """
+        if self._snapshot is not None:
+            return self._snapshot.modelos(consulta)
+        resposta = self._faz_requisicao(url=protocolo.url_endpoint(protocolo.MODELOS),
+                                        data=protocolo.dados_modelos(consulta))
 
-        if _cache:
-            self._modelos[chave] = _cache  # noqa
-            return _cache
-
-        logger.info(f'Efetuando consulta à FIPE.')
-
-        # Faz a requisição a API da FIPE
-        data = {
-            'codigoTabelaReferencia': self._codigo_referencia_corrente,
-            'codigoTipoVeiculo': self._codigo_tipo_veiculo_corrente,
-            'codigoModelo': '',
-            'codigoMarca': self._codigo_marca_corrente,
-            'ano': '',
-            'codigoTipoCombustivel': '',
-            'anoModelo': '',
-            'modeloCodigoExterno': ''
-        }
-
-        consulta = self._faz_requisicao(url=f'{self._url}/{self._api_root}/ConsultarModelos',
-                                        data=data)
-
-        if not consulta:
+        if not resposta:
             raise RequestFailedException(f"""
             Falha na requisição de modelos
             """)
 
-        conteudo = consulta.json()['Modelos']
+        return protocolo.formata_modelos(resposta.json())
 
-        # Reformatação dos dados
-        _reformatado = list()
-        for item in conteudo:
-            _reformatado.append({'codigo': item['Value'], 'modelo': item['Label']})
-        self._salva_cache(origem='modelos', chave=chave, valor=_reformatado)
-        self._modelos[chave] = _reformatado  # noqa
-        return _reformatado
-
-    def pega_anos_modelo(self) -> List:
+    def pega_anos_modelo(self, consulta: Consulta = None, tipado: bool = False) -> List:
         """ Função interna para pegar todos os Ano/modelos de uma determinado modelo e marca de veículos
+
+        Parameters
+        ----------
+        consulta: Consulta, optional
+            Consulta criada com cria_consulta. Se não for informada, utiliza os dados selecionados
+        tipado: bool, optional
+            Se True, retorna a lista de registros AnoModelo (registros.py) em vez de dicionários. Default: False
+
         Returns
         --------
         List:
             Lista dos modelos
         """
 
-        self._verifica_condicoes_pesquisa()
+        consulta = self._verifica_consulta(consulta, marca=True, modelo=True) if consulta \
+            else self._consulta_corrente(marca=True, modelo=True)
 
-        if not self._codigo_marca_corrente:
-            raise IncorrectValueException(
-                f"""
-                        A marca não foi selecionada. Selecione a marca com a função "seleciona_marca"
-                """
-            )
-
-        if not self._codigo_modelo_corrente:
-            raise IncorrectValueException(
-                f"""
-                        O modelo do veículo não foi selecionado. Selecione a marca com a função "seleciona_modelo"
-                """
-            )
-
-        chave = f'{self._codigo_tipo_veiculo_corrente}' \
-                f'{self._codigo_referencia_corrente}' \
-                f'{self._codigo_marca_corrente}' \
-                f'{self._codigo_modelo_corrente}'
-
-        try:
-            return self._anos_modelo[chave]
-        except KeyError:
-            pass
+        chave = protocolo.chave_anos_modelo(consulta)
 
-        _cache = self._pega_cache('anos-modelo', chave)
+        anos = self._busca(origem='anos-modelo', chave=chave, memoria=self._anos_modelo,
+                           requisita=lambda: self._requisita_anos_modelo(consulta), referencia=consulta.referencia)
+        return registros.lista(AnoModelo, anos) if tipado else anos
 
-        if _cache:
-            self._anos_modelo[chave] = _cache  # noqa
-            return _cache
-
-        logger.info(f'Efetuando consulta à FIPE.')
-
-        # Faz a requisição a API da FIPE
-        data = {
-            'codigoTabelaReferencia': self._codigo_referencia_corrente,
-            'codigoTipoVeiculo': self._codigo_tipo_veiculo_corrente,
-            'codigoModelo': self._codigo_modelo_corrente,
-            'codigoMarca': self._codigo_marca_corrente,
-            'ano': '',
-            'codigoTipoCombustivel': '',
-            'anoModelo': '',
-            'modeloCodigoExterno': ''
-        }
-
-        consulta = self._faz_requisicao(url=f'{self._url}/{self._api_root}/ConsultarAnoModelo',
-                                        data=data)
+    def _requisita_anos_modelo(self, consulta: Consulta) -> List:
+        """ Método interno para fazer a requisição dos anos/modelo à API da FIPE """
+        if self._snapshot is not None:
+            return self._snapshot.anos_modelo(consulta)
+        resposta = self._faz_requisicao(url=protocolo.url_endpoint(protocolo.ANOS_MODELO),
+                                        data=protocolo.dados_anos_modelo(consulta))
 
-        if not consulta:
+        if not resposta:
             raise RequestFailedException(f"""
                     Falha na requisição de Anos modelo de veículo
                     """)
 
-        conteudo = consulta.json()
-
-        # Reformata os dados
-        _reformatado = list()
-        _combustiveis = {'Gasolina': GASOLINA,
-                         'Álcool': ALCOOL,
-                         'Diesel': DIESEL}
-        for item in conteudo:
-            _s = item['Value'].split("-")
-            _reformatado.append({'ano': int(_s[0]),
-                                 'combustivel': int(_s[1]),
-                                 'descricao': item['Label'],
-                                 'codigo': item['Value']})
-        self._salva_cache(origem='anos-modelo', chave=chave, valor=_reformatado)
-        self._anos_modelo[chave] = _reformatado  # noqa
-        return _reformatado
-
-    def consulta_preco_veiculo(self, ano: int, combustivel: int) -> Dict:
-        """ Função para consultar preço de veículo na tabela FIPE """
+        return protocolo.formata_anos_modelo(resposta.json())
 
-        self._verifica_condicoes_pesquisa()
+    def consulta_preco_veiculo(self, ano: int, combustivel: int, consulta: Consulta = None,
+                               tipado: bool = False) -> Union[Dict, Preco]:
+        """ Função para consultar preço de veículo na tabela FIPE
 
-        if not self._codigo_marca_corrente:
-            raise IncorrectValueException(
-                f"""
-                        A marca não foi selecionada. Selecione a marca com a função "seleciona_marca"
-                """
-            )
+        Parameters
+        ----------
+        ano: int
+            Ano do modelo
+        combustivel: int
+            Combustível do veículo (GASOLINA, ALCOOL ou DIESEL)
+        consulta: Consulta, optional
+            Consulta criada com cria_consulta. Se não for informada, utiliza os dados selecionados
+        tipado: bool, optional
+            Se True, retorna o registro Preco (registros.py) em vez do dicionário. Default: False
 
-        if not self._codigo_modelo_corrente:
-            raise IncorrectValueException(
-                f"""
-                        O modelo do veículo não foi selecionado. Selecione a marca com a função "seleciona_modelo"
-                """
-            )
+        Returns
+        --------
+        Dict:
+            Dados do veículo retornados pela FIPE
+        """
 
-        if combustivel not in [GASOLINA, ALCOOL, DIESEL]:
-            raise IncorrectValueException(
-                f"""
-                      O combustível informado é inválido.
-                 """
-            )
+        consulta = self._verifica_consulta(consulta, marca=True, modelo=True) if consulta \
+            else self._consulta_corrente(marca=True, modelo=True)
 
-        if not self._verifica_ano_modelo(ano=ano, combustivel=combustivel):
+        protocolo.verifica_combustivel(combustivel)
+
+        if not self._verifica_ano_modelo(consulta, ano=ano, combustivel=combustivel):
             raise IncorrectValueException(
                 f"""
                      O ano ou o combustível informado estão incorretos. Não foi localizado com a marca e modelo
@@ -753,78 +1139,238 @@ class FipeAPI:
                 """
             )
 
-        chave = f'{self._codigo_tipo_veiculo_corrente}' \
-                f'{self._codigo_referencia_corrente}' \
-                f'{self._codigo_marca_corrente}' \
-                f'{self._codigo_modelo_corrente}-' \
-                f'{ano}-{combustivel}'
-
-        try:
-            return self._preco[chave]
-        except KeyError:
-            pass
-
-        _cache = self._pega_cache('anos-modelo', chave)
+        chave = protocolo.chave_preco(consulta, ano=ano, combustivel=combustivel)
+
+        def requisita():
+            _conteudo = self._requisita_preco(consulta, ano=ano, combustivel=combustivel)
+            self._salva_codigo_fipe(consulta, conteudo=_conteudo)
+            return _conteudo
+
+        preco = self._busca(origem='preco', chave=chave, memoria=self._preco, requisita=requisita,
+                            referencia=consulta.referencia)
+        return Preco.do_dict(preco) if tipado else preco
+
+    def consulta_preco_por_codigo_fipe(self, codigo_fipe: str, ano: int, combustivel: int,
+                                       consulta: Consulta = None, tipado: bool = False) -> Union[Dict, Preco]:
+        """ Consulta o preço do veículo pelo Código FIPE com uma única requisição à FIPE (tipoConsulta "codigo"),
+        sem localizar marca, modelo e ano/modelo. Os preços ficam em cache separado dos preços consultados por
+        marca e modelo
+
+        Parameters
+        ----------
+        codigo_fipe: str
+            Código FIPE do veículo (por exemplo, "004381-8")
+        ano: int
+            Ano do modelo
+        combustivel: int
+            Combustível do veículo (GASOLINA, ALCOOL ou DIESEL)
+        consulta: Consulta, optional
+            Consulta criada com cria_consulta (apenas o tipo de veículo e a referência são utilizados). Se não for
+            informada, utiliza os dados selecionados
+        tipado: bool, optional
+            Se True, retorna o registro Preco (registros.py) em vez do dicionário. Default: False
 
-        if _cache:
-            self._anos_modelo[chave] = _cache  # noqa
-            return _cache
+        Returns
+        --------
+        Dict:
+            Dados do veículo retornados pela FIPE
+        """
 
-        logger.info(f'Efetuando consulta à FIPE.')
+        consulta = self._verifica_consulta(consulta) if consulta else self._consulta_corrente()
+        protocolo.verifica_combustivel(combustivel)
+        chave = protocolo.chave_preco_codigo_fipe(consulta, codigo_fipe, ano=ano, combustivel=combustivel)
+
+        preco = self._busca(origem=chaves.PRECO_CODIGO_FIPE, chave=chave, memoria=self._preco_codigo_fipe,
+                            requisita=lambda: self._requisita_preco_por_codigo_fipe(consulta, codigo_fipe, ano=ano,
+                                                                                    combustivel=combustivel),
+                            referencia=consulta.referencia)
+        return Preco.do_dict(preco) if tipado else preco
+
+    def _requisita_preco_por_codigo_fipe(self, consulta: Consulta, codigo_fipe: str, ano: int,
+                                         combustivel: int) -> Dict:
+        """ Método interno para fazer a requisição do preço pelo Código FIPE à API da FIPE """
+        if self._snapshot is not None:
+            return self._snapshot.preco_por_codigo_fipe(consulta, codigo_fipe, ano=ano, combustivel=combustivel)
+        resposta = self._faz_requisicao(url=protocolo.url_endpoint(protocolo.PRECO),
+                                        data=protocolo.dados_preco_por_codigo_fipe(consulta, codigo_fipe, ano=ano,
+                                                                                   combustivel=combustivel))
+
+        if not resposta:
+            raise RequestFailedException("""
+                    Falha na requisição de consulta de preço pelo Código FIPE
+                    """)
 
-        tipos = {1: 'carro', 2: 'moto', 3: 'caminhao'}
+        return protocolo.verifica_preco(resposta.json(), f'{codigo_fipe} {ano}-{combustivel}')
 
-        #if _ano_modelo[0] == "Zero KM":
-        #    _ano_modelo[0] = 32000
+    def consulta_precos_em_lote(self,
+                                especificacoes: Iterable[EspecificacaoVeiculo],
+                                max_workers: int = 8) -> Iterator[ResultadoLote]:
+        """ Consulta o preço de vários veículos de uma vez. As listas de marcas, modelos e anos/modelo são buscadas
+        uma única vez por chave distinta e os preços distintos são consultados em paralelo, limitado a max_workers
+        requisições simultâneas.
 
-        # Faz a requisição a API da FIPE
-        data = {
-            'codigoTabelaReferencia': self._codigo_referencia_corrente,
-            'codigoTipoVeiculo': self._codigo_tipo_veiculo_corrente,
-            'codigoModelo': self._codigo_modelo_corrente,
-            'codigoMarca': self._codigo_marca_corrente,
-            'codigoTipoCombustivel': combustivel,
-            'anoModelo': ano,
-            'modeloCodigoExterno': '',
-            'tipoVeiculo': tipos[self._codigo_tipo_veiculo_corrente],
-            'tipoConsulta': 'tradicional'
-        }
+        Parameters
+        ----------
+        especificacoes: Iterable[EspecificacaoVeiculo]
+            Veículos a consultar (também aceita dicionários ou tuplas com os mesmos campos)
+        max_workers: int, optional
+            Número máximo de requisições simultâneas. Default: 8
 
-        consulta = self._faz_requisicao(url=f'{self._url}/{self._api_root}/ConsultarValorComTodosParametros',
-                                        data=data)
+        Returns
+        --------
+        Iterator[ResultadoLote]:
+            Resultados na mesma ordem das especificações. Itens com falha possuem a exceção no campo erro
+        """
+        return consulta_precos_em_lote(self, especificacoes, max_workers=max_workers)
+
+    def historico_precos(self,
+                         marca: Union[str, int],
+                         modelo: Union[str, int],
+                         ano: int,
+                         combustivel: int = GASOLINA,
+                         tipo_veiculo: int = CARRO,
+                         mes_inicial: int = None,
+                         ano_inicial: int = None,
+                         mes_final: int = None,
+                         ano_final: int = None,
+                         max_workers: int = 8) -> HistoricoPrecos:
+        """ Consulta o preço de um veículo em cada mês de referência do mês inicial ao final (inclusive), em
+        paralelo e lendo o cache de uma só vez. Ver historico.historico_precos
 
-        if not consulta:
+        Returns
+        --------
+        HistoricoPrecos:
+            Arrays NumPy alinhados com os meses (datas), os códigos de referência e os preços em reais
+        """
+        return historico_precos(self, marca=marca, modelo=modelo, ano=ano, combustivel=combustivel,
+                                tipo_veiculo=tipo_veiculo, mes_inicial=mes_inicial, ano_inicial=ano_inicial,
+                                mes_final=mes_final, ano_final=ano_final, max_workers=max_workers)
+
+    def _requisita_preco(self, consulta: Consulta, ano: int, combustivel: int) -> Dict:
+        """ Método interno para fazer a requisição do preço à API da FIPE """
+        if self._snapshot is not None:
+            return self._snapshot.preco(consulta, ano=ano, combustivel=combustivel)
+        resposta = self._faz_requisicao(url=protocolo.url_endpoint(protocolo.PRECO),
+                                        data=protocolo.dados_preco(consulta, ano=ano, combustivel=combustivel))
+
+        if not resposta:
             raise RequestFailedException(f"""
                     Falha na requisição de consulta de preço
                     """)
 
-        conteudo = consulta.json()
-
-        self._salva_cache(origem='preco', chave=chave, valor=conteudo)
-        self._preco[chave] = conteudo  # noqa
-        self._salva_codigo_fipe(**conteudo)
-        return conteudo
+        return resposta.json()
 
-    def _salva_codigo_fipe(self, **kwargs):
-        """ Função para salvar o código fipe de um determinado veículo, modelo e ano """
-        if not self._cache or not self._use_redis:
+    def _salva_codigo_fipe(self, consulta: Consulta, conteudo: Dict):
+        """ Função para salvar no índice por Código FIPE os códigos do veículo e os seus anos/modelo. A entrada não
+        depende do mês, então é gravada sem leitura prévia e apenas quando muda neste processo; os anos/modelo já
+        conhecidos pelo processo são mantidos. Os preços ficam nas chaves de preço """
+        codigo_fipe = (conteudo or {}).get('CodigoFipe')
+        if not codigo_fipe:
             return
-        try:
-            referencia = kwargs.get('MesReferencia').strip().split(" ")
-            self._salva_cache(origem='tabela-fipe', chave=kwargs.get('CodigoFipe'), valor={
-                'marca': kwargs.get('Marca'),
-                'modelo': kwargs.get('Modelo'),
-                'ano_modelo': kwargs.get('AnoModelo'),
-                'combustivel': kwargs.get('Combustivel'),
-                'tipo_veiculo': kwargs.get('TipoVeiculo'),
-                'ano_referencia': referencia[2],
-                'mes_referencia': referencia[0],
-                'data_consulta': kwargs.get('DataConsulta'),
-                'valor': kwargs.get('Valor'),
-            })
-        except Exception as error:
-            logger.error(
-                f"""
-                Ocorreu erro ao salvar os dados da tabela fipe: {kwargs}. Mensagem de erro: {error}
-                """
-            )
+        memoria = self._memoria.origem(chaves.CODIGO_FIPE)
+        chave_indice = protocolo.chave_codigo_fipe(codigo_fipe)
+        anterior = memoria.get(chave_indice) or {}
+        anos = [(item['ano'], item['combustivel']) for item in self.pega_anos_modelo(consulta)]
+        if (anterior.get('marca'), anterior.get('modelo')) == (consulta.marca, consulta.modelo):
+            anos += [tuple(item) for item in anterior.get('anos', [])]
+        indice = protocolo.indice_codigo_fipe(consulta, anos)
+        if anterior != indice:
+            memoria[chave_indice] = indice
+            self._salva_cache(origem=chaves.CODIGO_FIPE, chave=chave_indice, valor=indice)
+
+    def _requisita_anos_por_codigo_fipe(self, consulta: Consulta, codigo_fipe: str) -> List:
+        """ Método interno para fazer a requisição dos anos/modelo pelo Código FIPE à API da FIPE. Retorna a lista
+        vazia se o Código FIPE não existir no tipo de veículo """
+        if self._snapshot is not None:
+            return []
+        resposta = self._faz_requisicao(url=protocolo.url_endpoint(protocolo.ANOS_CODIGO_FIPE),
+                                        data=protocolo.dados_anos_por_codigo_fipe(consulta, codigo_fipe))
+
+        if not resposta:
+            raise RequestFailedException("""
+                    Falha na requisição de anos/modelo pelo Código FIPE
+                    """)
+
+        conteudo = resposta.json()
+        return protocolo.formata_anos_modelo(conteudo) if isinstance(conteudo, list) else []
+
+    def _indexa_codigo_fipe(self, codigo_fipe: str, referencia: int, tipo_veiculo: int = None) -> Dict:
+        """ Método interno que monta a entrada do índice de um Código FIPE ainda não consultado com os anos/modelo
+        retornados pela FIPE. A marca e o modelo ficam None até o veículo ser consultado com consulta_preco_veiculo """
+        tipos = [protocolo.verifica_tipo_veiculo(tipo_veiculo)] if tipo_veiculo else list(protocolo.TIPOS_VEICULO)
+        for tipo in tipos:
+            consulta = Consulta(tipo_veiculo=tipo, referencia=referencia)
+            anos = self._requisita_anos_por_codigo_fipe(consulta, codigo_fipe)
+            if anos:
+                indice = protocolo.indice_codigo_fipe(consulta, [(item['ano'], item['combustivel']) for item in anos])
+                chave_indice = protocolo.chave_codigo_fipe(codigo_fipe)
+                self._memoria.origem(chaves.CODIGO_FIPE)[chave_indice] = indice
+                self._salva_cache(origem=chaves.CODIGO_FIPE, chave=chave_indice, valor=indice)
+                return indice
+
+        raise ValueNotFoundException(
+            f"""
+            O Código FIPE "{codigo_fipe}" não foi encontrado na FIPE.
+            """
+        )
+
+    def consulta_por_codigo_fipe(self, codigo_fipe: str, mes: int = None, ano: int = None,
+                                 tipo_veiculo: int = None) -> Dict:
+        """ Consulta os preços de todos os anos/modelo de um Código FIPE no mês de referência sem localizar marca e
+        modelo. O índice por Código FIPE guarda os códigos do veículo e os seus anos/modelo, então os preços já
+        salvos são lidos com uma única ida ao cache. Os preços que faltam são consultados na FIPE pelo Código FIPE,
+        uma requisição por ano/modelo. Um Código FIPE fora do índice é procurado na FIPE e passa a fazer parte dele
+
+        Parameters
+        ----------
+        codigo_fipe: str
+            Código FIPE do veículo (por exemplo, "004381-8")
+        mes: int, optional
+            Mês de referência. Default: mês atual
+        ano: int, optional
+            Ano de referência. Default: ano atual
+        tipo_veiculo: int, optional
+            Tipo de veículo, utilizado apenas quando o Código FIPE não está no índice. Default: procura em todos
+
+        Returns
+        --------
+        Dict:
+            Códigos do veículo (tipo_veiculo, marca e modelo, None se ainda não conhecidos), referencia e os preços
+            (lista com os dados retornados pela FIPE para cada ano/modelo e combustível existente no mês)
+        """
+        referencia = self._pega_codigo_referencia(mes, ano)
+        codigo_fipe = protocolo.normaliza_codigo_fipe(codigo_fipe)
+        memoria = self._memoria.origem(chaves.CODIGO_FIPE)
+        chave_indice = protocolo.chave_codigo_fipe(codigo_fipe)
+
+        if chave_indice not in memoria:
+            self.pre_carrega_cache(chaves.CODIGO_FIPE, [chave_indice])
+        indice = memoria.get(chave_indice)
+        if not indice or not indice.get('anos'):
+            indice = self._indexa_codigo_fipe(codigo_fipe, referencia, tipo_veiculo)
+
+        consulta = Consulta(tipo_veiculo=indice['tipo_veiculo'], referencia=referencia, marca=indice['marca'],
+                            modelo=indice['modelo'])
+        # sem marca e modelo conhecidos, os preços ficam nas chaves dos preços consultados pelo Código FIPE
+        if consulta.modelo is None:
+            origem, memoria_precos = chaves.PRECO_CODIGO_FIPE, self._preco_codigo_fipe
+            chaves_precos = {(a, c): protocolo.chave_preco_codigo_fipe(consulta, codigo_fipe, ano=a, combustivel=c)
+                             for a, c in indice['anos']}
+        else:
+            origem, memoria_precos = chaves.PRECO, self._preco
+            chaves_precos = {(a, c): protocolo.chave_preco(consulta, ano=a, combustivel=c) for a, c in indice['anos']}
+        self.pre_carrega_cache(origem, chaves_precos.values())
+
+        precos = list()
+        for (ano_modelo, combustivel), chave in chaves_precos.items():
+            try:
+                precos.append(self._busca(origem=origem, chave=chave, memoria=memoria_precos,
+                                          requisita=lambda a=ano_modelo, c=combustivel:
+                                          self._requisita_preco_por_codigo_fipe(consulta, codigo_fipe, ano=a,
+                                                                                combustivel=c),
+                                          referencia=referencia))
+            except ValueNotFoundException:
+                logger.debug(f'O ano/modelo {ano_modelo}-{combustivel} de {codigo_fipe} não existe na referência '
+                             f'{referencia}.')
+        return dict(tipo_veiculo=consulta.tipo_veiculo, marca=consulta.marca, modelo=consulta.modelo,
+                    referencia=referencia, codigo_fipe=codigo_fipe, precos=precos)
@@ -0,0 +1,674 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.assincrono
+~~~~~~~~~~~~~~~~~~~
+Cliente assíncrono (asyncio) da API da FIPE. Depende do pacote aiohttp e, para o cache em Redis, do aioredis
+(ou de redis>=4.2). Instale com: pip install fipeapi[async]
+"""
+import asyncio
+import logging
+import os
+import time
+
+from abc import ABC, abstractmethod
+from typing import List, Any, Dict, Callable, Awaitable, Optional, Union
+
+from . import chaves, protocolo, registros
+from .consulta import Consulta
+from .coalescencia import CoalescedorAssincrono
+from .limitador import LimitadorTaxa
+from .memoria import CacheMemoria, CacheLRU
+from .referencias import IndiceReferencias
+from .busca import IndiceBusca
+from .codec import Codec
+from .registros import Marca, Modelo, AnoModelo, Preco
+from .politica import PoliticaCache, TABELA_REFERENCIA
+from .protocolo import CARRO
+from .requisicao import PoliticaRequisicao, falha_transitoria, le_retry_after
+from .exceptions import (
+    IncorrectSettingsException,
+    IncorrectValueException,
+    NotConnectedException,
+    RequestFailedException,
+    RequestTimeoutException,
+    ValueNotFoundException)
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+ERROS_CONEXAO = (ConnectionError, aiohttp.ClientConnectionError) if aiohttp is not None else (ConnectionError,)
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheAssincrono(ABC):
+    """ Interface dos caches utilizados pelo AsyncFipeAPI. Os valores são textos JSON. """
+
+    @abstractmethod
+    async def get(self, chave: str) -> Optional[Union[str, bytes]]:
+        pass
+
+    @abstractmethod
+    async def set(self, chave: str, valor: str, ttl: Optional[int] = None) -> None:
+        pass
+
+    async def fecha(self) -> None:
+        pass
+
+
+class CacheMemoriaAssincrono(CacheAssincrono):
+    """ Cache em memória do processo, útil para testes e para serviços sem Redis """
+
+    def __init__(self):
+        self._dados = dict()
+
+    async def get(self, chave: str) -> Optional[str]:
+        valor, expira = self._dados.get(chave, (None, None))
+        if expira is not None and expira <= time.monotonic():
+            self._dados.pop(chave, None)
+            return None
+        return valor
+
+    async def set(self, chave: str, valor: str, ttl: Optional[int] = None) -> None:
+        self._dados[chave] = (valor, time.monotonic() + ttl if ttl else None)
+
+
+class CacheRedisAssincrono(CacheAssincrono):
+    """ Cache em Redis com cliente assíncrono. Utiliza as mesmas chaves do FipeAPI, então os dois clientes
+    compartilham o cache. """
+
+    def __init__(self, host: str = None, port: int = 6379, db: int = 0, cliente: Any = None):
+        if cliente is None:
+            try:
+                from redis import asyncio as aioredis
+            except ImportError:
+                try:
+                    import aioredis
+                except ImportError:
+                    raise IncorrectSettingsException(
+                        """
+                        Para utilizar o cache assíncrono em Redis é necessário instalar o aioredis
+                        (pip install fipeapi[async]).
+                        """
+                    )
+            cliente = aioredis.Redis(host=host, port=int(port), db=int(db))
+        self._redis = cliente
+
+    @classmethod
+    def do_ambiente(cls) -> Optional['CacheRedisAssincrono']:
+        """ Cria o cache a partir das mesmas variáveis de ambiente utilizadas pelo FipeAPI (USE_REDIS, REDIS_HOST,
+        REDIS_PORT e REDIS_DB). Retorna None se o Redis não estiver habilitado. """
+        if os.environ.get('USE_REDIS', 'False').strip().lower() != 'true':
+            return None
+        host = os.environ.get('REDIS_HOST')
+        if not host:
+            logger.error(
+                """
+                Para fazer conexão com o Redis, é necessário informar o host na variável de ambiente REDIS_HOST
+                """
+            )
+            return None
+        return cls(host=host, port=os.environ.get('REDIS_PORT', 6379), db=os.environ.get('REDIS_DB', 0))
+
+    async def get(self, chave: str) -> Optional[bytes]:
+        return await self._redis.get(chave)
+
+    async def set(self, chave: str, valor: str, ttl: Optional[int] = None) -> None:
+        await self._redis.set(chave, valor, ex=ttl)
+
+    async def fecha(self) -> None:
+        fecha = getattr(self._redis, 'close', None)
+        if fecha is not None:
+            resultado = fecha()
+            if asyncio.iscoroutine(resultado):
+                await resultado
+
+
+class AsyncFipeAPI:
+    """
+    Cliente assíncrono da API oficial FIPE. Possui as mesmas consultas do FipeAPI (cria_consulta, pega_marcas,
+    pega_modelos, pega_anos_modelo e consulta_preco_veiculo), mas todas são corrotinas e não guardam a seleção
+    na instância, de forma que milhares de consultas podem ser feitas ao mesmo tempo no mesmo event loop.
+
+    Exemplo:
+    --------
+        async with AsyncFipeAPI() as api:
+            consulta = await api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+            preco = await api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta)
+
+    Atributes:
+    ---------
+    cache : CacheAssincrono, optional
+        Cache utilizado entre a memória e a FIPE. Default: Redis configurado pelas variáveis de ambiente, se houver
+    sessao : aiohttp.ClientSession, optional
+        Sessão HTTP a ser utilizada. Default: uma nova sessão, fechada em fecha()
+    limite_conexoes : int, optional
+        Número máximo de conexões simultâneas com a FIPE quando a sessão é criada pelo cliente. Default: 100
+    limitador : LimitadorTaxa, optional
+        Limitador de taxa aplicado a todas as requisições à FIPE. Default: sem limite
+    politica_cache : PoliticaCache, optional
+        Política de validade (TTL) das entradas salvas no cache. Default: PoliticaCache()
+    memoria : CacheMemoria, optional
+        Cache em memória, limitado por origem, compartilhado por todas as consultas. Default: CacheMemoria()
+    codec : Codec, optional
+        Serialização e compressão dos valores salvos no cache. Default: variável de ambiente FIPE_CACHE_CODEC ou
+        JSON puro
+    le_chaves_legadas : bool, optional
+        Procura as chaves que faltam no cache no esquema antigo e as migra, como no FipeAPI. Default: variável de
+        ambiente FIPE_LE_CHAVES_LEGADAS ou False
+    politica_requisicao : PoliticaRequisicao, optional
+        Tempos limite e novas tentativas das requisições à FIPE. Default: variáveis de ambiente FIPE_TIMEOUT_CONEXAO,
+        FIPE_TIMEOUT_LEITURA e FIPE_TENTATIVAS ou PoliticaRequisicao()
+    """
+
+    def __init__(self,
+                 cache: Optional[CacheAssincrono] = None,
+                 sessao: Any = None,
+                 limite_conexoes: int = 100,
+                 limitador: Optional[LimitadorTaxa] = None,
+                 politica_cache: Optional[PoliticaCache] = None,
+                 memoria: Optional[CacheMemoria] = None,
+                 codec: Optional[Codec] = None,
+                 politica_requisicao: Optional[PoliticaRequisicao] = None,
+                 le_chaves_legadas: Optional[bool] = None,
+                 is_verbose: bool = False,
+                 silently: bool = False):
+        if silently:
+            logger.setLevel(logging.WARNING)
+        elif is_verbose:
+            logger.setLevel(logging.DEBUG)
+
+        self._sessao = sessao
+        self._sessao_propria = sessao is None
+        self._limite_conexoes = limite_conexoes
+        self._limitador = limitador
+        self._coalescedor = CoalescedorAssincrono()
+        self._politica_cache = politica_cache or PoliticaCache()
+        self._codec = codec or Codec.do_ambiente()
+        self._politica_requisicao = politica_requisicao or PoliticaRequisicao.do_ambiente()
+        self._cache = cache if cache is not None else CacheRedisAssincrono.do_ambiente()
+        self._status_conexao = 0
+        self._trava = None
+
+        self._prefixo_redis = 'fipeAPI'
+        self._chave_tabela_referencia = protocolo.chave_tabela_referencia()
+        self._le_chaves_legadas = os.environ.get('FIPE_LE_CHAVES_LEGADAS', 'False').strip().lower() == 'true'
+        if le_chaves_legadas is not None:
+            self._le_chaves_legadas = le_chaves_legadas
+        self._tabela_referencia = None
+        self._tabela_carregada_em = 0.0
+        self._indice_referencias = IndiceReferencias([])
+        # índices de busca de marcas e modelos, reutilizados enquanto a lista em memória for a mesma
+        self._indices_busca = CacheLRU(max_itens=256, tamanho=lambda valor: 0)
+
+        self._memoria = memoria or CacheMemoria()
+        self._marcas = self._memoria.origem(chaves.MARCAS)
+        self._modelos = self._memoria.origem(chaves.MODELOS)
+        self._anos_modelo = self._memoria.origem(chaves.ANOS_MODELO)
+        self._preco = self._memoria.origem(chaves.PRECO)
+        self._preco_codigo_fipe = self._memoria.origem(chaves.PRECO_CODIGO_FIPE)
+
+    @property
+    def memoria(self) -> CacheMemoria:
+        """ Cache em memória da instância, com os contadores de acertos, falhas e remoções de cada origem """
+        return self._memoria
+
+    async def __aenter__(self) -> 'AsyncFipeAPI':
+        await self.conectar()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.fecha()
+
+    @property
+    def status_conexao(self) -> int:
+        return self._status_conexao
+
+    async def conectar(self) -> bool:
+        """ Estabelece conexão com o web site da FIPE para pegar os cookies de sessão """
+        if self._trava is None:
+            self._trava = asyncio.Lock()
+
+        if self._sessao is None:
+            if aiohttp is None:
+                raise IncorrectSettingsException(
+                    """
+                    Para utilizar o AsyncFipeAPI é necessário instalar o aiohttp (pip install fipeapi[async]).
+                    """
+                )
+            self._sessao = aiohttp.ClientSession(headers=protocolo.CABECALHOS,
+                                                 connector=aiohttp.TCPConnector(limit=self._limite_conexoes))
+
+        try:
+            logger.info(f'iniciando conexão para o site {protocolo.URL} ...')
+            await self._aguarda_limite()
+            async with self._sessao.get(protocolo.URL, headers=protocolo.CABECALHOS,
+                                        timeout=self._timeout()) as resposta:
+                self._status_conexao = resposta.status
+        except Exception as error:
+            logger.error(f'Ocorreu o seguinte erro na tentativa de conexão: {error}.')
+            self._status_conexao = 0
+            return False
+
+        if self._status_conexao < 400:
+            logger.info('Conexão estabelecida com sucesso!')
+            return True
+        logger.info(f'Ocorreu um erro na conexão. Resposta: {self._status_conexao}.')
+        return False
+
+    async def fecha(self) -> None:
+        """ Fecha a sessão HTTP (se tiver sido criada pelo cliente) e o cache """
+        if self._sessao is not None and self._sessao_propria:
+            await self._sessao.close()
+            self._sessao = None
+        if self._cache is not None:
+            await self._cache.fecha()
+
+    async def _garante_conexao(self) -> None:
+        """ Método interno para conectar na primeira consulta ou refazer a conexão que falhou """
+        if self._status_conexao and self._status_conexao < 400:
+            return
+        if self._trava is None:
+            self._trava = asyncio.Lock()
+        async with self._trava:
+            if not self._status_conexao or self._status_conexao >= 400:
+                await self.conectar()
+        if not self._status_conexao or self._status_conexao >= 400:
+            raise NotConnectedException(
+                """
+            Para fazer requisições de dados é necessário estabelecer conexão.
+                 """)
+
+    async def _aguarda_limite(self) -> None:
+        """ Método interno para aguardar o limitador de taxa sem bloquear o event loop. O limitador remoto
+        (LimitadorTaxaRedis) é consultado em uma thread do executor padrão """
+        if self._limitador is None:
+            return
+        espera = await self._tenta_adquirir()
+        while espera:
+            await asyncio.sleep(espera)
+            espera = await self._tenta_adquirir()
+
+    async def _tenta_adquirir(self) -> float:
+        """ Método interno que tenta adquirir um token do limitador de taxa """
+        if not self._limitador.remoto:
+            return self._limitador.tenta_adquirir()
+        return await asyncio.get_running_loop().run_in_executor(None, self._limitador.tenta_adquirir)
+
+    def _timeout(self, endpoint: Optional[str] = None) -> Any:
+        """ Método interno que converte os tempos limite da política para o aiohttp """
+        if aiohttp is None:
+            return None
+        conexao, leitura = self._politica_requisicao.timeout(endpoint)
+        return aiohttp.ClientTimeout(sock_connect=conexao, sock_read=leitura)
+
+    async def _faz_requisicao(self, endpoint: str, data: Dict = None) -> Any:
+        """ Método interno para fazer requisição á API. Retorna o conteúdo JSON ou None em caso de falha. As falhas
+        transitórias são tentadas novamente conforme a política de requisição, como no FipeAPI """
+        politica = self._politica_requisicao
+        for tentativa in range(1, politica.tentativas + 1):
+            retry_after = None
+            await self._aguarda_limite()
+            try:
+                async with self._sessao.post(protocolo.url_endpoint(endpoint),
+                                             data=data,
+                                             headers=protocolo.CABECALHOS,
+                                             timeout=self._timeout(endpoint)) as resposta:
+                    if resposta.status == 200:
+                        logger.debug('requisição realizada com sucesso.')
+                        return await resposta.json(content_type=None)
+                    causa, falha = None, falha_transitoria(resposta.status, endpoint)
+                    if falha is None:
+                        logger.error(f"""
+                                Falha na requisição:
+                                status code: {resposta.status} \n
+                                endpoint: {endpoint}
+                                data:{data}
+                                """)
+                        return None
+                    retry_after = le_retry_after(resposta.headers.get('Retry-After'))
+            except asyncio.TimeoutError as error:
+                causa, falha = error, RequestTimeoutException(
+                    f"""
+                    Tempo esgotado na requisição de {endpoint}.
+                    """
+                )
+            except ERROS_CONEXAO as error:
+                causa, falha = error, RequestFailedException(
+                    f"""
+                    Falha de conexão na requisição de {endpoint}: {error}.
+                    """
+                )
+
+            if tentativa == politica.tentativas:
+                raise falha from causa
+            espera = politica.espera(tentativa, retry_after)
+            logger.warning(f'{type(falha).__name__} na requisição de {endpoint}. '
+                           f'Nova tentativa ({tentativa + 1}/{politica.tentativas}) em {espera:.2f}s.')
+            await asyncio.sleep(espera)
+
+    def _referencia_atual(self) -> Optional[int]:
+        """ Método interno que retorna o código da referência mais recente da tabela carregada """
+        try:
+            return int(self._tabela_referencia[0]['Codigo'])
+        except (TypeError, IndexError, KeyError, ValueError):
+            return None
+
+    async def _salva_cache(self, origem: str, chave: str, valor: Any, referencia: int = None) -> bool:
+        """ Método interno para salvar os dados em cache com o TTL definido pela política de cache """
+        if self._cache is None:
+            return False
+        ttl = self._politica_cache.ttl(origem, referencia=referencia, referencia_atual=self._referencia_atual())
+        try:
+            await self._cache.set(chaves.completa(self._prefixo_redis, chave), self._codec.codifica(valor), ttl=ttl)
+        except Exception as error:
+            logger.error(f"""
+            Erro ao salvar o de {origem}: \n
+            chave: {chave} \n
+            error: {error}
+            """)
+            return False
+        return True
+
+    async def _pega_cache(self, origem: str, chave: str) -> Any:
+        """ Método interno para pegar o cache das informações  """
+        if self._cache is None:
+            return False
+
+        logger.debug(f'pesquisando cache para {origem} com a chave {chave} ... ')
+
+        try:
+            _cache = await self._cache.get(chaves.completa(self._prefixo_redis, chave))
+        except Exception as error:
+            logger.error(f"""
+            Falha em obter o cache. \n
+            origem: {origem} \n
+            chave: {chave} \n
+            Mensagem de erro: {error}
+            """)
+            return False
+
+        if _cache:
+            return self._codec.decodifica(_cache)
+        if self._le_chaves_legadas:
+            return await self._migra_cache_legado(origem, chave)
+        return False
+
+    async def _migra_cache_legado(self, origem: str, chave: str) -> Any:
+        """ Método interno que procura o valor na chave equivalente do esquema antigo e, se ele for compatível,
+        copia-o para a chave nova """
+        legada = chaves.legada(chave)
+        if legada is None:
+            return False
+
+        try:
+            _cache = await self._cache.get(f'{self._prefixo_redis}-{legada}')
+            valor = self._codec.decodifica(_cache) if _cache else None
+        except Exception as error:
+            logger.error(f'Falha em obter o cache antigo {legada} ({origem}): {error}')
+            return False
+
+        if not valor or not chaves.valida_legado(chave, valor):
+            return False
+
+        logger.debug(f'Migrando o cache antigo {legada} para a chave {chave} ({origem}).')
+        await self._salva_cache(origem, chave, valor, referencia=chaves.referencia(chave))
+        return valor
+
+    async def _atualiza_tabela_referencia(self) -> bool:
+        """ Atualiza a tabela de referência (meses/ano e seus códigos) a partir do cache ou da FIPE """
+        _cache_tabela = await self._pega_cache(TABELA_REFERENCIA, self._chave_tabela_referencia)
+        if _cache_tabela:
+            self._define_tabela_referencia(_cache_tabela)
+            if protocolo.tabela_atualizada(_cache_tabela):
+                logger.debug('A Tabela de referências está atualizada e cacheada.')
+                return True
+
+        resultado = await self._faz_requisicao(protocolo.TABELA_REFERENCIA)
+
+        if not resultado:
+            raise RequestFailedException("""
+            Falha na requisição de atualização de tabela
+            """)
+
+        self._define_tabela_referencia(resultado)
+        await self._salva_cache(TABELA_REFERENCIA, self._chave_tabela_referencia, resultado)
+        return True
+
+    def _define_tabela_referencia(self, tabela: List[Dict]) -> None:
+        """ Método interno que guarda a tabela de referência e monta o seu índice uma única vez """
+        self._tabela_referencia = tabela
+        self._tabela_carregada_em = time.monotonic()
+        self._indice_referencias = IndiceReferencias(tabela)
+
+    def _tabela_vencida(self) -> bool:
+        """ Método interno que verifica se a tabela de referência precisa ser carregada. A tabela em memória vence
+        depois de ttl_tabela_referencia, como a entrada do cache, para que um cliente de longa duração veja os meses
+        publicados depois de carregá-la """
+        if not self._tabela_referencia:
+            return True
+        ttl = self._politica_cache.ttl_tabela_referencia
+        return ttl is not None and time.monotonic() - self._tabela_carregada_em >= ttl
+
+    async def _carrega_tabela_referencia(self) -> None:
+        """ Método interno para garantir que a tabela de referência foi carregada e não venceu """
+        await self._garante_conexao()
+        if not self._tabela_vencida():
+            return
+        async with self._trava:
+            if not self._tabela_vencida():
+                return
+            try:
+                atualizada = await self._atualiza_tabela_referencia()
+            except RequestFailedException as error:
+                if not self._tabela_referencia:
+                    raise
+                # mantém a tabela vencida e tenta novamente depois de mais um ttl_tabela_referencia
+                logger.warning(f'Falha ao atualizar a tabela de referência, mantendo a anterior: {error}')
+                self._tabela_carregada_em = time.monotonic()
+                atualizada = True
+            if not atualizada:
+                raise ValueNotFoundException(
+                    """
+                        Não foi possível pegar o código da tabela de referência.
+                    """
+                )
+
+    async def cria_consulta(self,
+                            tipo_veiculo: int = CARRO,
+                            mes: int = None,
+                            ano: int = None,
+                            marca: Union[str, int] = None,
+                            modelo: Union[str, int] = None) -> Consulta:
+        """ Resolve os parâmetros informados para os códigos da FIPE e retorna uma consulta imutável. Ver
+        FipeAPI.cria_consulta """
+        await self._carrega_tabela_referencia()
+        consulta = Consulta(tipo_veiculo=protocolo.verifica_tipo_veiculo(tipo_veiculo),
+                            referencia=protocolo.pega_codigo_referencia(self._indice_referencias,
+                                                                        mes_referencia=mes,
+                                                                        ano_referencia=ano))
+        if marca is not None:
+            if isinstance(marca, str):
+                marca = protocolo.localiza_marca(await self.indice_marcas(consulta), marca)
+            consulta = consulta.com_marca(marca)
+        if modelo is not None:
+            self._verifica_consulta(consulta, marca=True)
+            if isinstance(modelo, str):
+                modelo = protocolo.localiza_modelo(await self.indice_modelos(consulta), modelo)
+            consulta = consulta.com_modelo(modelo)
+        return consulta
+
+    def _indice_busca(self, chave: str, lista: List[Dict], campo: str) -> IndiceBusca:
+        """ Método interno que retorna o índice de busca da lista, montado uma vez enquanto a lista em memória for
+        a mesma """
+        guardado = self._indices_busca.get(chave)
+        if guardado is not None and guardado[0] is lista:
+            return guardado[1]
+        indice = IndiceBusca(lista, campo)
+        self._indices_busca[chave] = (lista, indice)
+        return indice
+
+    async def indice_marcas(self, consulta: Consulta) -> IndiceBusca:
+        """ Índice de busca das marcas da consulta (tipo de veículo e referência) """
+        return self._indice_busca(protocolo.chave_marcas(consulta), await self.pega_marcas(consulta), 'marca')
+
+    async def indice_modelos(self, consulta: Consulta) -> IndiceBusca:
+        """ Índice de busca dos modelos da marca da consulta """
+        return self._indice_busca(protocolo.chave_modelos(consulta), await self.pega_modelos(consulta), 'modelo')
+
+    @staticmethod
+    def _verifica_consulta(consulta: Consulta, marca: bool = False, modelo: bool = False) -> Consulta:
+        """ Método interno para verificar se a consulta possui a marca e o modelo necessários """
+        if not isinstance(consulta, Consulta):
+            raise IncorrectValueException(
+                """
+                Informe a consulta criada com a função "cria_consulta".
+                """
+            )
+        if marca and not consulta.marca:
+            raise IncorrectValueException(
+                """
+                A marca não foi selecionada. Informe a marca em "cria_consulta"
+                """
+            )
+        if modelo and not consulta.modelo:
+            raise IncorrectValueException(
+                """
+                O modelo do veículo não foi selecionado. Informe o modelo em "cria_consulta"
+                """
+            )
+        return consulta
+
+    async def _busca(self, origem: str, chave: str, memoria: CacheLRU, requisita: Callable[[], Awaitable[Any]],
+                     referencia: int = None) -> Any:
+        """ Procura o valor na memória, depois no cache e, por último, faz a requisição à FIPE """
+        try:
+            return memoria[chave]
+        except KeyError:
+            pass
+
+        async def pega_ou_requisita():
+            _cache = await self._pega_cache(origem, chave)
+            if _cache:
+                return _cache
+
+            await self._garante_conexao()
+            logger.info('Efetuando consulta à FIPE.')
+
+            _valor = await requisita()
+            await self._salva_cache(origem=origem, chave=chave, valor=_valor, referencia=referencia)
+            return _valor
+
+        # corrotinas que pedem a mesma chave ao mesmo tempo aguardam uma única busca
+        valor = await self._coalescedor.executa((origem, chave), pega_ou_requisita)
+        memoria[chave] = valor  # noqa
+        return valor
+
+    async def _requisita(self, endpoint: str, data: Dict, descricao: str) -> Any:
+        """ Método interno para fazer a requisição e levantar exceção em caso de falha """
+        conteudo = await self._faz_requisicao(endpoint, data=data)
+        if conteudo is None:
+            raise RequestFailedException(f"""
+            Falha na requisição de {descricao}
+            """)
+        return conteudo
+
+    async def pega_marcas(self, consulta: Consulta, tipado: bool = False) -> List:
+        """ Pega todas as marcas do tipo de veículo e referência da consulta (registros Marca se tipado) """
+        self._verifica_consulta(consulta)
+
+        async def requisita():
+            conteudo = await self._requisita(protocolo.MARCAS, protocolo.dados_marcas(consulta), 'marcas')
+            return protocolo.formata_marcas(conteudo)
+
+        marcas = await self._busca(origem='marcas', chave=protocolo.chave_marcas(consulta),
+                                   memoria=self._marcas, requisita=requisita, referencia=consulta.referencia)
+        return registros.lista(Marca, marcas) if tipado else marcas
+
+    async def pega_modelos(self, consulta: Consulta, tipado: bool = False) -> List:
+        """ Pega todos os modelos da marca da consulta (registros Modelo se tipado) """
+        self._verifica_consulta(consulta, marca=True)
+
+        async def requisita():
+            conteudo = await self._requisita(protocolo.MODELOS, protocolo.dados_modelos(consulta), 'modelos')
+            return protocolo.formata_modelos(conteudo)
+
+        modelos = await self._busca(origem='modelos', chave=protocolo.chave_modelos(consulta),
+                                    memoria=self._modelos, requisita=requisita, referencia=consulta.referencia)
+        return registros.lista(Modelo, modelos) if tipado else modelos
+
+    async def pega_anos_modelo(self, consulta: Consulta, tipado: bool = False) -> List:
+        """ Pega todos os anos/modelo do modelo da consulta (registros AnoModelo se tipado) """
+        self._verifica_consulta(consulta, marca=True, modelo=True)
+
+        async def requisita():
+            conteudo = await self._requisita(protocolo.ANOS_MODELO, protocolo.dados_anos_modelo(consulta),
+                                             'Anos modelo de veículo')
+            return protocolo.formata_anos_modelo(conteudo)
+
+        anos = await self._busca(origem='anos-modelo', chave=protocolo.chave_anos_modelo(consulta),
+                                 memoria=self._anos_modelo, requisita=requisita,
+                                 referencia=consulta.referencia)
+        return registros.lista(AnoModelo, anos) if tipado else anos
+
+    async def consulta_preco_veiculo(self, ano: int, combustivel: int, consulta: Consulta,
+                                     tipado: bool = False) -> Union[Dict, Preco]:
+        """ Consulta o preço do veículo da consulta para o ano e combustível informados (registro Preco se
+        tipado) """
+        self._verifica_consulta(consulta, marca=True, modelo=True)
+        protocolo.verifica_combustivel(combustivel)
+
+        if not protocolo.possui_ano_modelo(await self.pega_anos_modelo(consulta), ano=ano, combustivel=combustivel):
+            raise IncorrectValueException(
+                """
+                     O ano ou o combustível informado estão incorretos. Não foi localizado com a marca e modelo
+                     selecionados.
+                """
+            )
+
+        async def requisita():
+            return await self._requisita(protocolo.PRECO,
+                                         protocolo.dados_preco(consulta, ano=ano, combustivel=combustivel),
+                                         'consulta de preço')
+
+        chave = protocolo.chave_preco(consulta, ano=ano, combustivel=combustivel)
+        preco = await self._busca(origem='preco', chave=chave, memoria=self._preco, requisita=requisita,
+                                  referencia=consulta.referencia)
+        return Preco.do_dict(preco) if tipado else preco
+
+    async def consulta_preco_por_codigo_fipe(self, codigo_fipe: str, ano: int, combustivel: int,
+                                             consulta: Consulta, tipado: bool = False) -> Union[Dict, Preco]:
+        """ Consulta o preço pelo Código FIPE com uma única requisição, sem localizar marca e modelo. Apenas o tipo
+        de veículo e a referência da consulta são utilizados """
+        self._verifica_consulta(consulta)
+        protocolo.verifica_combustivel(combustivel)
+
+        async def requisita():
+            conteudo = await self._requisita(protocolo.PRECO,
+                                             protocolo.dados_preco_por_codigo_fipe(consulta, codigo_fipe, ano=ano,
+                                                                                   combustivel=combustivel),
+                                             'consulta de preço pelo Código FIPE')
+            return protocolo.verifica_preco(conteudo, f'{codigo_fipe} {ano}-{combustivel}')
+
+        chave = protocolo.chave_preco_codigo_fipe(consulta, codigo_fipe, ano=ano, combustivel=combustivel)
+        preco = await self._busca(origem=chaves.PRECO_CODIGO_FIPE, chave=chave, memoria=self._preco_codigo_fipe,
+                                  requisita=requisita, referencia=consulta.referencia)
+        return Preco.do_dict(preco) if tipado else preco
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.backends
+~~~~~~~~~~~~~~~~~
+Backends do cache compartilhado (entre a memória do processo e a FIPE). Todos possuem a mesma interface
+(get, set, mget, mset e delete, com TTL em segundos) e guardam os valores já serializados. Falhas do armazenamento
+são levantadas como CacheException.
+
+    BackendMemoria: memória do processo, útil para testes
+    BackendRedis: Redis, compartilhado entre processos e servidores
+    BackendRedisAgrupado: Redis, com as entradas agrupadas em hashes por mês de referência e por marca
+    BackendSQLite: arquivo SQLite local, que sobrevive ao reinício do processo
+"""
+import sqlite3
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import redis
+
+from . import chaves
+from .exceptions import CacheException
+
+
+Valor = Union[str, bytes]
+
+# Número máximo de chaves por comando nas operações em lote
+TAMANHO_LOTE = 1000
+
+
+class BackendCache(ABC):
+    """ Interface dos backends de cache. Os backends implementam ao menos get, set e delete """
+
+    @abstractmethod
+    def get(self, chave: str) -> Optional[Valor]:
+        pass
+
+    @abstractmethod
+    def set(self, chave: str, valor: Valor, ttl: Optional[int] = None) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, *chaves: str) -> int:
+        pass
+
+    def mget(self, chaves: Iterable[str]) -> List[Optional[Valor]]:
+        """ Retorna os valores das chaves, na mesma ordem, com None para as chaves ausentes """
+        return [self.get(chave) for chave in chaves]
+
+    def mset(self, itens: Dict[str, Valor], ttl: Optional[int] = None) -> None:
+        """ Salva vários valores com o mesmo TTL """
+        for chave, valor in itens.items():
+            self.set(chave, valor, ttl=ttl)
+
+    def carrega_grupo(self, tipo_veiculo: int, referencia: int, marca: int = None) -> Dict[str, Valor]:
+        """ Retorna, com uma única leitura, todas as entradas de um mês de referência (marcas e modelos) ou de uma
+        marca (anos/modelo e preços). Apenas os backends que agrupam as entradas implementam esta leitura; os demais
+        retornam um dicionário vazio """
+        return dict()
+
+    def verifica(self) -> bool:
+        """ Verifica se o armazenamento está acessível """
+        return True
+
+    def fecha(self) -> None:
+        pass
+
+
+class BackendMemoria(BackendCache):
+    """ Backend em memória do processo, seguro para uso entre threads """
+
+    def __init__(self):
+        self._dados: Dict[str, tuple] = dict()
+        self._trava = threading.Lock()
+
+    def get(self, chave: str) -> Optional[Valor]:
+        with self._trava:
+            valor, expira = self._dados.get(chave, (None, None))
+            if expira is not None and expira <= time.monotonic():
+                del self._dados[chave]
+                return None
+            return valor
+
+    def set(self, chave: str, valor: Valor, ttl: Optional[int] = None) -> None:
+        with self._trava:
+            self._dados[chave] = (valor, time.monotonic() + ttl if ttl else None)
+
+    def delete(self, *chaves: str) -> int:
+        with self._trava:
+            return sum(self._dados.pop(chave, None) is not None for chave in chaves)
+
+
+class BackendRedis(BackendCache):
+    """
+    Backend em Redis.
+
+    Atributes:
+    ---------
+    cliente : redis.Redis, optional
+        Conexão já configurada. Se não for informada, é criada a partir de host, port e db
+    host : str, optional
+        Host do Redis
+    port : int, optional
+        Porta do Redis. Default: 6379
+    db : int, optional
+        Banco do Redis. Default: 0
+    """
+
+    def __init__(self, cliente: redis.Redis = None, host: str = None, port: int = 6379, db: int = 0):
+        if cliente is None:
+            cliente = redis.Redis(connection_pool=redis.ConnectionPool(host=host, port=int(port), db=int(db)))
+        self.cliente = cliente
+
+    def get(self, chave: str) -> Optional[bytes]:
+        try:
+            return self.cliente.get(chave)
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+
+    def set(self, chave: str, valor: Valor, ttl: Optional[int] = None) -> None:
+        try:
+            self.cliente.set(chave, valor, ex=ttl)
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+
+    def delete(self, *chaves: str) -> int:
+        if not chaves:
+            return 0
+        try:
+            return self.cliente.delete(*chaves)
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+
+    def mget(self, chaves: Iterable[str]) -> List[Optional[bytes]]:
+        """ Lê as chaves com MGET, em comandos de até TAMANHO_LOTE chaves """
+        chaves = list(chaves)
+        valores = list()
+        try:
+            for inicio in range(0, len(chaves), TAMANHO_LOTE):
+                valores.extend(self.cliente.mget(chaves[inicio:inicio + TAMANHO_LOTE]))
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+        return valores
+
+    def mset(self, itens: Dict[str, Valor], ttl: Optional[int] = None) -> None:
+        """ Salva os valores com SET (e TTL) em um pipeline, com uma ida ao Redis a cada TAMANHO_LOTE chaves """
+        itens = list(itens.items())
+        try:
+            with self.cliente.pipeline(transaction=False) as pipeline:
+                for inicio in range(0, len(itens), TAMANHO_LOTE):
+                    for chave, valor in itens[inicio:inicio + TAMANHO_LOTE]:
+                        pipeline.set(chave, valor, ex=ttl)
+                    pipeline.execute()
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+
+    def verifica(self) -> bool:
+        try:
+            self.cliente.time()
+        except redis.RedisError:
+            return False
+        return True
+
+    def fecha(self) -> None:
+        self.cliente.connection_pool.disconnect()
+
+
+class BackendRedisAgrupado(BackendRedis):
+    """
+    Backend em Redis que agrupa as entradas em hashes, reduzindo o número de chaves no Redis:
+
+        <prefixo>:v2:grupo:<tipo>:<referência>           marcas e modelos de cada marca
+        <prefixo>:v2:grupo:<tipo>:<referência>:<marca>   anos/modelo e preços da marca
+
+    As leituras em lote utilizam HMGET, uma marca inteira pode ser carregada com um HGETALL (carrega_grupo) e um
+    mês de referência é descartado com um único DEL (invalida_referencia). As demais chaves (tabela de referência,
+    Código FIPE, etc.) continuam como chaves simples.
+
+    O TTL é aplicado ao hash inteiro, então as entradas são separadas por classe de validade: as entradas sem TTL
+    (meses já fechados) ficam nos hashes "grupo", que nunca expiram, e as entradas com TTL (mês corrente) ficam nos
+    hashes equivalentes "grupo-ttl", cuja validade é redefinida a cada gravação. Como o TTL do mês corrente nunca
+    passa do fim do mês, os hashes temporários expiram na virada do mês, e uma gravação não altera a validade das
+    entradas da outra classe. As leituras consultam as duas classes na mesma ida ao Redis.
+
+    Atributes:
+    ---------
+    cliente : redis.Redis, optional
+        Conexão já configurada. Se não for informada, é criada a partir de host, port e db
+    host : str, optional
+        Host do Redis
+    port : int, optional
+        Porta do Redis. Default: 6379
+    db : int, optional
+        Banco do Redis. Default: 0
+    prefixo : str, optional
+        Prefixo das chaves utilizado pelo cliente. Default: fipeAPI
+    """
+
+    GRUPO = 'grupo'
+    GRUPO_TEMPORARIO = 'grupo-ttl'
+
+    # origem: (número de códigos que identificam o hash, número total de códigos da chave)
+    _AGRUPAMENTO = {
+        chaves.MARCAS: (2, 2),
+        chaves.MODELOS: (2, 3),
+        chaves.ANOS_MODELO: (3, 4),
+        chaves.PRECO: (3, 6),
+    }
+
+    def __init__(self,
+                 cliente: redis.Redis = None,
+                 host: str = None,
+                 port: int = 6379,
+                 db: int = 0,
+                 prefixo: str = 'fipeAPI'):
+        super(BackendRedisAgrupado, self).__init__(cliente=cliente, host=host, port=port, db=db)
+        self._raiz = chaves.completa(prefixo, '')
+        self._prefixos_grupo = (chaves.completa(prefixo, self.GRUPO), chaves.completa(prefixo, self.GRUPO_TEMPORARIO))
+
+    def _nome_grupo(self, *partes, temporario: bool = False) -> str:
+        return chaves.chave(self._prefixos_grupo[temporario], *partes)
+
+    def _nomes_grupo(self, *partes) -> Tuple[str, str]:
+        """ Hashes permanente e temporário do grupo """
+        return self._nome_grupo(*partes), self._nome_grupo(*partes, temporario=True)
+
+    def _indice_marcas(self, tipo_veiculo: int, referencia: int, temporario: bool = False) -> str:
+        """ Conjunto com as marcas que possuem hash no mês de referência """
+        return self._nome_grupo(tipo_veiculo, referencia, 'marcas', temporario=temporario)
+
+    def _localiza(self, chave: str) -> Optional[Tuple[str, List[str]]]:
+        """ Retorna o campo e os códigos do grupo de uma chave ou None se ela não é agrupada """
+        if not chave.startswith(self._raiz):
+            return None
+        origem, partes = chaves.separa(chave[len(self._raiz):])
+        agrupamento = self._AGRUPAMENTO.get(origem)
+        if agrupamento is None or len(partes) != agrupamento[1]:
+            return None
+        return chaves.chave(origem, *partes[agrupamento[0]:]), partes[:agrupamento[0]]
+
+    def _chave_do_campo(self, grupo: List, campo: str) -> str:
+        origem, resto = chaves.separa(campo)
+        return self._raiz + chaves.chave(origem, *grupo, *resto)
+
+    def get(self, chave: str) -> Optional[bytes]:
+        return self.mget([chave])[0]
+
+    def set(self, chave: str, valor: Valor, ttl: Optional[int] = None) -> None:
+        self.mset({chave: valor}, ttl=ttl)
+
+    def mget(self, chaves_cache: Iterable[str]) -> List[Optional[bytes]]:
+        """ Lê as chaves simples com MGET e as agrupadas com um HMGET por hash (permanente e temporário), tudo em
+        uma única ida ao Redis """
+        chaves_cache = list(chaves_cache)
+        simples = list()
+        grupos = defaultdict(list)
+        for i, chave in enumerate(chaves_cache):
+            local = self._localiza(chave)
+            if local is None:
+                simples.append(i)
+                continue
+            for nome in self._nomes_grupo(*local[1]):
+                grupos[nome].append((i, local[0]))
+
+        valores: List[Optional[bytes]] = [None] * len(chaves_cache)
+        try:
+            with self.cliente.pipeline(transaction=False) as pipeline:
+                if simples:
+                    pipeline.mget([chaves_cache[i] for i in simples])
+                for nome, campos in grupos.items():
+                    pipeline.hmget(nome, [campo for _, campo in campos])
+                resultados = iter(pipeline.execute())
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+
+        if simples:
+            for i, valor in zip(simples, next(resultados)):
+                valores[i] = valor
+        for campos in grupos.values():
+            for (i, _), valor in zip(campos, next(resultados)):
+                if valor is not None:
+                    valores[i] = valor
+        return valores
+
+    def mset(self, itens: Dict[str, Valor], ttl: Optional[int] = None) -> None:
+        """ Salva as chaves simples com SET e as agrupadas com HSET em um pipeline. Com TTL, as entradas vão para os
+        hashes temporários, cuja validade é redefinida; sem TTL, para os hashes permanentes. A mesma entrada é
+        removida do hash da outra classe """
+        temporario = bool(ttl)
+        grupos = defaultdict(dict)
+        indices = defaultdict(set)
+        try:
+            with self.cliente.pipeline(transaction=False) as pipeline:
+                for chave, valor in itens.items():
+                    local = self._localiza(chave)
+                    if local is None:
+                        pipeline.set(chave, valor, ex=ttl)
+                        continue
+                    campo, grupo = local
+                    grupos[tuple(grupo)][campo] = valor
+                    if len(grupo) > 2:
+                        indices[self._indice_marcas(grupo[0], grupo[1], temporario=temporario)].add(grupo[2])
+
+                for grupo, campos in grupos.items():
+                    nome = self._nome_grupo(*grupo, temporario=temporario)
+                    pipeline.hset(nome, mapping=campos)
+                    pipeline.hdel(self._nome_grupo(*grupo, temporario=not temporario), *campos)
+                    if temporario:
+                        pipeline.expire(nome, ttl)
+                for nome, marcas in indices.items():
+                    pipeline.sadd(nome, *marcas)
+                    if temporario:
+                        pipeline.expire(nome, ttl)
+                pipeline.execute()
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+
+    def delete(self, *chaves_cache: str) -> int:
+        removidos = 0
+        try:
+            with self.cliente.pipeline(transaction=False) as pipeline:
+                for chave in chaves_cache:
+                    local = self._localiza(chave)
+                    if local is None:
+                        pipeline.delete(chave)
+                    else:
+                        for nome in self._nomes_grupo(*local[1]):
+                            pipeline.hdel(nome, local[0])
+                for resultado in pipeline.execute():
+                    removidos += int(resultado)
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+        return removidos
+
+    def carrega_grupo(self, tipo_veiculo: int, referencia: int, marca: int = None) -> Dict[str, bytes]:
+        """ Carrega com um HGETALL as marcas e os modelos do mês de referência ou, se a marca for informada, os
+        anos/modelo e os preços da marca. As chaves retornadas são as mesmas utilizadas em get e mget """
+        grupo = [tipo_veiculo, referencia] if marca is None else [tipo_veiculo, referencia, marca]
+        try:
+            with self.cliente.pipeline(transaction=False) as pipeline:
+                for nome in self._nomes_grupo(*grupo):
+                    pipeline.hgetall(nome)
+                permanentes, temporarios = pipeline.execute()
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+        return {self._chave_do_campo(grupo, campo.decode('utf-8') if isinstance(campo, bytes) else campo): valor
+                for campo, valor in list(temporarios.items()) + list(permanentes.items())}
+
+    def invalida_referencia(self, tipo_veiculo: int, referencia: int) -> int:
+        """ Descarta todas as entradas de um tipo de veículo e mês de referência (o hash do mês e os hashes de
+        todas as marcas) com um único DEL. Retorna o número de chaves removidas """
+        indices = [self._indice_marcas(tipo_veiculo, referencia, temporario) for temporario in (False, True)]
+        try:
+            marcas = self.cliente.sunion(indices)
+            marcas = [m.decode('utf-8') if isinstance(m, bytes) else m for m in marcas]
+            nomes = [nome for marca in marcas for nome in self._nomes_grupo(tipo_veiculo, referencia, marca)]
+            return self.cliente.delete(*self._nomes_grupo(tipo_veiculo, referencia), *indices, *nomes)
+        except redis.RedisError as error:
+            raise CacheException(error) from error
+
+
+class BackendSQLite(BackendCache):
+    """
+    Backend em um arquivo SQLite local. Os valores sobrevivem ao reinício do processo, então processos em lote e
+    servidores sem Redis também evitam repetir as requisições à FIPE. As entradas expiradas são ignoradas na
+    leitura e removidas em limpa_expirados().
+
+    Atributes:
+    ---------
+    caminho : str, optional
+        Caminho do arquivo. Default: fipeapi-cache.sqlite3
+    """
+
+    _CRIA_TABELA = 'CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL)'
+
+    def __init__(self, caminho: str = 'fipeapi-cache.sqlite3'):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+        try:
+            self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+            self._conexao.execute('PRAGMA journal_mode=WAL')
+            self._conexao.execute(self._CRIA_TABELA)
+        except sqlite3.Error as error:
+            raise CacheException(error) from error
+
+    def _executa(self, sql: str, parametros: Iterable = ()) -> List[tuple]:
+        with self._trava:
+            try:
+                return self._conexao.execute(sql, tuple(parametros)).fetchall()
+            except sqlite3.Error as error:
+                raise CacheException(error) from error
+
+    def get(self, chave: str) -> Optional[Valor]:
+        return self.mget([chave])[0]
+
+    def set(self, chave: str, valor: Valor, ttl: Optional[int] = None) -> None:
+        self.mset({chave: valor}, ttl=ttl)
+
+    def delete(self, *chaves: str) -> int:
+        if not chaves:
+            return 0
+        with self._trava:
+            try:
+                return self._conexao.execute(f'DELETE FROM cache WHERE chave IN ({",".join("?" * len(chaves))})',
+                                             chaves).rowcount
+            except sqlite3.Error as error:
+                raise CacheException(error) from error
+
+    def mget(self, chaves: Iterable[str]) -> List[Optional[Valor]]:
+        chaves = list(chaves)
+        valores = dict()
+        # o SQLite limita o número de parâmetros de uma consulta
+        for inicio in range(0, len(chaves), 500):
+            parte = chaves[inicio:inicio + 500]
+            valores.update(self._executa(
+                f'SELECT chave, valor FROM cache WHERE chave IN ({",".join("?" * len(parte))}) '
+                f'AND (expira IS NULL OR expira > ?)', parte + [time.time()]))
+        return [valores.get(chave) for chave in chaves]
+
+    def mset(self, itens: Dict[str, Valor], ttl: Optional[int] = None) -> None:
+        expira = time.time() + ttl if ttl else None
+        with self._trava:
+            try:
+                # uma única transação para todos os itens
+                self._conexao.execute('BEGIN')
+                try:
+                    self._conexao.executemany('INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)',
+                                              [(chave, valor, expira) for chave, valor in itens.items()])
+                except sqlite3.Error:
+                    self._conexao.execute('ROLLBACK')
+                    raise
+                self._conexao.execute('COMMIT')
+            except sqlite3.Error as error:
+                raise CacheException(error) from error
+
+    def limpa_expirados(self) -> int:
+        """ Remove as entradas expiradas e retorna quantas foram removidas """
+        with self._trava:
+            try:
+                return self._conexao.execute('DELETE FROM cache WHERE expira <= ?', (time.time(),)).rowcount
+            except sqlite3.Error as error:
+                raise CacheException(error) from error
+
+    def fecha(self) -> None:
+        with self._trava:
+            self._conexao.close()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.busca
+~~~~~~~~~~~~~~
+Busca aproximada de marcas e modelos. Os nomes são normalizados (sem acentos, minúsculos e separados em palavras) e
+indexados por trigramas uma vez por lista. Os candidatos que compartilham trigramas com o texto buscado são
+ordenados por pontuação, de 0 a 1:
+
+    1.0          nome idêntico
+    0.90 - 0.99  todas as palavras buscadas são palavras do nome ("gm" em "GM - Chevrolet")
+    0.75 - 0.90  todas as palavras buscadas são início de palavras do nome ("civ" em "Civic Sedan")
+    0.60 - 0.75  o texto buscado está contido no nome
+    0.00 - 0.60  similaridade dos trigramas de cada palavra (erros de digitação)
+"""
+import re
+import unicodedata
+
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set
+
+
+LIMIAR_PADRAO = 0.4
+MAX_CANDIDATOS = 256
+
+
+def normaliza(texto: str) -> str:
+    """ Remove os acentos e a pontuação e converte para minúsculas
+
+    >>> normaliza('  Citroën C4 Picasso/Grand  ')
+    'citroen c4 picasso grand'
+    """
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return ' '.join(re.findall(r'[a-z0-9]+(?:[.,][0-9]+)?', texto))
+
+
+def trigramas(palavra: str) -> FrozenSet[str]:
+    """ Trigramas da palavra, com espaços nas bordas para que palavras curtas também possuam trigramas """
+    palavra = f'  {palavra} '
+    return frozenset(palavra[i:i + 3] for i in range(len(palavra) - 2))
+
+
+def _similaridade(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """ Coeficiente de Dice entre dois conjuntos de trigramas """
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+class ResultadoBusca(NamedTuple):
+    """ Item encontrado na busca. marca é preenchido na busca de modelos de todas as marcas """
+
+    codigo: int
+    nome: str
+    pontuacao: float
+    marca: Optional[int] = None
+
+
+class _Entrada(NamedTuple):
+    codigo: int
+    nome: str
+    marca: Optional[int]
+    normalizado: str
+    palavras: tuple
+    trigramas: tuple
+
+
+class IndiceBusca:
+    """
+    Índice de trigramas de uma lista de marcas ou de modelos.
+
+    Atributes:
+    ---------
+    itens : Iterable[Dict]
+        Lista retornada por pega_marcas ou pega_modelos (com o campo 'codigo_marca' na busca entre marcas)
+    campo : str
+        Campo com o nome do item ('marca' ou 'modelo')
+    """
+
+    def __init__(self, itens: Iterable[Dict], campo: str):
+        self._entradas: List[_Entrada] = list()
+        self._postagens: Dict[str, List[int]] = dict()
+        for item in itens:
+            normalizado = normaliza(item[campo])
+            palavras = tuple(normalizado.split())
+            entrada = _Entrada(codigo=int(item['codigo']), nome=item[campo], marca=item.get('codigo_marca'),
+                               normalizado=normalizado, palavras=palavras,
+                               trigramas=tuple(trigramas(palavra) for palavra in palavras))
+            posicao = len(self._entradas)
+            self._entradas.append(entrada)
+            for trigrama in set().union(*entrada.trigramas):
+                self._postagens.setdefault(trigrama, []).append(posicao)
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    @staticmethod
+    def _pontua(entrada: _Entrada, texto: str, palavras: List[str], trigramas_texto: List[FrozenSet[str]]) -> float:
+        similaridade = sum(max((_similaridade(tri, tri_nome) for tri_nome in entrada.trigramas), default=0.0)
+                           for tri in trigramas_texto) / len(trigramas_texto)
+        if entrada.normalizado == texto:
+            return 1.0
+        if all(palavra in entrada.palavras for palavra in palavras):
+            return 0.9 + 0.09 * similaridade
+        if all(any(nome.startswith(palavra) for nome in entrada.palavras) for palavra in palavras):
+            return 0.75 + 0.15 * similaridade
+        if texto in entrada.normalizado:
+            return 0.6 + 0.15 * similaridade
+        return min(similaridade, 0.59)
+
+    def busca(self, texto: str, limite: int = 10, limiar: float = 0.0) -> List[ResultadoBusca]:
+        """ Retorna os limite itens de maior pontuação, em ordem decrescente, com pontuação maior ou igual ao
+        limiar """
+        texto = normaliza(texto)
+        palavras = texto.split()
+        if not palavras:
+            return []
+        trigramas_texto = [trigramas(palavra) for palavra in palavras]
+
+        votos: Counter = Counter()
+        for trigrama in set().union(*trigramas_texto):
+            votos.update(self._postagens.get(trigrama, ()))
+        candidatos: Set[int] = {posicao for posicao, _ in votos.most_common(MAX_CANDIDATOS)}
+
+        resultados = list()
+        for posicao in candidatos:
+            entrada = self._entradas[posicao]
+            pontuacao = self._pontua(entrada, texto, palavras, trigramas_texto)
+            if pontuacao >= limiar and pontuacao > 0:
+                resultados.append((pontuacao, -posicao, entrada))
+        resultados.sort(reverse=True)
+        return [ResultadoBusca(codigo=entrada.codigo, nome=entrada.nome, pontuacao=round(pontuacao, 4),
+                               marca=entrada.marca)
+                for pontuacao, _, entrada in resultados[:limite]]
+
+    def melhor(self, texto: str, limiar: float = LIMIAR_PADRAO) -> Optional[ResultadoBusca]:
+        """ Item de maior pontuação ou None se nenhum atingir o limiar. Em caso de empate, o primeiro da lista """
+        resultados = self.busca(texto, limite=1, limiar=limiar)
+        return resultados[0] if resultados else None
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.chaves
+~~~~~~~~~~~~~~~
+Esquema das chaves do cache. Cada chave é formada pela origem dos dados e pelos códigos da consulta separados
+por ":" e, no Redis, recebe o prefixo e a versão do esquema, por exemplo:
+
+    fipeAPI:v2:modelos:1:300:23
+    fipeAPI:v2:preco:1:300:23:6100:2020:1
+    fipeAPI:v2:codigo-fipe:004381-8
+    fipeAPI:v2:preco-codigo-fipe:1:300:004381-8:2020:1
+
+Também monta as chaves do esquema antigo (fipeAPI-<códigos concatenados>) para a leitura de compatibilidade.
+Como a concatenação antiga é ambígua, os valores lidos das chaves antigas são validados antes de serem utilizados.
+"""
+from typing import Any, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+
+VERSAO = 'v2'
+SEPARADOR = ':'
+
+# Origens dos dados
+MARCAS = 'marcas'
+MODELOS = 'modelos'
+ANOS_MODELO = 'anos-modelo'
+PRECO = 'preco'
+TABELA_REFERENCIA = 'tabela-referencia'
+CODIGO_FIPE = 'codigo-fipe'
+PRECO_CODIGO_FIPE = 'preco-codigo-fipe'
+
+# Origens cujo segundo código é o da tabela de referência
+ORIGENS_COM_REFERENCIA = (MARCAS, MODELOS, ANOS_MODELO, PRECO, PRECO_CODIGO_FIPE)
+
+
+def chave(origem: str, *partes: Any) -> str:
+    """ Monta a chave (sem prefixo) a partir da origem e dos códigos """
+    return SEPARADOR.join([origem] + [quote(str(p), safe='') for p in partes])
+
+
+def separa(chave_cache: str) -> Tuple[str, List[str]]:
+    """ Separa a chave (sem prefixo) na origem e nos códigos """
+    origem, *partes = chave_cache.split(SEPARADOR)
+    return origem, [unquote(p) for p in partes]
+
+
+def completa(prefixo: str, chave_cache: str) -> str:
+    """ Adiciona o prefixo e a versão do esquema à chave """
+    return f'{prefixo}{SEPARADOR}{VERSAO}{SEPARADOR}{chave_cache}'
+
+
+def referencia(chave_cache: str) -> Optional[int]:
+    """ Retorna o código da tabela de referência contido na chave, se houver """
+    origem, partes = separa(chave_cache)
+    if origem in ORIGENS_COM_REFERENCIA and len(partes) > 1:
+        return int(partes[1])
+    return None
+
+
+def legada(chave_cache: str) -> Optional[str]:
+    """ Monta a chave equivalente do esquema antigo (sem o prefixo "fipeAPI-") ou None se não houver """
+    origem, partes = separa(chave_cache)
+    if origem == TABELA_REFERENCIA:
+        return 'TabelaReferencia'
+    if origem == MARCAS and len(partes) == 2:
+        return ''.join(partes)
+    if origem == MODELOS and len(partes) == 3:
+        return ''.join(partes)
+    if origem == ANOS_MODELO and len(partes) == 4:
+        return ''.join(partes)
+    if origem == PRECO and len(partes) == 6:
+        return f'{"".join(partes[:4])}-{partes[4]}-{partes[5]}'
+    return None
+
+
+def _lista_com(valor: Any, *campos: str) -> bool:
+    return isinstance(valor, list) and all(isinstance(v, dict) and all(c in v for c in campos) for v in valor)
+
+
+def valida_legado(chave_cache: str, valor: Any) -> bool:
+    """ Verifica se o valor lido de uma chave antiga é compatível com a chave nova. As chaves antigas podem colidir
+    entre tipos de dados diferentes, então o formato do valor é conferido antes de ser aproveitado. """
+    origem, partes = separa(chave_cache)
+    if origem == TABELA_REFERENCIA:
+        return _lista_com(valor, 'Codigo', 'Mes')
+    if origem == MARCAS:
+        return _lista_com(valor, 'codigo', 'marca')
+    if origem == MODELOS:
+        return _lista_com(valor, 'codigo', 'modelo')
+    if origem == ANOS_MODELO:
+        return _lista_com(valor, 'ano', 'combustivel', 'codigo')
+    if origem == PRECO:
+        try:
+            return isinstance(valor, dict) and 'Valor' in valor \
+                   and int(valor.get('AnoModelo')) == int(partes[4]) \
+                   and int(valor.get('TipoVeiculo')) == int(partes[0])
+        except (TypeError, ValueError):
+            return False
+    return False
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+import threading
+
+from typing import Optional
+
+from .api import FipeAPI
+
+
+_cliente_padrao: Optional[FipeAPI] = None
+_configuracao_padrao: dict = dict()
+_trava_cliente = threading.RLock()
+
+
+def pega_cliente_padrao() -> FipeAPI:
+    r""" Retorna o cliente compartilhado pelo processo, criando-o na primeira chamada. A sessão HTTP, os cookies,
+    o pool de conexões do Redis e os caches em memória são reaproveitados entre as chamadas.
+    :return: instância compartilhada de FipeAPI
+    :rtype: FipeAPI
+    """
+    global _cliente_padrao
+    if _cliente_padrao is None:
+        with _trava_cliente:
+            if _cliente_padrao is None:
+                _cliente_padrao = FipeAPI(**_configuracao_padrao)
+    return _cliente_padrao
+
+
+def define_cliente_padrao(cliente: Optional[FipeAPI]) -> None:
+    r""" Substitui o cliente compartilhado pelo processo. Informe None para que um novo cliente seja criado na
+    próxima chamada.
+    :param cliente: instância de FipeAPI que passará a ser utilizada pelas funções do módulo
+    """
+    global _cliente_padrao
+    with _trava_cliente:
+        _cliente_padrao = cliente
+
+
+def configura_cliente_padrao(**kwargs) -> None:
+    r""" Define os parâmetros utilizados na criação do cliente compartilhado. O cliente atual é descartado e um
+    novo será criado com os novos parâmetros na próxima chamada.
+    :param kwargs: parâmetros repassados ao construtor de FipeAPI (ex.: is_verbose, silently)
+    """
+    global _cliente_padrao, _configuracao_padrao
+    with _trava_cliente:
+        _configuracao_padrao = dict(kwargs)
+        _cliente_padrao = None
+
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.coalescencia
+~~~~~~~~~~~~~~~~~~~~~
+Coalescência de requisições idênticas em andamento. Quando várias threads (ou corrotinas) pedem a mesma chave ao
+mesmo tempo, apenas uma faz a requisição à FIPE e as demais aguardam o resultado. Entre processos, uma trava curta
+no Redis permite que apenas um processo preencha a chave enquanto os outros aguardam o cache.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+
+from typing import Any, Callable, Dict, Hashable, Optional, Awaitable
+
+import redis
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Chamada:
+    """ Chamada em andamento para uma chave """
+
+    __slots__ = ('evento', 'valor', 'erro')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class Coalescedor:
+    """ Garante que chamadas concorrentes com a mesma chave, no mesmo processo, executem a função uma única vez """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._em_andamento: Dict[Hashable, _Chamada] = dict()
+
+    def executa(self, chave: Hashable, funcao: Callable[[], Any]) -> Any:
+        """ Executa a função ou, se já houver uma chamada em andamento para a chave, aguarda o resultado dela. Se a
+        chamada falhar, todas as threads que aguardavam recebem a mesma exceção. """
+        with self._trava:
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._em_andamento[chave] = chamada
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.valor
+
+        try:
+            chamada.valor = funcao()
+        except Exception as error:
+            chamada.erro = error
+            raise
+        finally:
+            with self._trava:
+                del self._em_andamento[chave]
+            chamada.evento.set()
+        return chamada.valor
+
+
+class CoalescedorAssincrono:
+    """ Versão do Coalescedor para corrotinas de um mesmo event loop """
+
+    def __init__(self):
+        self._em_andamento: Dict[Hashable, asyncio.Future] = dict()
+
+    async def executa(self, chave: Hashable, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(funcao())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_andamento.pop(chave, None))
+        # shield: o cancelamento de quem pediu primeiro não cancela a requisição dos demais
+        return await asyncio.shield(tarefa)
+
+
+class TravaRedis:
+    """
+    Trava curta no Redis para que apenas um processo preencha uma chave do cache por vez.
+
+    Atributes:
+    ---------
+    cliente : redis.Redis
+        Conexão com o Redis
+    prefixo : str, optional
+        Prefixo das chaves das travas. Default: fipeAPI:v2:trava
+    validade : float, optional
+        Tempo máximo, em segundos, que a trava fica ativa se o processo que a obteve morrer. Default: 10
+    espera : float, optional
+        Tempo máximo, em segundos, que os demais processos aguardam o cache ser preenchido. Default: 10
+    intervalo : float, optional
+        Intervalo, em segundos, entre as verificações do cache durante a espera. Default: 0.05
+    """
+
+    _SCRIPT_LIBERA = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self,
+                 cliente: redis.Redis,
+                 prefixo: str = 'fipeAPI:v2:trava',
+                 validade: float = 10,
+                 espera: float = 10,
+                 intervalo: float = 0.05):
+        self._redis = cliente
+        self._prefixo = prefixo
+        self._validade_ms = int(validade * 1000)
+        self._espera = espera
+        self._intervalo = intervalo
+        self._libera = cliente.register_script(self._SCRIPT_LIBERA)
+
+    def _chave(self, chave: str) -> str:
+        return f'{self._prefixo}:{chave}'
+
+    def adquire(self, chave: str) -> Optional[str]:
+        """ Tenta obter a trava. Retorna o identificador da trava ou None se outro processo já a possui. Se o Redis
+        falhar, retorna um identificador vazio e o processo segue sem coordenação. """
+        token = uuid.uuid4().hex
+        try:
+            if self._redis.set(self._chave(chave), token, nx=True, px=self._validade_ms):
+                return token
+            return None
+        except redis.RedisError as error:
+            logger.error(f'Falha ao obter a trava {chave} no Redis: {error}')
+            return ''
+
+    def libera(self, chave: str, token: str) -> None:
+        """ Libera a trava, apenas se ela ainda pertencer a quem a obteve """
+        if not token:
+            return
+        try:
+            self._libera(keys=[self._chave(chave)], args=[token])
+        except redis.RedisError as error:
+            logger.error(f'Falha ao liberar a trava {chave} no Redis: {error}')
+
+    def aguarda(self, chave: str, verifica: Callable[[], Any]) -> Any:
+        """ Aguarda outro processo preencher a chave. Retorna o valor encontrado pela função verifica ou None se a
+        trava foi liberada (ou expirou) sem que o valor aparecesse. """
+        limite = time.monotonic() + self._espera
+        while time.monotonic() < limite:
+            time.sleep(self._intervalo)
+            valor = verifica()
+            if valor:
+                return valor
+            try:
+                if not self._redis.exists(self._chave(chave)):
+                    return verifica() or None
+            except redis.RedisError:
+                return None
+        return None
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.codec
+~~~~~~~~~~~~~~
+Serialização dos valores guardados no cache. Os valores codificados começam com um cabeçalho de 3 bytes:
+
+    0xFA  <serializador: 'j' JSON ou 'm' msgpack>  <compressão: 'n' nenhuma, 'z' zlib ou 's' zstd>
+
+Valores sem o cabeçalho são JSON puro, o formato utilizado pelas versões anteriores, e continuam sendo lidos. O
+codec padrão (JSON sem compressão) grava JSON puro, compatível com as versões anteriores. O msgpack, o zstd e o
+orjson (decodificador JSON mais rápido) são opcionais (pip install fipeapi[codec]). As listas em colunas
+(colunar.ListaColunar) são gravadas como colunas e lidas de volta como listas de dicionários, para que os clientes
+que não utilizam o modo colunar leiam as mesmas entradas; o FipeAPI com colunar=True as converte novamente.
+"""
+import json
+import os
+import zlib
+
+from typing import Any, Optional, Union
+
+from .colunar import ListaColunar, lista_serializada, lista_de_dicionarios
+from .exceptions import IncorrectSettingsException
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+MARCADOR = b'\xfa'
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+ZLIB = 'zlib'
+ZSTD = 'zstd'
+
+_SERIALIZADORES = {JSON: b'j', MSGPACK: b'm'}
+_COMPRESSOES = {None: b'n', ZLIB: b'z', ZSTD: b's'}
+
+
+def _json_dumps(valor: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(valor)
+    return json.dumps(valor, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(dados: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(dados)
+    return json.loads(dados)
+
+
+def _requer(modulo: Any, nome: str) -> Any:
+    if modulo is None:
+        raise IncorrectSettingsException(
+            f"""
+            Para utilizar o formato {nome} no cache é necessário instalar o pacote {nome}
+            (pip install fipeapi[codec]).
+            """
+        )
+    return modulo
+
+
+class Codec:
+    """
+    Codifica e decodifica os valores do cache.
+
+    Atributes:
+    ---------
+    serializador : str, optional
+        'json' ou 'msgpack'. Default: 'json'
+    compressao : str, optional
+        None, 'zlib' ou 'zstd'. Default: None
+    nivel : int, optional
+        Nível de compressão. Default: padrão da biblioteca
+    min_compressao : int, optional
+        Tamanho mínimo, em bytes, para que o valor seja comprimido. Default: 256
+    """
+
+    def __init__(self,
+                 serializador: str = JSON,
+                 compressao: Optional[str] = None,
+                 nivel: Optional[int] = None,
+                 min_compressao: int = 256):
+        if serializador not in _SERIALIZADORES or compressao not in _COMPRESSOES:
+            raise IncorrectSettingsException(
+                f"""
+                Codec de cache inválido: serializador "{serializador}" e compressão "{compressao}".
+                """
+            )
+        if serializador == MSGPACK:
+            _requer(msgpack, 'msgpack')
+        if compressao == ZSTD:
+            _requer(zstandard, 'zstandard')
+        self.serializador = serializador
+        self.compressao = compressao
+        self.nivel = nivel
+        self.min_compressao = min_compressao
+
+    @classmethod
+    def do_texto(cls, texto: Optional[str]) -> 'Codec':
+        """ Cria o codec a partir de um texto como "json", "msgpack", "msgpack+zlib" ou "json+zstd" """
+        if not texto:
+            return cls()
+        partes = texto.strip().lower().split('+')
+        return cls(serializador=partes[0], compressao=partes[1] if len(partes) > 1 else None)
+
+    @classmethod
+    def do_ambiente(cls) -> 'Codec':
+        """ Cria o codec a partir da variável de ambiente FIPE_CACHE_CODEC. Default: JSON puro """
+        return cls.do_texto(os.environ.get('FIPE_CACHE_CODEC'))
+
+    @property
+    def json_puro(self) -> bool:
+        return self.serializador == JSON and self.compressao is None
+
+    def codifica(self, valor: Any) -> bytes:
+        """ Serializa (e comprime) o valor """
+        if isinstance(valor, ListaColunar):
+            valor = valor.serializa()
+        if self.serializador == MSGPACK:
+            dados = msgpack.packb(valor, use_bin_type=True)
+        else:
+            dados = _json_dumps(valor)
+
+        if self.json_puro:
+            return dados
+
+        compressao = self.compressao if len(dados) >= self.min_compressao else None
+        if compressao == ZLIB:
+            dados = zlib.compress(dados, self.nivel if self.nivel is not None else 6)
+        elif compressao == ZSTD:
+            dados = zstandard.ZstdCompressor(level=self.nivel if self.nivel is not None else 3).compress(dados)
+        return MARCADOR + _SERIALIZADORES[self.serializador] + _COMPRESSOES[compressao] + dados
+
+    @staticmethod
+    def decodifica(dados: Union[str, bytes]) -> Any:
+        """ Decodifica um valor gravado por qualquer codec, inclusive o JSON puro das versões anteriores """
+        valor = Codec._decodifica(dados)
+        return lista_de_dicionarios(valor) if lista_serializada(valor) else valor
+
+    @staticmethod
+    def _decodifica(dados: Union[str, bytes]) -> Any:
+        if isinstance(dados, str) or not dados.startswith(MARCADOR):
+            return _json_loads(dados)
+
+        serializador, compressao, dados = dados[1:2], dados[2:3], dados[3:]
+        if compressao == b'z':
+            dados = zlib.decompress(dados)
+        elif compressao == b's':
+            dados = _requer(zstandard, 'zstandard').ZstdDecompressor().decompress(dados)
+        elif compressao != b'n':
+            raise ValueError(f'Compressão desconhecida no cache: {compressao}')
+
+        if serializador == b'm':
+            return _requer(msgpack, 'msgpack').unpackb(dados, raw=False)
+        if serializador == b'j':
+            return _json_loads(dados)
+        raise ValueError(f'Serializador desconhecido no cache: {serializador}')
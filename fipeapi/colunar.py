@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.colunar
+~~~~~~~~~~~~~~~~
+Representação em colunas das listas grandes do catálogo (modelos e anos/modelo), utilizada pelo FipeAPI com
+colunar=True. Em vez de um dicionário por item, cada campo é uma coluna: os códigos inteiros ficam em array('q') e
+os textos em listas de strings compartilhadas (sys.intern). Os itens são lidos por visões (LinhaColunar) criadas
+apenas quando acessadas, com a mesma interface de leitura dos dicionários.
+
+No cache, a lista é gravada pelo Codec como {"_colunar": [campos], "colunas": [[valores], ...]} e lida de volta
+como lista de dicionários (lista_de_dicionarios), de forma que os clientes sem o modo colunar continuam recebendo
+listas comuns. O FipeAPI com colunar=True converte a lista lida em ListaColunar.
+"""
+import sys
+
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+
+MARCA = '_colunar'
+
+Coluna = Union[array, List[Any]]
+
+
+class LinhaColunar(Mapping):
+    """ Visão de um item da ListaColunar, lida como um dicionário """
+
+    __slots__ = ('_lista', '_indice')
+
+    def __init__(self, lista: 'ListaColunar', indice: int):
+        self._lista = lista
+        self._indice = indice
+
+    def __getitem__(self, campo: str) -> Any:
+        return self._lista._colunas[campo][self._indice]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._lista.campos)
+
+    def __len__(self) -> int:
+        return len(self._lista.campos)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ListaColunar(Sequence):
+    """
+    Lista de itens guardada em colunas.
+
+    Atributes:
+    ---------
+    campos : List[str]
+        Campos de cada item, na ordem original
+    colunas : Dict[str, array ou list]
+        Valores de cada campo. Inteiros em array('q') e demais valores em listas
+    """
+
+    def __init__(self, campos: Iterable[str], colunas: Dict[str, Coluna]):
+        self.campos: List[str] = list(campos)
+        self._colunas = colunas
+        self._tamanho = len(colunas[self.campos[0]]) if self.campos else 0
+
+    @classmethod
+    def da_lista(cls, itens: Iterable[Dict]) -> 'ListaColunar':
+        """ Converte a lista de dicionários (todos com os mesmos campos) em colunas """
+        itens = list(itens)
+        campos = list(itens[0]) if itens else []
+        colunas: Dict[str, Coluna] = dict()
+        for campo in campos:
+            valores = [item[campo] for item in itens]
+            colunas[campo] = _coluna(valores)
+        return cls(campos, colunas)
+
+    def coluna(self, campo: str) -> Coluna:
+        """ Valores do campo em todos os itens, sem criar as visões """
+        return self._colunas[campo]
+
+    def como_lista(self) -> List[Dict]:
+        """ Lista de dicionários equivalente """
+        return [dict(zip(self.campos, valores)) for valores in zip(*(self._colunas[c] for c in self.campos))]
+
+    def __len__(self) -> int:
+        return self._tamanho
+
+    def __getitem__(self, indice: Union[int, slice]) -> Union[LinhaColunar, 'ListaColunar']:
+        if isinstance(indice, slice):
+            return ListaColunar(self.campos, {campo: coluna[indice] for campo, coluna in self._colunas.items()})
+        if indice < 0:
+            indice += self._tamanho
+        if not 0 <= indice < self._tamanho:
+            raise IndexError('índice fora da lista')
+        return LinhaColunar(self, indice)
+
+    def __iter__(self) -> Iterator[LinhaColunar]:
+        return (LinhaColunar(self, indice) for indice in range(self._tamanho))
+
+    def __eq__(self, outra: Any) -> bool:
+        if not isinstance(outra, (ListaColunar, list, tuple)):
+            return NotImplemented
+        return len(self) == len(outra) and all(a == b for a, b in zip(self, outra))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'ListaColunar(campos={self.campos}, itens={self._tamanho})'
+
+    def tamanho_aproximado(self) -> int:
+        """ Tamanho aproximado em bytes: os arrays e, nas colunas de texto, as referências e os textos distintos """
+        total = 0
+        for coluna in self._colunas.values():
+            if isinstance(coluna, array):
+                total += coluna.itemsize * len(coluna)
+            else:
+                total += 8 * len(coluna) + sum(len(str(valor)) for valor in set(coluna))
+        return total
+
+    def serializa(self) -> Dict:
+        """ Valor gravado no cache pelo Codec """
+        return {MARCA: self.campos, 'colunas': [list(self._colunas[campo]) for campo in self.campos]}
+
+    @classmethod
+    def deserializa(cls, valor: Dict) -> 'ListaColunar':
+        """ Lê o valor gravado por serializa """
+        return cls(valor[MARCA], {campo: _coluna(valores) for campo, valores in zip(valor[MARCA], valor['colunas'])})
+
+
+def _coluna(valores: List[Any]) -> Coluna:
+    """ array('q') se todos os valores forem inteiros; senão, lista com os textos compartilhados """
+    if all(type(valor) is int for valor in valores):
+        try:
+            return array('q', valores)
+        except OverflowError:
+            return valores
+    return [sys.intern(valor) if type(valor) is str else valor for valor in valores]
+
+
+def colunar(valor: Any) -> Any:
+    """ Converte listas de dicionários com os mesmos campos em ListaColunar. Os demais valores não são alterados """
+    if not isinstance(valor, list) or not valor or not all(isinstance(item, dict) for item in valor):
+        return valor
+    campos = set(valor[0])
+    if any(set(item) != campos for item in valor):
+        return valor
+    return ListaColunar.da_lista(valor)
+
+
+def lista_serializada(valor: Any) -> bool:
+    """ Verifica se o valor lido do cache é uma ListaColunar serializada """
+    return isinstance(valor, dict) and MARCA in valor and 'colunas' in valor
+
+
+def lista_de_dicionarios(valor: Dict) -> List[Dict]:
+    """ Lista de dicionários equivalente à ListaColunar serializada, sem criar as colunas
+
+    >>> lista_de_dicionarios({'_colunar': ['ano', 'codigo'], 'colunas': [[2020, 2019], ['2020-1', '2019-1']]})
+    [{'ano': 2020, 'codigo': '2020-1'}, {'ano': 2019, 'codigo': '2019-1'}]
+    """
+    campos = valor[MARCA]
+    return [dict(zip(campos, valores)) for valores in zip(*valor['colunas'])]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+from typing import NamedTuple, Optional
+
+
+class Consulta(NamedTuple):
+    """
+    Parâmetros imutáveis de uma consulta à FIPE, já resolvidos para os códigos numéricos da API oficial.
+
+    Como não guarda estado na instância de FipeAPI, uma mesma consulta (e um mesmo cliente) podem ser utilizados
+    por várias threads ao mesmo tempo.
+
+    Atributes:
+    ---------
+    tipo_veiculo : int
+        Código do tipo de veículo (CARRO, MOTO ou CAMINHAO)
+    referencia : int
+        Código da tabela de referência (mês/ano)
+    marca : int, optional
+        Código da marca
+    modelo : int, optional
+        Código do modelo
+    """
+
+    tipo_veiculo: int
+    referencia: int
+    marca: Optional[int] = None
+    modelo: Optional[int] = None
+
+    def com_marca(self, marca: int) -> 'Consulta':
+        """ Retorna uma nova consulta com a marca informada e sem modelo selecionado """
+        return self._replace(marca=int(marca), modelo=None)
+
+    def com_modelo(self, modelo: int) -> 'Consulta':
+        """ Retorna uma nova consulta com o modelo informado """
+        return self._replace(modelo=int(modelo))
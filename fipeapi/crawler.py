@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.crawler
+~~~~~~~~~~~~~~~~
+Coleta de todos os preços de um ou mais meses de referência. O catálogo é percorrido (marcas, modelos, anos/modelo
+e preços) com as marcas em um pool limitado de threads, respeitando o limitador de taxa do cliente. Cada marca
+concluída é gravada no arquivo JSONL de saída pela própria thread e registrada no checkpoint, então apenas as marcas
+em andamento ficam em memória e a coleta pode ser retomada depois de uma falha sem repetir as marcas já gravadas.
+As falhas de um modelo ou ano/modelo também são registradas no checkpoint e apenas eles são coletados na retomada.
+"""
+import json
+import logging
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .consulta import Consulta
+from .exceptions import IncorrectSettingsException, IncorrectValueException
+from .protocolo import CARRO, MOTO, CAMINHAO
+
+
+logger = logging.getLogger(__name__)
+
+# (modelo, ano, combustível) de um veículo com falha; ano e combustível None quando a falha é no modelo
+Pendente = Tuple[int, Optional[int], Optional[int]]
+
+
+class ResumoColeta(NamedTuple):
+    """ Resultado de uma execução do Crawler """
+
+    marcas_concluidas: int = 0
+    marcas_retomadas: int = 0
+    precos: int = 0
+    # (referência, tipo de veículo, marca, mensagem de erro)
+    falhas: Tuple[Tuple[int, int, int, str], ...] = ()
+    # (referência, tipo de veículo, marca, modelo, ano ou None, combustível ou None, mensagem de erro)
+    falhas_veiculos: Tuple[Tuple[int, int, int, int, Optional[int], Optional[int], str], ...] = ()
+
+    @property
+    def sucesso(self) -> bool:
+        return not self.falhas and not self.falhas_veiculos
+
+
+def meses_entre(mes_inicial: int, ano_inicial: int, mes_final: int, ano_final: int) -> Iterator[Tuple[int, int]]:
+    """ Gera os pares (mês, ano) do mês inicial ao final, inclusive """
+    if (ano_final, mes_final) < (ano_inicial, mes_inicial):
+        raise IncorrectValueException(
+            f"""
+            O mês final {mes_final}/{ano_final} é anterior ao mês inicial {mes_inicial}/{ano_inicial}.
+            """
+        )
+    mes, ano = mes_inicial, ano_inicial
+    while (ano, mes) <= (ano_final, mes_final):
+        yield mes, ano
+        mes += 1
+        if mes > 12:
+            mes, ano = 1, ano + 1
+
+
+class Crawler:
+    """
+    Coleta todos os preços dos meses de referência informados e grava um registro JSON por linha no arquivo de
+    saída. Cada registro possui a referência, os códigos e nomes da marca e do modelo, o ano, o combustível e o
+    retorno da consulta de preço da FIPE.
+
+    Exemplo:
+    --------
+        crawler = Crawler(FipeAPI(requisicoes_por_segundo=5), saida='fipe.jsonl', checkpoint='fipe.checkpoint')
+        resumo = crawler.executa(mes_inicial=1, ano_inicial=2021, mes_final=3, ano_final=2021)
+
+    Atributes:
+    ---------
+    api : FipeAPI
+        Cliente utilizado nas consultas
+    saida : str
+        Arquivo JSONL onde os preços são gravados
+    checkpoint : str, optional
+        Arquivo com o progresso da coleta. Default: <saida>.checkpoint
+    max_workers : int, optional
+        Número máximo de marcas coletadas ao mesmo tempo. Default: 4
+    tipos_veiculo : Iterable[int], optional
+        Tipos de veículo coletados. Default: CARRO, MOTO e CAMINHAO
+    sobrescreve : bool, optional
+        Permite iniciar uma nova coleta (sem checkpoint) sobre um arquivo de saída que já possui registros,
+        descartando-os. Default: False
+    """
+
+    VERSAO_CHECKPOINT = 1
+
+    def __init__(self,
+                 api: Any,
+                 saida: str,
+                 checkpoint: Optional[str] = None,
+                 max_workers: int = 4,
+                 tipos_veiculo: Iterable[int] = (CARRO, MOTO, CAMINHAO),
+                 sobrescreve: bool = False):
+        self.api = api
+        self.saida = saida
+        self.checkpoint = checkpoint or f'{saida}.checkpoint'
+        self.max_workers = max_workers
+        self.tipos_veiculo = tuple(tipos_veiculo)
+        self.sobrescreve = sobrescreve
+        self._trava = threading.Lock()
+        self._concluidas: Set[str] = set()
+        # (modelo, ano, combustível) com falha de cada marca concluída; ano e combustível None para o modelo todo
+        self._pendentes: Dict[str, Set[Pendente]] = dict()
+        self._posicao = 0
+
+    @staticmethod
+    def _unidade(consulta: Consulta) -> str:
+        """ Identificador da marca no checkpoint """
+        return f'{consulta.referencia}:{consulta.tipo_veiculo}:{consulta.marca}'
+
+    def _carrega_checkpoint(self) -> None:
+        """ Carrega o progresso e descarta do arquivo de saída o que foi gravado depois do último checkpoint. Sem
+        checkpoint, o arquivo de saída só é descartado com sobrescreve """
+        self._concluidas = set()
+        self._pendentes = dict()
+        self._posicao = 0
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint, 'r', encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+            self._concluidas = set(dados.get('concluidas', []))
+            self._pendentes = {unidade: {tuple(item) for item in itens}
+                               for unidade, itens in dados.get('pendentes', {}).items()}
+            self._posicao = int(dados.get('posicao', 0))
+            logger.info(f'Retomando a coleta: {len(self._concluidas)} marcas já concluídas.')
+        elif os.path.exists(self.saida) and os.path.getsize(self.saida) and not self.sobrescreve:
+            raise IncorrectSettingsException(
+                f"""
+                O arquivo de saída {self.saida} já possui registros e não há checkpoint ({self.checkpoint}) para
+                retomar a coleta. Informe outro arquivo de saída ou sobrescreve=True para descartá-lo.
+                """
+            )
+
+        with open(self.saida, 'ab') as arquivo:
+            if arquivo.tell() != self._posicao:
+                logger.warning(f'Descartando os registros de {self.saida} gravados depois do último checkpoint.')
+                arquivo.truncate(self._posicao)
+
+    def _salva_checkpoint(self) -> None:
+        """ Grava o checkpoint de forma atômica. Deve ser chamado com a trava """
+        temporario = f'{self.checkpoint}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'versao': self.VERSAO_CHECKPOINT, 'posicao': self._posicao,
+                       'concluidas': sorted(self._concluidas),
+                       'pendentes': {unidade: sorted(itens, key=str) for unidade, itens in self._pendentes.items()}},
+                      arquivo)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.checkpoint)
+
+    def _grava_marca(self, consulta: Consulta, registros: List[Dict], pendentes: Iterable[Pendente] = ()) -> None:
+        """ Grava os registros de uma marca na saída e registra a marca como concluída, com os modelos e anos/modelo
+        que falharam """
+        linhas = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in registros).encode('utf-8')
+        with self._trava:
+            with open(self.saida, 'ab') as arquivo:
+                arquivo.write(linhas)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+                self._posicao = arquivo.tell()
+            unidade = self._unidade(consulta)
+            self._concluidas.add(unidade)
+            self._pendentes.pop(unidade, None)
+            if pendentes:
+                self._pendentes[unidade] = set(pendentes)
+            self._salva_checkpoint()
+
+    def _coleta_marca(self, consulta: Consulta, nome_marca: str, ordem_marca: int = 0,
+                      pendentes: Optional[Set[Pendente]] = None) -> Tuple[List[Dict], List[Tuple[Pendente, str]]]:
+        """ Coleta todos os preços de uma marca ou, com pendentes, apenas os modelos e anos/modelo informados. As
+        posições da marca, do modelo e do ano/modelo nas listas da FIPE são gravadas para que a ordem das listas possa
+        ser reproduzida (ver snapshot.Snapshot). A falha de um modelo ou ano/modelo é retornada junto aos registros,
+        sem interromper a coleta do restante da marca """
+        registros = list()
+        falhas = list()
+        modelos_pendentes = {modelo for modelo, _, _ in pendentes} if pendentes is not None else None
+        self.api.pre_carrega_grupo(consulta)
+        for ordem_modelo, modelo in enumerate(self.api.pega_modelos(consulta)):
+            codigo_modelo = int(modelo['codigo'])
+            if modelos_pendentes is not None and codigo_modelo not in modelos_pendentes:
+                continue
+            consulta_modelo = consulta.com_modelo(codigo_modelo)
+            try:
+                anos_modelo = self.api.pega_anos_modelo(consulta_modelo)
+            except Exception as error:
+                falhas.append(((codigo_modelo, None, None), str(error).strip()))
+                continue
+            for ordem_ano, ano_modelo in enumerate(anos_modelo):
+                veiculo = (codigo_modelo, ano_modelo['ano'], ano_modelo['combustivel'])
+                if pendentes is not None and veiculo not in pendentes and (codigo_modelo, None, None) not in pendentes:
+                    continue
+                try:
+                    preco = self.api.consulta_preco_veiculo(ano=ano_modelo['ano'],
+                                                            combustivel=ano_modelo['combustivel'],
+                                                            consulta=consulta_modelo)
+                except Exception as error:
+                    falhas.append((veiculo, str(error).strip()))
+                    continue
+                registros.append({'referencia': consulta.referencia,
+                                  'tipo_veiculo': consulta.tipo_veiculo,
+                                  'codigo_marca': consulta.marca,
+                                  'marca': nome_marca,
+                                  'codigo_modelo': consulta_modelo.modelo,
+                                  'modelo': modelo['modelo'],
+                                  'ano': ano_modelo['ano'],
+                                  'combustivel': ano_modelo['combustivel'],
+                                  'descricao': ano_modelo.get('descricao'),
+                                  'ordem_marca': ordem_marca,
+                                  'ordem_modelo': ordem_modelo,
+                                  'ordem_ano': ordem_ano,
+                                  'preco': preco})
+        return registros, falhas
+
+    def _processa_marca(self, consulta: Consulta, nome_marca: str, ordem_marca: int,
+                        pendentes: Optional[Set[Pendente]] = None) -> Tuple[int, List[Tuple[Pendente, str]]]:
+        """ Coleta e grava uma marca na thread do pool. Retorna apenas o número de preços gravados e as falhas, para
+        que os registros não fiquem em memória até o fim da coleta """
+        registros, falhas = self._coleta_marca(consulta, nome_marca, ordem_marca, pendentes)
+        self._grava_marca(consulta, registros, [veiculo for veiculo, _ in falhas])
+        for (modelo, ano, combustivel), erro in falhas:
+            logger.error(f'Falha na coleta do veículo {self._unidade(consulta)}:{modelo}:{ano}:{combustivel}: {erro}')
+        return len(registros), falhas
+
+    def executa(self,
+                mes_inicial: int = None,
+                ano_inicial: int = None,
+                mes_final: int = None,
+                ano_final: int = None) -> ResumoColeta:
+        """ Coleta os meses de referência do mês inicial ao final (inclusive). Sem o mês final, coleta apenas o
+        mês inicial e, sem o mês inicial, o mês atual. As marcas, modelos e anos/modelo com falha são informados no
+        resumo e podem ser coletados executando novamente com o mesmo checkpoint.
+
+        Returns
+        --------
+        ResumoColeta:
+            Número de marcas concluídas e retomadas, número de preços gravados e as falhas de marcas e de veículos
+        """
+        self._carrega_checkpoint()
+
+        if mes_inicial is None or ano_inicial is None:
+            meses = [(mes_inicial, ano_inicial)]
+        else:
+            meses = list(meses_entre(mes_inicial, ano_inicial,
+                                     mes_final or mes_inicial, ano_final or ano_inicial))
+
+        pendentes = list()
+        retomadas = 0
+        for mes, ano in meses:
+            for tipo_veiculo in self.tipos_veiculo:
+                consulta = self.api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes, ano=ano)
+                for ordem, marca in enumerate(self.api.pega_marcas(consulta)):
+                    consulta_marca = consulta.com_marca(int(marca['codigo']))
+                    unidade = self._unidade(consulta_marca)
+                    if unidade not in self._concluidas:
+                        pendentes.append((consulta_marca, marca['marca'], ordem, None))
+                    elif unidade in self._pendentes:
+                        pendentes.append((consulta_marca, marca['marca'], ordem, self._pendentes[unidade]))
+                    else:
+                        retomadas += 1
+
+        logger.info(f'Coletando {len(pendentes)} marcas ({retomadas} já concluídas) ...')
+
+        concluidas = 0
+        precos = 0
+        falhas = list()
+        falhas_veiculos = list()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futuros = {executor.submit(self._processa_marca, *pendente): pendente[0] for pendente in pendentes}
+            for futuro in as_completed(futuros):
+                consulta = futuros.pop(futuro)
+                try:
+                    gravados, falhas_marca = futuro.result()
+                except Exception as error:
+                    logger.error(f'Falha na coleta da marca {self._unidade(consulta)}: {error}')
+                    falhas.append((consulta.referencia, consulta.tipo_veiculo, consulta.marca, str(error).strip()))
+                    continue
+                concluidas += 1
+                precos += gravados
+                falhas_veiculos.extend((consulta.referencia, consulta.tipo_veiculo, consulta.marca) + veiculo + (erro,)
+                                       for veiculo, erro in falhas_marca)
+
+        return ResumoColeta(marcas_concluidas=concluidas, marcas_retomadas=retomadas, precos=precos,
+                            falhas=tuple(falhas), falhas_veiculos=tuple(falhas_veiculos))
+
+
+def le_coleta(saida: str) -> Iterator[Dict]:
+    """ Lê os registros gravados pelo Crawler """
+    with open(saida, 'r', encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            if linha.strip():
+                yield json.loads(linha)
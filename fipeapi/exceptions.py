@@ -35,3 +35,19 @@ class IncorrectSettingsException(Exception):
 
 class RequestFailedException(RequestException):
     pass
+
+
+class RequestTimeoutException(RequestFailedException):
+    """ A FIPE não respondeu dentro do tempo limite em nenhuma das tentativas """
+
+
+class RequestThrottledException(RequestFailedException):
+    """ A FIPE limitou as requisições (HTTP 429) em todas as tentativas """
+
+
+class ServerErrorException(RequestFailedException):
+    """ A FIPE retornou erro no servidor (HTTP 5xx) em todas as tentativas """
+
+
+class CacheException(Exception):
+    """ Falha no armazenamento do cache """
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.historico
+~~~~~~~~~~~~~~~~~~
+Histórico de preços de um veículo em vários meses de referência. Os meses são consultados como um lote
+(lote.consulta_precos_em_lote): os códigos da marca e do modelo são resolvidos uma vez por mês, o cache é lido de
+uma só vez e os preços que faltam são consultados em paralelo. O resultado são arrays NumPy alinhados por mês.
+"""
+from typing import Any, NamedTuple, Union
+
+import numpy as np
+
+from .crawler import meses_entre
+from .exceptions import IncorrectValueException, ValueNotFoundException
+from .lote import EspecificacaoVeiculo, consulta_precos_em_lote
+from .protocolo import CARRO, GASOLINA
+from .utils import valor_em_centavos
+
+
+class HistoricoPrecos(NamedTuple):
+    """
+    Preços de um veículo mês a mês. Os três arrays possuem o mesmo tamanho, um item por mês.
+
+    Atributes:
+    ---------
+    datas : numpy.ndarray
+        Meses de referência (datetime64[M])
+    referencias : numpy.ndarray
+        Códigos da tabela de referência da FIPE (int32). -1 nos meses que não estão na tabela de referência
+    precos : numpy.ndarray
+        Preços em reais (float64). NaN nos meses sem o veículo
+    """
+
+    datas: np.ndarray
+    referencias: np.ndarray
+    precos: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.datas)
+
+
+def historico_precos(api: Any,
+                     marca: Union[str, int],
+                     modelo: Union[str, int],
+                     ano: int,
+                     combustivel: int = GASOLINA,
+                     tipo_veiculo: int = CARRO,
+                     mes_inicial: int = None,
+                     ano_inicial: int = None,
+                     mes_final: int = None,
+                     ano_final: int = None,
+                     max_workers: int = 8) -> HistoricoPrecos:
+    """ Consulta o preço de um veículo em cada mês de referência do mês inicial ao final (inclusive). Os meses em
+    que a FIPE não possui o veículo (modelo ou ano/modelo inexistente) ficam com NaN; outras falhas são propagadas.
+
+    Parameters
+    ----------
+    api: FipeAPI
+        Cliente utilizado nas consultas
+    marca: str ou int
+        Nome ou código da marca
+    modelo: str ou int
+        Nome ou código do modelo
+    ano: int
+        Ano do modelo
+    combustivel: int, optional
+        Combustível (GASOLINA, ALCOOL ou DIESEL). Default: GASOLINA
+    tipo_veiculo: int, optional
+        Tipo de veículo (CARRO, MOTO ou CAMINHAO). Default: CARRO
+    mes_inicial, ano_inicial: int
+        Primeiro mês de referência
+    mes_final, ano_final: int, optional
+        Último mês de referência. Default: mês inicial
+    max_workers: int, optional
+        Número máximo de requisições simultâneas. Default: 8
+
+    Returns
+    --------
+    HistoricoPrecos:
+        Arrays alinhados com os meses, os códigos de referência e os preços
+    """
+    if mes_inicial is None or ano_inicial is None:
+        raise IncorrectValueException(
+            """
+            Informe o mês e o ano inicial do histórico.
+            """
+        )
+    meses = list(meses_entre(mes_inicial, ano_inicial, mes_final or mes_inicial, ano_final or ano_inicial))
+    especificacoes = [EspecificacaoVeiculo(marca=marca, modelo=modelo, ano=ano, combustivel=combustivel,
+                                           tipo_veiculo=tipo_veiculo, mes_referencia=mes, ano_referencia=ano_ref)
+                      for mes, ano_ref in meses]
+
+    datas = np.array([f'{ano_ref:04d}-{mes:02d}' for mes, ano_ref in meses], dtype='datetime64[M]')
+    referencias = np.full(len(meses), -1, dtype=np.int32)
+    for indice, (mes, ano_ref) in enumerate(meses):
+        try:
+            referencias[indice] = api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes, ano=ano_ref).referencia
+        except ValueNotFoundException:
+            pass
+    precos = np.full(len(meses), np.nan, dtype=np.float64)
+    for resultado in consulta_precos_em_lote(api, especificacoes, max_workers=max_workers):
+        if resultado.erro is not None:
+            if isinstance(resultado.erro, (ValueNotFoundException, IncorrectValueException)):
+                continue
+            raise resultado.erro
+        precos[resultado.indice] = valor_em_centavos(resultado.preco['Valor']) / 100
+
+    return HistoricoPrecos(datas=datas, referencias=referencias, precos=precos)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.limitador
+~~~~~~~~~~~~~~~~~~
+Limitadores de taxa (token bucket) aplicados a todas as requisições feitas à FIPE. O LimitadorTaxa vale para as
+threads de um processo e o LimitadorTaxaRedis guarda o balde no Redis, de forma que todos os processos e servidores
+que usam o mesmo Redis compartilham o mesmo limite.
+"""
+import logging
+import threading
+import time
+
+from typing import Optional
+
+import redis
+
+from .exceptions import IncorrectSettingsException
+
+
+logger = logging.getLogger(__name__)
+
+
+class LimitadorTaxa:
+    """
+    Limitador de taxa do tipo token bucket, seguro para uso entre threads.
+
+    Atributes:
+    ---------
+    taxa : float
+        Número de requisições liberadas por segundo
+    capacidade : float, optional
+        Número máximo de requisições em rajada. Default: igual à taxa (mínimo 1)
+    """
+
+    # tenta_adquirir faz E/S de rede; o AsyncFipeAPI o executa fora do event loop
+    remoto = False
+
+    def __init__(self, taxa: float, capacidade: Optional[float] = None):
+        if not taxa or taxa <= 0:
+            raise IncorrectSettingsException('A taxa do limitador deve ser maior que zero.')
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade) if capacidade else max(1.0, self.taxa)
+        self._tokens = self.capacidade
+        self._ultima_atualizacao = time.monotonic()
+        self._trava = threading.Lock()
+
+    def tenta_adquirir(self, tokens: float = 1) -> float:
+        """ Tenta retirar os tokens do balde sem bloquear.
+
+        Returns
+        -------
+        float
+            0 se os tokens foram adquiridos ou o tempo, em segundos, a aguardar antes de tentar novamente
+        """
+        with self._trava:
+            agora = time.monotonic()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._ultima_atualizacao) * self.taxa)
+            self._ultima_atualizacao = agora
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.taxa
+
+    def adquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """ Bloqueia até que os tokens sejam adquiridos.
+
+        Parameters
+        ----------
+        tokens: float, optional
+            Número de tokens (requisições). Default: 1
+        timeout: float, optional
+            Tempo máximo de espera em segundos. Default: sem limite
+
+        Returns
+        -------
+        bool
+            True se os tokens foram adquiridos e False se o tempo de espera se esgotou
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            espera = self.tenta_adquirir(tokens)
+            if not espera:
+                return True
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                espera = min(espera, restante)
+            logger.debug(f'Limite de requisições atingido. Aguardando {espera:.3f}s ...')
+            time.sleep(espera)
+
+
+class LimitadorTaxaRedis(LimitadorTaxa):
+    """
+    Limitador de taxa do tipo token bucket guardado no Redis. Todos os processos e servidores que utilizam a mesma
+    chave no mesmo Redis compartilham o mesmo limite global. O relógio utilizado é o do servidor Redis, então não
+    depende do sincronismo entre os servidores. Se o Redis falhar, o limite passa a ser aplicado localmente.
+
+    Atributes:
+    ---------
+    cliente : redis.Redis
+        Conexão com o Redis
+    taxa : float
+        Número de requisições liberadas por segundo (para todos os processos juntos)
+    capacidade : float, optional
+        Número máximo de requisições em rajada. Default: igual à taxa (mínimo 1)
+    chave : str, optional
+        Chave do balde no Redis. Default: fipeAPI:v2:limitador
+    """
+
+    remoto = True
+
+    _SCRIPT = """
+    if redis.replicate_commands then redis.replicate_commands() end
+    local taxa = tonumber(ARGV[1])
+    local capacidade = tonumber(ARGV[2])
+    local pedido = tonumber(ARGV[3])
+    local relogio = redis.call('TIME')
+    local agora = tonumber(relogio[1]) + tonumber(relogio[2]) / 1000000
+    local dados = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(dados[1])
+    local ts = tonumber(dados[2])
+    if tokens == nil or ts == nil then
+        tokens = capacidade
+        ts = agora
+    end
+    tokens = math.min(capacidade, tokens + math.max(0, agora - ts) * taxa)
+    local espera = 0
+    if tokens >= pedido then
+        tokens = tokens - pedido
+    else
+        espera = (pedido - tokens) / taxa
+    end
+    redis.call('HMSET', KEYS[1], 'tokens', tokens, 'ts', agora)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacidade / taxa * 1000) + 1000)
+    return tostring(espera)
+    """
+
+    def __init__(self,
+                 cliente: redis.Redis,
+                 taxa: float,
+                 capacidade: Optional[float] = None,
+                 chave: str = 'fipeAPI:v2:limitador'):
+        super(LimitadorTaxaRedis, self).__init__(taxa=taxa, capacidade=capacidade)
+        self._redis = cliente
+        self._chave = chave
+        self._script = cliente.register_script(self._SCRIPT)
+
+    def tenta_adquirir(self, tokens: float = 1) -> float:
+        try:
+            return float(self._script(keys=[self._chave], args=[self.taxa, self.capacidade, tokens]))
+        except redis.RedisError as error:
+            logger.error(f'Falha no limitador de taxa do Redis. Aplicando o limite local. Mensagem de erro: {error}')
+            return super(LimitadorTaxaRedis, self).tenta_adquirir(tokens)
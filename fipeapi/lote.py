@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.lote
+~~~~~~~~~~~~~
+Consulta de preços em lote. As especificações são resolvidas em etapas (referência, marcas, modelos e
+anos/modelo) e cada lista é buscada uma única vez por chave distinta. Depois, os preços distintos são consultados
+em um pool limitado de threads e os resultados são devolvidos na ordem de entrada, com o erro de cada item. Antes
+de cada etapa, as chaves de todos os itens são lidas do cache de uma só vez (pre_carrega_cache).
+"""
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import NamedTuple, Optional, Union, Dict, List, Iterable, Iterator, Callable, Hashable, Any, Mapping
+
+from . import chaves, protocolo
+from .busca import IndiceBusca
+from .consulta import Consulta
+from .exceptions import IncorrectValueException
+from .protocolo import CARRO, GASOLINA
+
+
+class EspecificacaoVeiculo(NamedTuple):
+    """
+    Especificação de um veículo para a consulta de preço em lote.
+
+    Atributes:
+    ---------
+    marca : str ou int
+        Nome ou código da marca
+    modelo : str ou int
+        Nome ou código do modelo
+    ano : int
+        Ano do modelo
+    combustivel : int, optional
+        Combustível (GASOLINA, ALCOOL ou DIESEL). Default: GASOLINA
+    tipo_veiculo : int, optional
+        Tipo de veículo (CARRO, MOTO ou CAMINHAO). Default: CARRO
+    mes_referencia : int, optional
+        Mês da tabela de referência. Default: mês atual
+    ano_referencia : int, optional
+        Ano da tabela de referência. Default: ano atual
+    """
+
+    marca: Union[str, int]
+    modelo: Union[str, int]
+    ano: int
+    combustivel: int = GASOLINA
+    tipo_veiculo: int = CARRO
+    mes_referencia: Optional[int] = None
+    ano_referencia: Optional[int] = None
+
+
+class ResultadoLote(NamedTuple):
+    """ Resultado de um item da consulta em lote. Se a consulta falhou, preco é None e erro possui a exceção """
+
+    indice: int
+    especificacao: EspecificacaoVeiculo
+    preco: Optional[Dict] = None
+    erro: Optional[Exception] = None
+
+    @property
+    def sucesso(self) -> bool:
+        return self.erro is None
+
+
+def _especificacao(item: Union[EspecificacaoVeiculo, Mapping, Iterable]) -> EspecificacaoVeiculo:
+    """ Converte dicionários e tuplas em EspecificacaoVeiculo """
+    if isinstance(item, EspecificacaoVeiculo):
+        return item
+    if isinstance(item, Mapping):
+        return EspecificacaoVeiculo(**item)
+    return EspecificacaoVeiculo(*item)
+
+
+def _executa_distintos(executor: ThreadPoolExecutor,
+                       chaves: Iterable[Hashable],
+                       funcao: Callable[[Any], Any]) -> Dict[Hashable, Future]:
+    """ Submete a função uma única vez para cada chave distinta """
+    futuros = dict()
+    for chave in chaves:
+        if chave not in futuros:
+            futuros[chave] = executor.submit(funcao, chave)
+    return futuros
+
+
+def _resultado(futuro: Future) -> Any:
+    """ Retorna o valor do futuro ou a exceção levantada por ele """
+    try:
+        return futuro.result()
+    except Exception as error:
+        return error
+
+
+def _resolve_codigo(indice: Callable[[], IndiceBusca], termo: Union[str, int],
+                    localiza: Callable[[IndiceBusca, str], int]) -> int:
+    """ Resolve o código a partir do nome, no índice de busca da lista (ou usa o código informado) """
+    if isinstance(termo, str):
+        return localiza(indice(), termo)
+    return int(termo)
+
+
+def consulta_precos_em_lote(api: Any,
+                            especificacoes: Iterable[Union[EspecificacaoVeiculo, Mapping, Iterable]],
+                            max_workers: int = 8) -> Iterator[ResultadoLote]:
+    r""" Consulta o preço de vários veículos, buscando cada lista de marcas/modelos/anos uma única vez por chave
+    distinta e consultando os preços distintos em um pool limitado de threads.
+    :param api: instância de FipeAPI
+    :param especificacoes: lista de EspecificacaoVeiculo (ou dicionários/tuplas com os mesmos campos)
+    :param max_workers: número máximo de requisições simultâneas
+    :return: gerador de ResultadoLote na mesma ordem das especificações
+    :rtype: Iterator[ResultadoLote]
+    """
+    itens = [_especificacao(e) for e in especificacoes]
+    erros: List[Optional[Exception]] = [None] * len(itens)
+    consultas: List[Optional[Consulta]] = [None] * len(itens)
+
+    def ativos():
+        return [i for i in range(len(itens)) if erros[i] is None]
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    precos = dict()
+    try:
+        # Etapa 1: tabela de referência e tipo de veículo
+        referencias = _executa_distintos(
+            executor,
+            ((e.tipo_veiculo, e.mes_referencia, e.ano_referencia) for e in itens),
+            lambda chave: api.cria_consulta(tipo_veiculo=chave[0], mes=chave[1], ano=chave[2]))
+        for i in ativos():
+            e = itens[i]
+            valor = _resultado(referencias[(e.tipo_veiculo, e.mes_referencia, e.ano_referencia)])
+            if isinstance(valor, Exception):
+                erros[i] = valor
+            else:
+                consultas[i] = valor
+
+        # Etapa 2: marcas, uma requisição por tipo/referência
+        api.pre_carrega_cache(chaves.MARCAS, (protocolo.chave_marcas(consultas[i]) for i in ativos()))
+        marcas = _executa_distintos(executor, (consultas[i] for i in ativos()), api.pega_marcas)
+        for i in ativos():
+            try:
+                marcas[consultas[i]].result()
+                codigo = _resolve_codigo(lambda: api.indice_marcas(consultas[i]), itens[i].marca,
+                                         protocolo.localiza_marca)
+                consultas[i] = consultas[i].com_marca(codigo)
+            except Exception as error:
+                erros[i] = error
+
+        # Etapa 3: modelos, uma requisição por marca
+        api.pre_carrega_cache(chaves.MODELOS, (protocolo.chave_modelos(consultas[i]) for i in ativos()))
+        modelos = _executa_distintos(executor, (consultas[i] for i in ativos()), api.pega_modelos)
+        for i in ativos():
+            try:
+                modelos[consultas[i]].result()
+                codigo = _resolve_codigo(lambda: api.indice_modelos(consultas[i]), itens[i].modelo,
+                                         protocolo.localiza_modelo)
+                consultas[i] = consultas[i].com_modelo(codigo)
+            except Exception as error:
+                erros[i] = error
+
+        # Etapa 4: anos/modelo, uma requisição por modelo
+        api.pre_carrega_cache(chaves.ANOS_MODELO, (protocolo.chave_anos_modelo(consultas[i]) for i in ativos()))
+        anos = _executa_distintos(executor, (consultas[i] for i in ativos()), api.pega_anos_modelo)
+        for i in ativos():
+            try:
+                protocolo.verifica_combustivel(itens[i].combustivel)
+                if not protocolo.possui_ano_modelo(anos[consultas[i]].result(),
+                                                   ano=itens[i].ano,
+                                                   combustivel=itens[i].combustivel):
+                    raise IncorrectValueException(
+                        """
+                             O ano ou o combustível informado estão incorretos. Não foi localizado com a marca e
+                             modelo selecionados.
+                        """
+                    )
+            except Exception as error:
+                erros[i] = error
+
+        # Etapa 5: preços distintos no pool
+        api.pre_carrega_cache(chaves.PRECO, (protocolo.chave_preco(consultas[i], ano=int(itens[i].ano),
+                                                                   combustivel=itens[i].combustivel)
+                                             for i in ativos()))
+        precos = _executa_distintos(
+            executor,
+            ((consultas[i], int(itens[i].ano), itens[i].combustivel) for i in ativos()),
+            lambda chave: api.consulta_preco_veiculo(ano=chave[1], combustivel=chave[2], consulta=chave[0]))
+
+        for i, e in enumerate(itens):
+            if erros[i] is not None:
+                yield ResultadoLote(indice=i, especificacao=e, erro=erros[i])
+                continue
+            valor = _resultado(precos[(consultas[i], int(e.ano), e.combustivel)])
+            if isinstance(valor, Exception):
+                yield ResultadoLote(indice=i, especificacao=e, erro=valor)
+            else:
+                yield ResultadoLote(indice=i, especificacao=e, preco=valor)
+    finally:
+        for futuro in precos.values():
+            futuro.cancel()
+        executor.shutdown(wait=True)
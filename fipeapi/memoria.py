@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.memoria
+~~~~~~~~~~~~~~~~
+Camada de cache em memória do processo, limitada por número de itens e por tamanho aproximado em bytes. Os itens
+menos usados recentemente são removidos primeiro (LRU) e podem ter validade (TTL). Cada origem de dados (marcas,
+modelos, anos/modelo e preço) possui os seus próprios limites.
+"""
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+from . import chaves
+from .exceptions import IncorrectSettingsException
+
+
+# Limites padrão de cada origem
+LIMITES_PADRAO = {
+    chaves.MARCAS: {'max_itens': 64},
+    chaves.MODELOS: {'max_itens': 2048, 'max_bytes': 16 * 1024 * 1024},
+    chaves.ANOS_MODELO: {'max_itens': 16384, 'max_bytes': 16 * 1024 * 1024},
+    chaves.PRECO: {'max_itens': 65536, 'max_bytes': 32 * 1024 * 1024},
+    chaves.CODIGO_FIPE: {'max_itens': 16384, 'max_bytes': 16 * 1024 * 1024},
+    chaves.PRECO_CODIGO_FIPE: {'max_itens': 65536, 'max_bytes': 32 * 1024 * 1024},
+}
+
+
+def tamanho_aproximado(valor: Any) -> int:
+    """ Tamanho aproximado do valor em bytes, próximo ao da sua representação JSON, estimado sem serializá-lo: os
+    textos pelo comprimento, os demais valores simples com 8 bytes e as listas pelo primeiro item multiplicado pelo
+    número de itens, já que os itens das listas da FIPE têm todos o mesmo formato
+
+    >>> tamanho_aproximado([{'codigo': 1, 'marca': 'GM'}, {'codigo': 2, 'marca': 'VW'}])
+    70
+    """
+    if hasattr(valor, 'tamanho_aproximado'):
+        return valor.tamanho_aproximado()
+    if isinstance(valor, (str, bytes)):
+        return len(valor) + 2
+    if isinstance(valor, dict):
+        return 2 + sum(len(str(chave)) + 4 + tamanho_aproximado(item) for chave, item in valor.items())
+    if isinstance(valor, list):
+        return 2 + len(valor) * (tamanho_aproximado(valor[0]) + 1) if valor else 2
+    if isinstance(valor, tuple):
+        return 2 + sum(tamanho_aproximado(item) + 1 for item in valor)
+    return 8
+
+
+class EstatisticasCache(NamedTuple):
+    """ Contadores de uso de um cache em memória """
+
+    acertos: int = 0
+    falhas: int = 0
+    remocoes: int = 0
+    itens: int = 0
+    bytes: int = 0
+
+
+class CacheLRU:
+    """
+    Cache em memória com remoção dos itens menos usados recentemente, seguro para uso entre threads.
+
+    Atributes:
+    ---------
+    max_itens : int, optional
+        Número máximo de itens. Default: sem limite
+    max_bytes : int, optional
+        Tamanho máximo aproximado, em bytes, da soma dos itens. Default: sem limite
+    ttl : float, optional
+        Validade, em segundos, de cada item. Default: sem expiração
+    tamanho : callable, optional
+        Função que calcula o tamanho aproximado de um item. Default: tamanho_aproximado
+    """
+
+    def __init__(self,
+                 max_itens: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None,
+                 tamanho: Callable[[Any], int] = tamanho_aproximado):
+        if (max_itens is not None and max_itens < 1) or (max_bytes is not None and max_bytes < 1):
+            raise IncorrectSettingsException('Os limites do cache em memória devem ser maiores que zero.')
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._tamanho = tamanho
+        self._itens: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._acertos = 0
+        self._falhas = 0
+        self._remocoes = 0
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def __contains__(self, chave: Hashable) -> bool:
+        with self._trava:
+            return self._valido(chave) is not None
+
+    def __getitem__(self, chave: Hashable) -> Any:
+        with self._trava:
+            item = self._valido(chave)
+            if item is None:
+                self._falhas += 1
+                raise KeyError(chave)
+            self._itens.move_to_end(chave)
+            self._acertos += 1
+            return item[0]
+
+    def __setitem__(self, chave: Hashable, valor: Any) -> None:
+        tamanho = self._tamanho(valor) if self.max_bytes is not None else 0
+        expira = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._trava:
+            self._remove(chave)
+            if self.max_bytes is not None and tamanho > self.max_bytes:
+                self._remocoes += 1
+                return
+            self._itens[chave] = (valor, tamanho, expira)
+            self._bytes += tamanho
+            while self._itens and ((self.max_itens is not None and len(self._itens) > self.max_itens)
+                                   or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._remove(next(iter(self._itens)))
+                self._remocoes += 1
+
+    def __delitem__(self, chave: Hashable) -> None:
+        with self._trava:
+            if not self._remove(chave):
+                raise KeyError(chave)
+
+    def get(self, chave: Hashable, padrao: Any = None) -> Any:
+        try:
+            return self[chave]
+        except KeyError:
+            return padrao
+
+    def limpa(self) -> None:
+        """ Remove todos os itens (os contadores são mantidos) """
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> EstatisticasCache:
+        """ Retorna os contadores de acertos, falhas e remoções e a ocupação atual """
+        with self._trava:
+            return EstatisticasCache(acertos=self._acertos, falhas=self._falhas, remocoes=self._remocoes,
+                                     itens=len(self._itens), bytes=self._bytes)
+
+    def _valido(self, chave: Hashable) -> Optional[tuple]:
+        """ Retorna o item se ele existir e não estiver expirado. Deve ser chamado com a trava """
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        if item[2] is not None and item[2] <= time.monotonic():
+            self._remove(chave)
+            self._remocoes += 1
+            return None
+        return item
+
+    def _remove(self, chave: Hashable) -> bool:
+        """ Remove o item e desconta o seu tamanho. Deve ser chamado com a trava """
+        item = self._itens.pop(chave, None)
+        if item is None:
+            return False
+        self._bytes -= item[1]
+        return True
+
+
+class CacheMemoria:
+    """
+    Conjunto de caches LRU, um por origem de dados, compartilhado por todas as consultas de um cliente.
+
+    Atributes:
+    ---------
+    limites : dict, optional
+        Parâmetros do CacheLRU (max_itens, max_bytes e ttl) por origem. As origens não informadas utilizam
+        LIMITES_PADRAO
+    """
+
+    def __init__(self, limites: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._limites = dict(LIMITES_PADRAO)
+        self._limites.update(limites or {})
+        self._caches: Dict[str, CacheLRU] = dict()
+        self._trava = threading.Lock()
+
+    def origem(self, origem: str) -> CacheLRU:
+        """ Retorna o cache da origem, criando-o na primeira chamada """
+        with self._trava:
+            cache = self._caches.get(origem)
+            if cache is None:
+                cache = CacheLRU(**self._limites.get(origem, {}))
+                self._caches[origem] = cache
+            return cache
+
+    def limpa(self) -> None:
+        """ Remove os itens de todas as origens """
+        for cache in list(self._caches.values()):
+            cache.limpa()
+
+    def estatisticas(self) -> Dict[str, EstatisticasCache]:
+        """ Retorna os contadores de cada origem """
+        return {origem: cache.estatisticas() for origem, cache in list(self._caches.items())}
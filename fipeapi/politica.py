@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.politica
+~~~~~~~~~~~~~~~~~
+Política de validade (TTL) das entradas do cache. Os meses de referência já fechados não mudam mais e são
+guardados sem expiração. As entradas do mês corrente podem ser corrigidas pela FIPE, então expiram no fim do mês
+(ou antes, conforme o TTL configurado para cada origem). A tabela de referência possui um TTL próprio.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+
+TABELA_REFERENCIA = 'tabela-referencia'
+CODIGO_FIPE = 'codigo-fipe'
+
+# TTL, em segundos, das entradas do mês corrente para cada origem
+TTLS_PADRAO = {
+    'marcas': 24 * 60 * 60,
+    'modelos': 24 * 60 * 60,
+    'anos-modelo': 24 * 60 * 60,
+    'preco': 24 * 60 * 60,
+    'preco-codigo-fipe': 24 * 60 * 60,
+}
+
+TTL_TABELA_REFERENCIA_PADRAO = 6 * 60 * 60
+
+
+def segundos_ate_fim_do_mes(agora: datetime = None) -> int:
+    """ Número de segundos até o início do próximo mês (mínimo 1) """
+    agora = agora or datetime.now()
+    if agora.month == 12:
+        proximo = datetime(agora.year + 1, 1, 1)
+    else:
+        proximo = datetime(agora.year, agora.month + 1, 1)
+    return max(1, int((proximo - agora).total_seconds()))
+
+
+class PoliticaCache:
+    """
+    Define o TTL de cada entrada salva no cache.
+
+    Atributes:
+    ---------
+    ttls : dict, optional
+        TTL, em segundos, das entradas do mês corrente por origem ('marcas', 'modelos', 'anos-modelo', 'preco' e
+        'preco-codigo-fipe'). O índice por Código FIPE ('codigo-fipe') não depende do mês e usa ttl_referencia_fechada.
+        None indica que a entrada só expira no fim do mês. Default: TTLS_PADRAO
+    ttl_tabela_referencia : int, optional
+        TTL, em segundos, da tabela de referência. Default: 6 horas
+    ttl_referencia_fechada : int, optional
+        TTL, em segundos, das entradas dos meses de referência já fechados. Default: None (sem expiração)
+    """
+
+    def __init__(self,
+                 ttls: Optional[Dict[str, Optional[int]]] = None,
+                 ttl_tabela_referencia: Optional[int] = TTL_TABELA_REFERENCIA_PADRAO,
+                 ttl_referencia_fechada: Optional[int] = None):
+        self.ttls = dict(TTLS_PADRAO)
+        self.ttls.update(ttls or {})
+        self.ttl_tabela_referencia = ttl_tabela_referencia
+        self.ttl_referencia_fechada = ttl_referencia_fechada
+
+    def ttl(self,
+            origem: str,
+            referencia: Optional[int] = None,
+            referencia_atual: Optional[int] = None,
+            agora: datetime = None) -> Optional[int]:
+        """ Retorna o TTL, em segundos, da entrada ou None se ela não deve expirar.
+
+        Parameters
+        ----------
+        origem: str
+            Origem dos dados ('marcas', 'modelos', 'anos-modelo', 'preco' ou 'tabela-referencia')
+        referencia: int, optional
+            Código da tabela de referência da entrada
+        referencia_atual: int, optional
+            Código da tabela de referência mais recente publicada pela FIPE
+        """
+        if origem == TABELA_REFERENCIA:
+            return self.ttl_tabela_referencia
+
+        if origem == CODIGO_FIPE:
+            # os códigos do veículo de um Código FIPE não mudam de um mês para outro
+            return self.ttl_referencia_fechada
+
+        if referencia is not None and referencia_atual is not None and int(referencia) < int(referencia_atual):
+            return self.ttl_referencia_fechada
+
+        fim_do_mes = segundos_ate_fim_do_mes(agora)
+        ttl = self.ttls.get(origem)
+        if ttl is None:
+            return fim_do_mes
+        return min(int(ttl), fim_do_mes)
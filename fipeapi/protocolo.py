@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.protocolo
+~~~~~~~~~~~~~~~~~~
+Montagem das requisições e tratamento das respostas da API da FIPE, independente do transporte HTTP. É
+compartilhado pelos clientes síncrono (FipeAPI) e assíncrono (AsyncFipeAPI).
+"""
+import logging
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple, Union
+
+from . import chaves
+from .busca import IndiceBusca
+from .consulta import Consulta
+from .referencias import IndiceReferencias
+from .exceptions import IncorrectValueException, ValueNotFoundException
+from .utils import meses_do_ano
+
+
+logger = logging.getLogger(__name__)
+
+
+# Tipos de veículo
+CARRO: int = 1
+MOTO: int = 2
+CAMINHAO: int = 3
+
+
+# Combustíveis
+GASOLINA = 1
+ALCOOL = 2
+DIESEL = 3
+
+
+URL = 'https://veiculos.fipe.org.br'
+API_ROOT = 'api/veiculos/'
+
+CABECALHOS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                            'Chrome/51.0.2704.103 Safari/537.36',
+              'Accept': 'text/html, application/xhtml+xml, application/json, text/javascript',
+              'referrer': URL,
+              'Connection': 'keep-alive',
+              'Accept-Language': 'pt-BR,pt;q=0.8,en-US;q=0.5,en;q=0.3',
+              'Host': URL.split("://")[1],
+              'Origin': URL,
+              }
+
+# Endpoints da API
+TABELA_REFERENCIA = 'ConsultarTabelaDeReferencia'
+MARCAS = 'ConsultarMarcas'
+MODELOS = 'ConsultarModelos'
+ANOS_MODELO = 'ConsultarAnoModelo'
+ANOS_CODIGO_FIPE = 'ConsultarAnoModeloPeloCodigoFipe'
+PRECO = 'ConsultarValorComTodosParametros'
+
+TIPOS_VEICULO = {CARRO: 'carro', MOTO: 'moto', CAMINHAO: 'caminhao'}
+
+
+def url_endpoint(endpoint: str) -> str:
+    """ Retorna a url completa de um endpoint da API """
+    return f'{URL}/{API_ROOT}/{endpoint}'
+
+
+def verifica_tipo_veiculo(tipo_veiculo: int) -> int:
+    """ Valida o tipo de veículo informado """
+    if tipo_veiculo not in [CARRO, MOTO, CAMINHAO]:
+        raise IncorrectValueException(
+            """
+            Valor de tipo de veículo está incorreto.
+            """
+        )
+    return tipo_veiculo
+
+
+def verifica_combustivel(combustivel: int) -> int:
+    """ Valida o combustível informado """
+    if combustivel not in [GASOLINA, ALCOOL, DIESEL]:
+        raise IncorrectValueException(
+            """
+                  O combustível informado é inválido.
+             """
+        )
+    return combustivel
+
+
+def normaliza_referencia(mes_referencia: int = None, ano_referencia: int = None) -> Tuple[int, int]:
+    """ Valida o mes/ano de referência informado. Sem o mês ou o ano, utiliza o mês ou o ano atual """
+
+    if not mes_referencia or mes_referencia < 1:
+        mes_referencia = datetime.today().month
+    elif mes_referencia > 12:
+        raise IncorrectValueException(
+            f"""
+            O valor do mês de referência informado "{mes_referencia}" não pode ser maior que 12.
+            """
+        )
+
+    current_year = datetime.today().year
+
+    if not ano_referencia or ano_referencia < 1:
+        ano_referencia = current_year
+    elif ano_referencia > current_year:
+        raise IncorrectValueException(
+            f"""
+            O valor do ano de referência informado "{ano_referencia}" não pode ser no futuro.
+            """
+        )
+    return mes_referencia, ano_referencia
+
+
+def pega_codigo_referencia(tabela_referencia: Union[List[Dict], IndiceReferencias],
+                           mes_referencia: int = None,
+                           ano_referencia: int = None) -> int:
+    """ Pega o mes/ano de referência informado e retorna o código FIPE da tabela de referência """
+
+    mes_referencia, ano_referencia = normaliza_referencia(mes_referencia, ano_referencia)
+    if not isinstance(tabela_referencia, IndiceReferencias):
+        tabela_referencia = IndiceReferencias(tabela_referencia)
+
+    logger.debug(f'Efetuando a busca do código de referência para {mes_referencia}/{ano_referencia} ...')
+    return tabela_referencia.codigo(mes_referencia, ano_referencia)
+
+
+def tabela_atualizada(tabela_referencia: List[Dict]) -> bool:
+    """ Verifica se a última referência da tabela é o mês/ano atual """
+
+    # Pega o mês e ano atual
+    today = datetime.today()
+    current_month = today.month
+    current_year = today.year
+
+    try:
+        last_reference = tabela_referencia[0]['Mes'].split("/")
+        logger.debug(f'Checando se a última referência salva "{last_reference}" é igual ao mês/ano atual.')
+        if meses_do_ano[current_month] == last_reference[0] and current_year == int(last_reference[1]):
+            logger.info(f'A tabela de referências está atualizada ({last_reference[0]}/{last_reference[1]}).')
+            return True
+        else:
+            return False
+    except Exception as error:
+        logger.error(f"""Erro ao verificar o último Mes/Ano de referência:\n "
+        Dados: {tabela_referencia} \n
+        Error Message: {error}.""")
+        return False
+
+
+def localiza_marca(marcas: Union[List[Dict], IndiceBusca], marca: str) -> int:
+    """ Localiza o código da marca pelo nome dentro da lista de marcas (ou do seu índice de busca) """
+    if not isinstance(marcas, IndiceBusca):
+        marcas = IndiceBusca(marcas, 'marca')
+    resultado = marcas.melhor(marca)
+    if resultado is None:
+        raise IncorrectValueException(
+            f"""
+              A marca de carro informada "{marca}" não foi localizada.
+            """
+        )
+    return resultado.codigo
+
+
+def localiza_modelo(modelos: Union[List[Dict], IndiceBusca], modelo: str) -> int:
+    """ Localiza o código do modelo pelo nome dentro da lista de modelos (ou do seu índice de busca) """
+    if not isinstance(modelos, IndiceBusca):
+        modelos = IndiceBusca(modelos, 'modelo')
+    resultado = modelos.melhor(modelo)
+    if resultado is None:
+        raise IncorrectValueException(
+            f"""
+              O modelo de veículo informado "{modelo}" não foi localizado.
+            """
+        )
+    return resultado.codigo
+
+
+def possui_ano_modelo(anos: List[Dict], ano: int, combustivel: int) -> bool:
+    """ Verifica se o ano e o combustível estão na lista de anos/modelo """
+    for a in anos:
+        if a['ano'] == int(ano) and combustivel == a['combustivel']:
+            return True
+    return False
+
+
+def chave_marcas(consulta: Consulta) -> str:
+    """ Chave de cache da lista de marcas """
+    return chaves.chave(chaves.MARCAS, consulta.tipo_veiculo, consulta.referencia)
+
+
+def chave_modelos(consulta: Consulta) -> str:
+    """ Chave de cache da lista de modelos """
+    return chaves.chave(chaves.MODELOS, consulta.tipo_veiculo, consulta.referencia, consulta.marca)
+
+
+def chave_anos_modelo(consulta: Consulta) -> str:
+    """ Chave de cache da lista de anos/modelo """
+    return chaves.chave(chaves.ANOS_MODELO, consulta.tipo_veiculo, consulta.referencia, consulta.marca,
+                        consulta.modelo)
+
+
+def chave_preco(consulta: Consulta, ano: int, combustivel: int) -> str:
+    """ Chave de cache do preço de um veículo """
+    return chaves.chave(chaves.PRECO, consulta.tipo_veiculo, consulta.referencia, consulta.marca, consulta.modelo,
+                        ano, combustivel)
+
+
+def chave_preco_codigo_fipe(consulta: Consulta, codigo_fipe: str, ano: int, combustivel: int) -> str:
+    """ Chave de cache do preço consultado pelo Código FIPE """
+    return chaves.chave(chaves.PRECO_CODIGO_FIPE, consulta.tipo_veiculo, consulta.referencia,
+                        normaliza_codigo_fipe(codigo_fipe), ano, combustivel)
+
+
+def chave_tabela_referencia() -> str:
+    """ Chave de cache da tabela de referência """
+    return chaves.chave(chaves.TABELA_REFERENCIA)
+
+
+def chave_codigo_fipe(codigo_fipe: str) -> str:
+    """ Chave de cache do índice por Código FIPE (códigos do veículo) """
+    return chaves.chave(chaves.CODIGO_FIPE, codigo_fipe)
+
+
+def dados_marcas(consulta: Consulta) -> Dict:
+    """ Corpo da requisição de marcas """
+    return {
+        'codigoTabelaReferencia': consulta.referencia,
+        'codigoTipoVeiculo': consulta.tipo_veiculo
+    }
+
+
+def dados_modelos(consulta: Consulta) -> Dict:
+    """ Corpo da requisição de modelos """
+    return {
+        'codigoTabelaReferencia': consulta.referencia,
+        'codigoTipoVeiculo': consulta.tipo_veiculo,
+        'codigoModelo': '',
+        'codigoMarca': consulta.marca,
+        'ano': '',
+        'codigoTipoCombustivel': '',
+        'anoModelo': '',
+        'modeloCodigoExterno': ''
+    }
+
+
+def dados_anos_modelo(consulta: Consulta) -> Dict:
+    """ Corpo da requisição de anos/modelo """
+    return {
+        'codigoTabelaReferencia': consulta.referencia,
+        'codigoTipoVeiculo': consulta.tipo_veiculo,
+        'codigoModelo': consulta.modelo,
+        'codigoMarca': consulta.marca,
+        'ano': '',
+        'codigoTipoCombustivel': '',
+        'anoModelo': '',
+        'modeloCodigoExterno': ''
+    }
+
+
+def dados_preco(consulta: Consulta, ano: int, combustivel: int) -> Dict:
+    """ Corpo da requisição de preço """
+
+    #if _ano_modelo[0] == "Zero KM":
+    #    _ano_modelo[0] = 32000
+
+    return {
+        'codigoTabelaReferencia': consulta.referencia,
+        'codigoTipoVeiculo': consulta.tipo_veiculo,
+        'codigoModelo': consulta.modelo,
+        'codigoMarca': consulta.marca,
+        'codigoTipoCombustivel': combustivel,
+        'anoModelo': ano,
+        'modeloCodigoExterno': '',
+        'tipoVeiculo': TIPOS_VEICULO[consulta.tipo_veiculo],
+        'tipoConsulta': 'tradicional'
+    }
+
+
+def normaliza_codigo_fipe(codigo_fipe: str) -> str:
+    """ Remove os espaços do Código FIPE e valida o formato (dígitos e hífen, como em "004381-8") """
+    codigo_fipe = str(codigo_fipe or '').strip()
+    if not codigo_fipe or not all(c.isdigit() or c == '-' for c in codigo_fipe):
+        raise IncorrectValueException(
+            f"""
+            O Código FIPE informado "{codigo_fipe}" é inválido.
+            """
+        )
+    return codigo_fipe
+
+
+def dados_anos_por_codigo_fipe(consulta: Consulta, codigo_fipe: str) -> Dict:
+    """ Corpo da requisição de anos/modelo pelo Código FIPE, sem marca e modelo """
+    return {
+        'codigoTabelaReferencia': consulta.referencia,
+        'codigoTipoVeiculo': consulta.tipo_veiculo,
+        'modeloCodigoExterno': normaliza_codigo_fipe(codigo_fipe)
+    }
+
+
+def dados_preco_por_codigo_fipe(consulta: Consulta, codigo_fipe: str, ano: int, combustivel: int) -> Dict:
+    """ Corpo da requisição de preço pelo Código FIPE (tipoConsulta "codigo"), sem marca e modelo """
+    return {
+        'codigoTabelaReferencia': consulta.referencia,
+        'codigoTipoVeiculo': consulta.tipo_veiculo,
+        'codigoModelo': '',
+        'codigoMarca': '',
+        'codigoTipoCombustivel': combustivel,
+        'anoModelo': ano,
+        'modeloCodigoExterno': normaliza_codigo_fipe(codigo_fipe),
+        'tipoVeiculo': TIPOS_VEICULO[consulta.tipo_veiculo],
+        'tipoConsulta': 'codigo'
+    }
+
+
+def verifica_preco(conteudo: Dict, descricao: str) -> Dict:
+    """ Verifica se a FIPE retornou o preço ou um erro ({"codigo": "0", "erro": "..."}) """
+    if not isinstance(conteudo, dict) or 'erro' in conteudo or 'Valor' not in conteudo:
+        erro = conteudo.get('erro') if isinstance(conteudo, dict) else conteudo
+        raise ValueNotFoundException(
+            f"""
+            A FIPE não retornou o preço de {descricao}: {erro}
+            """
+        )
+    return conteudo
+
+
+def formata_marcas(conteudo: List[Dict]) -> List[Dict]:
+    """ Reformata as marcas retornadas pela API para ficarem mais apresentáveis """
+    _dados_reformatados = list()
+    for item in conteudo:
+        _dados_reformatados.append({'codigo': int(item['Value']), 'marca': item['Label'].strip()})
+    return _dados_reformatados
+
+
+def formata_modelos(conteudo: Dict) -> List[Dict]:
+    """ Reformata os modelos retornados pela API """
+    _reformatado = list()
+    for item in conteudo['Modelos']:
+        _reformatado.append({'codigo': item['Value'], 'modelo': item['Label']})
+    return _reformatado
+
+
+def formata_anos_modelo(conteudo: List[Dict]) -> List[Dict]:
+    """ Reformata os anos/modelo retornados pela API """
+    _reformatado = list()
+    for item in conteudo:
+        _s = item['Value'].split("-")
+        _reformatado.append({'ano': int(_s[0]),
+                             'combustivel': int(_s[1]),
+                             'descricao': item['Label'],
+                             'codigo': item['Value']})
+    return _reformatado
+
+
+def indice_codigo_fipe(consulta: Consulta, anos: Iterable[Tuple[int, int]]) -> Dict:
+    """ Entrada do índice por Código FIPE: códigos do veículo (marca e modelo None quando desconhecidos) e os pares
+    [ano, combustível], do mais novo ao mais antigo
+
+    >>> indice_codigo_fipe(Consulta(tipo_veiculo=1, referencia=300, marca=23, modelo=6100), [(2019, 1), (2020, 1)])
+    {'tipo_veiculo': 1, 'marca': 23, 'modelo': 6100, 'anos': [[2020, 1], [2019, 1]]}
+    """
+    return {'tipo_veiculo': consulta.tipo_veiculo, 'marca': consulta.marca, 'modelo': consulta.modelo,
+            'anos': [list(ano) for ano in sorted({(int(ano), int(combustivel)) for ano, combustivel in anos},
+                                                 reverse=True)]}
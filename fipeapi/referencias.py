@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.referencias
+~~~~~~~~~~~~~~~~~~~~
+Índice da tabela de referência da FIPE, montado uma vez a cada carga da tabela: mês/ano -> código, código ->
+mês/ano e consultas por intervalo de meses. Os códigos são sequenciais (um por mês), então o código de um mês
+posterior à tabela conhecida pode ser inferido a partir de uma âncora (um mês cujo código é conhecido).
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .exceptions import IncorrectValueException, ValueNotFoundException
+from .utils import meses_do_ano
+
+
+_MESES = {nome: numero for numero, nome in meses_do_ano.items()}
+
+
+class Referencia(NamedTuple):
+    """ Mês de referência da tabela da FIPE """
+
+    codigo: int
+    mes: int
+    ano: int
+
+    @property
+    def ordinal(self) -> int:
+        """ Número de meses desde o ano zero, utilizado na comparação e na inferência """
+        return ordinal(self.mes, self.ano)
+
+
+def ordinal(mes: int, ano: int) -> int:
+    return ano * 12 + mes - 1
+
+
+def le_mes(texto: str) -> Tuple[int, int]:
+    """ Converte o mês da tabela de referência ("outubro/2026 ") em (mês, ano)
+
+    >>> le_mes('outubro/2026 ')
+    (10, 2026)
+    """
+    nome, ano = texto.strip().split('/')
+    return _MESES[nome], int(ano)
+
+
+class IndiceReferencias:
+    """
+    Índice da tabela de referência retornada pelo endpoint ConsultarTabelaDeReferencia.
+
+    Atributes:
+    ---------
+    referencias : List[Referencia]
+        Meses da tabela em ordem cronológica
+    """
+
+    def __init__(self, tabela_referencia: List[Dict]):
+        referencias = list()
+        for item in tabela_referencia or []:
+            mes, ano = le_mes(item['Mes'])
+            referencias.append(Referencia(codigo=int(item['Codigo']), mes=mes, ano=ano))
+        self.referencias: List[Referencia] = sorted(referencias, key=lambda referencia: referencia.ordinal)
+        self._ordinais = [referencia.ordinal for referencia in self.referencias]
+        self._por_mes: Dict[Tuple[int, int], Referencia] = {(r.mes, r.ano): r for r in self.referencias}
+        self._por_codigo: Dict[int, Referencia] = {r.codigo: r for r in self.referencias}
+
+    def __len__(self) -> int:
+        return len(self.referencias)
+
+    @property
+    def primeira(self) -> Optional[Referencia]:
+        return self.referencias[0] if self.referencias else None
+
+    @property
+    def ultima(self) -> Optional[Referencia]:
+        return self.referencias[-1] if self.referencias else None
+
+    def pega(self, mes: int, ano: int) -> Optional[int]:
+        """ Código do mês/ano ou None se o mês não estiver na tabela """
+        referencia = self._por_mes.get((mes, ano))
+        return referencia.codigo if referencia else None
+
+    def codigo(self, mes: int, ano: int) -> int:
+        """ Código do mês/ano. Lança IncorrectValueException para anos anteriores à série e ValueNotFoundException
+        para meses que não estão na tabela """
+        codigo = self.pega(mes, ano)
+        if codigo is not None:
+            return codigo
+        if self.primeira is not None and ano < self.primeira.ano:
+            raise IncorrectValueException(
+                f"""
+                O valor de ano informado não pode ser menor do que o primeiro ano da
+                série {self.primeira.ano}.
+                """
+            )
+        raise ValueNotFoundException(
+            f"""
+                Não foi possível encontrar o Código da Tabela de Referência para {meses_do_ano[mes]}/{ano}.
+            """
+        )
+
+    def mes_ano(self, codigo: int) -> Tuple[int, int]:
+        """ Mês e ano do código de referência """
+        referencia = self._por_codigo.get(int(codigo))
+        if referencia is None:
+            raise ValueNotFoundException(f'O código de referência {codigo} não está na tabela de referência.')
+        return referencia.mes, referencia.ano
+
+    def entre(self, mes_inicial: int, ano_inicial: int, mes_final: int, ano_final: int) -> List[Referencia]:
+        """ Meses da tabela do mês inicial ao final (inclusive), em ordem cronológica """
+        inicio = bisect_left(self._ordinais, ordinal(mes_inicial, ano_inicial))
+        fim = bisect_right(self._ordinais, ordinal(mes_final, ano_final))
+        return self.referencias[inicio:fim]
+
+    def infere(self, mes: int, ano: int) -> int:
+        """ Infere o código de um mês fora da tabela a partir do último mês conhecido """
+        if self.ultima is None:
+            raise ValueNotFoundException('A tabela de referência está vazia. Não é possível inferir o código.')
+        return infere_codigo(mes, ano, self.ultima)
+
+
+def infere_codigo(mes: int, ano: int, ancora: Referencia) -> int:
+    """ Infere o código da referência do mês/ano a partir de um mês de código conhecido (âncora)
+
+    >>> infere_codigo(1, 2027, Referencia(codigo=300, mes=10, ano=2026))
+    303
+    """
+    return ancora.codigo + ordinal(mes, ano) - ancora.ordinal
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.registros
+~~~~~~~~~~~~~~~~~~
+Registros tipados das marcas, modelos, anos/modelo e preços, retornados pelo FipeAPI com tipado=True. São
+NamedTuples (sem __dict__ por instância) com os textos repetidos compartilhados (sys.intern); o valor do preço é
+convertido uma única vez em centavos e o mês de referência em date. Para compatibilidade, os registros aceitam o
+acesso pelas chaves dos dicionários (registro['Valor'], registro.get('codigo')) e voltam a ser dicionários com
+como_dict.
+"""
+import sys
+
+from datetime import date
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from .utils import formata_centavos, meses_do_ano, valor_em_centavos
+
+
+_MESES = {nome: numero for numero, nome in meses_do_ano.items()}
+
+
+def _texto(valor: Any) -> str:
+    """ Texto compartilhado entre os registros: nomes de marcas, modelos e combustíveis se repetem muito """
+    return sys.intern('' if valor is None else str(valor))
+
+
+def le_mes_referencia(texto: str) -> Optional[date]:
+    """ Converte o MesReferencia retornado pela FIPE em date (primeiro dia do mês)
+
+    >>> le_mes_referencia('outubro de 2026 ')
+    datetime.date(2026, 10, 1)
+    """
+    partes = (texto or '').strip().split(' ')
+    if len(partes) == 3 and partes[0] in _MESES and partes[2].isdigit():
+        return date(int(partes[2]), _MESES[partes[0]], 1)
+    return None
+
+
+def formata_mes_referencia(mes: Optional[date]) -> str:
+    """ Formata o mês como o MesReferencia retornado pela FIPE ("outubro de 2026 ") """
+    return f'{meses_do_ano[mes.month]} de {mes.year} ' if mes else ''
+
+
+# Acesso pelas chaves do dicionário equivalente. _CHAVES de cada registro liga a chave ao campo (ou a uma função)
+def _valor(registro: tuple, chave: str) -> Any:
+    campo = registro._CHAVES[chave]
+    return campo(registro) if callable(campo) else getattr(registro, campo)
+
+
+def _getitem(self, chave):
+    if isinstance(chave, (int, slice)):
+        return tuple.__getitem__(self, chave)
+    return _valor(self, chave)
+
+
+def _get(self, chave: str, padrao: Any = None) -> Any:
+    return _valor(self, chave) if chave in self._CHAVES else padrao
+
+
+def _contains(self, chave: str) -> bool:
+    return chave in self._CHAVES
+
+
+def _keys(self) -> List[str]:
+    return list(self._CHAVES)
+
+
+def _como_dict(self) -> Dict:
+    """ Dicionário no mesmo formato retornado sem tipado """
+    return {chave: _valor(self, chave) for chave in self._CHAVES}
+
+
+class Marca(NamedTuple):
+    """ Marca de pega_marcas. Chaves: codigo e marca """
+
+    codigo: int
+    nome: str
+
+    _CHAVES = {'codigo': 'codigo', 'marca': 'nome'}
+    __getitem__ = _getitem
+    __contains__ = _contains
+    get = _get
+    keys = _keys
+    como_dict = _como_dict
+
+    @classmethod
+    def do_dict(cls, item: Dict) -> 'Marca':
+        return cls(codigo=int(item['codigo']), nome=_texto(item['marca']))
+
+
+class Modelo(NamedTuple):
+    """ Modelo de pega_modelos. Chaves: codigo e modelo """
+
+    codigo: int
+    nome: str
+
+    _CHAVES = {'codigo': 'codigo', 'modelo': 'nome'}
+    __getitem__ = _getitem
+    __contains__ = _contains
+    get = _get
+    keys = _keys
+    como_dict = _como_dict
+
+    @classmethod
+    def do_dict(cls, item: Dict) -> 'Modelo':
+        return cls(codigo=int(item['codigo']), nome=_texto(item['modelo']))
+
+
+class AnoModelo(NamedTuple):
+    """ Ano/modelo de pega_anos_modelo. Chaves: ano, combustivel, descricao e codigo ("2020-1") """
+
+    ano: int
+    combustivel: int
+    descricao: str
+
+    _CHAVES = {'ano': 'ano', 'combustivel': 'combustivel', 'descricao': 'descricao',
+               'codigo': lambda registro: f'{registro.ano}-{registro.combustivel}'}
+    __getitem__ = _getitem
+    __contains__ = _contains
+    get = _get
+    keys = _keys
+    como_dict = _como_dict
+
+    @classmethod
+    def do_dict(cls, item: Dict) -> 'AnoModelo':
+        return cls(ano=int(item['ano']), combustivel=int(item['combustivel']), descricao=_texto(item['descricao']))
+
+
+class Preco(NamedTuple):
+    """
+    Preço de consulta_preco_veiculo. As chaves são as do retorno da FIPE (Valor, Marca, Modelo, AnoModelo, ...).
+
+    Atributes:
+    ---------
+    centavos : int
+        Valor em centavos
+    mes_referencia : date
+        Primeiro dia do mês de referência
+    """
+
+    centavos: int
+    marca: str
+    modelo: str
+    ano_modelo: int
+    combustivel: str
+    sigla_combustivel: str
+    codigo_fipe: str
+    tipo_veiculo: int
+    mes_referencia: Optional[date]
+    data_consulta: str
+    autenticacao: str
+
+    _CHAVES = {'Valor': lambda registro: formata_centavos(registro.centavos), 'Marca': 'marca', 'Modelo': 'modelo',
+               'AnoModelo': 'ano_modelo', 'Combustivel': 'combustivel', 'CodigoFipe': 'codigo_fipe',
+               'MesReferencia': lambda registro: formata_mes_referencia(registro.mes_referencia),
+               'Autenticacao': 'autenticacao', 'TipoVeiculo': 'tipo_veiculo', 'SiglaCombustivel': 'sigla_combustivel',
+               'DataConsulta': 'data_consulta'}
+    __getitem__ = _getitem
+    __contains__ = _contains
+    get = _get
+    keys = _keys
+    como_dict = _como_dict
+
+    @property
+    def reais(self) -> float:
+        return self.centavos / 100
+
+    @classmethod
+    def do_dict(cls, conteudo: Dict) -> 'Preco':
+        return cls(centavos=valor_em_centavos(conteudo.get('Valor')),
+                   marca=_texto(conteudo.get('Marca')),
+                   modelo=_texto(conteudo.get('Modelo')),
+                   ano_modelo=int(conteudo.get('AnoModelo') or 0),
+                   combustivel=_texto(conteudo.get('Combustivel')),
+                   sigla_combustivel=_texto(conteudo.get('SiglaCombustivel')),
+                   codigo_fipe=_texto(conteudo.get('CodigoFipe')),
+                   tipo_veiculo=int(conteudo.get('TipoVeiculo') or 0),
+                   mes_referencia=le_mes_referencia(conteudo.get('MesReferencia')),
+                   data_consulta=str(conteudo.get('DataConsulta') or ''),
+                   autenticacao=str(conteudo.get('Autenticacao') or ''))
+
+
+def lista(tipo: Any, itens: Iterable[Dict]) -> List:
+    """ Converte a lista de dicionários nos registros do tipo (Marca, Modelo ou AnoModelo) """
+    return [tipo.do_dict(item) for item in itens]
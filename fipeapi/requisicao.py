@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.requisicao
+~~~~~~~~~~~~~~~~~~~
+Política das requisições à FIPE: tempo limite de conexão e de leitura por endpoint e novas tentativas, com espera
+exponencial e aleatória (jitter), para as falhas transitórias (tempo esgotado, conexão interrompida, HTTP 429 e
+5xx). Cada nova tentativa passa pelo limitador de taxa, como qualquer outra requisição. Esgotadas as tentativas, a
+falha é levantada como RequestTimeoutException, RequestThrottledException ou ServerErrorException.
+"""
+import os
+import random
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from .exceptions import (
+    IncorrectSettingsException,
+    RequestFailedException,
+    RequestThrottledException,
+    ServerErrorException,
+)
+
+
+TIMEOUT_CONEXAO_PADRAO = 5.0
+TIMEOUT_LEITURA_PADRAO = 30.0
+
+
+class PoliticaRequisicao:
+    """
+    Define o tempo limite e as novas tentativas das requisições à FIPE.
+
+    Atributes:
+    ---------
+    timeout_conexao : float, optional
+        Tempo limite, em segundos, para estabelecer a conexão. Default: 5
+    timeout_leitura : float, optional
+        Tempo limite, em segundos, entre os dados recebidos da resposta. Default: 30
+    timeouts : dict, optional
+        Tempos limite (conexão, leitura) por endpoint (protocolo.MARCAS, protocolo.PRECO, ...), que substituem os
+        padrões
+    tentativas : int, optional
+        Número máximo de tentativas de cada requisição (1 desativa as novas tentativas). Default: 3
+    espera_inicial : float, optional
+        Espera máxima, em segundos, antes da segunda tentativa. Dobra a cada tentativa. Default: 0.5
+    espera_maxima : float, optional
+        Espera máxima, em segundos, entre duas tentativas. Default: 30
+    """
+
+    def __init__(self,
+                 timeout_conexao: float = TIMEOUT_CONEXAO_PADRAO,
+                 timeout_leitura: float = TIMEOUT_LEITURA_PADRAO,
+                 timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+                 tentativas: int = 3,
+                 espera_inicial: float = 0.5,
+                 espera_maxima: float = 30.0):
+        if int(tentativas) < 1:
+            raise IncorrectSettingsException('O número de tentativas deve ser maior que zero.')
+        self.timeout_conexao = float(timeout_conexao)
+        self.timeout_leitura = float(timeout_leitura)
+        self.timeouts = dict(timeouts or {})
+        self.tentativas = int(tentativas)
+        self.espera_inicial = float(espera_inicial)
+        self.espera_maxima = float(espera_maxima)
+
+    @classmethod
+    def do_ambiente(cls) -> 'PoliticaRequisicao':
+        """ Cria a política a partir das variáveis de ambiente FIPE_TIMEOUT_CONEXAO, FIPE_TIMEOUT_LEITURA e
+        FIPE_TENTATIVAS """
+        return cls(timeout_conexao=float(os.environ.get('FIPE_TIMEOUT_CONEXAO', TIMEOUT_CONEXAO_PADRAO)),
+                   timeout_leitura=float(os.environ.get('FIPE_TIMEOUT_LEITURA', TIMEOUT_LEITURA_PADRAO)),
+                   tentativas=int(os.environ.get('FIPE_TENTATIVAS', 3)))
+
+    def timeout(self, endpoint: Optional[str] = None) -> Tuple[float, float]:
+        """ Tempos limite (conexão, leitura) do endpoint """
+        return self.timeouts.get(endpoint, (self.timeout_conexao, self.timeout_leitura))
+
+    def duracao_maxima(self) -> float:
+        """ Duração máxima, em segundos, de uma requisição com todas as tentativas: o maior tempo limite de cada
+        tentativa somado às esperas máximas entre elas. Utilizada como validade da trava entre processos
+
+        >>> PoliticaRequisicao(tentativas=3, espera_maxima=30).duracao_maxima()
+        165.0
+        """
+        timeout = max(sum(tempos) for tempos in [self.timeout()] + list(self.timeouts.values()))
+        return self.tentativas * timeout + (self.tentativas - 1) * self.espera_maxima
+
+    def espera(self, tentativa: int, minimo: Optional[float] = None) -> float:
+        """ Espera, em segundos, antes da tentativa seguinte à tentativa informada (1 = primeira). Sorteada entre 0 e
+        espera_inicial * 2 ** (tentativa - 1), limitada a espera_maxima, para que os clientes não tentem todos ao
+        mesmo tempo. minimo é o tempo pedido pela FIPE (Retry-After) """
+        espera = random.uniform(0, min(self.espera_maxima, self.espera_inicial * 2 ** (tentativa - 1)))
+        if minimo:
+            espera = max(espera, min(float(minimo), self.espera_maxima))
+        return espera
+
+
+def le_retry_after(valor: Optional[str]) -> Optional[float]:
+    """ Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos
+
+    >>> le_retry_after('2')
+    2.0
+    """
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+def falha_transitoria(status: int, endpoint: str) -> Optional[RequestFailedException]:
+    """ Exceção da resposta HTTP que deve ser tentada novamente (429 ou 5xx) ou None para as demais """
+    if status == 429:
+        return RequestThrottledException(
+            f"""
+            A FIPE limitou as requisições de {endpoint} (HTTP 429).
+            """
+        )
+    if 500 <= status < 600:
+        return ServerErrorException(
+            f"""
+            A FIPE retornou erro no servidor na requisição de {endpoint} (HTTP {status}).
+            """
+        )
+    return None
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.sincronizacao
+~~~~~~~~~~~~~~~~~~~~~~
+Sincronização de um novo mês de referência com o mês anterior. O resultado é um Delta com apenas o que entrou, saiu
+ou mudou de preço. O mês anterior é lido do cache (da coleta ou da sincronização anterior) e só o que não estiver em
+cache é consultado na FIPE; como o mês anterior já está fechado, o que for lido ou consultado passa a ser guardado com
+ttl_referencia_fechada e fica disponível para as próximas sincronizações. Do novo mês são consultadas as listas de
+marcas, modelos e anos/modelo e os preços, que são comparados com os do mês anterior.
+"""
+import logging
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import chaves, protocolo
+from .consulta import Consulta
+
+
+logger = logging.getLogger(__name__)
+
+
+class Delta(NamedTuple):
+    """ Diferenças de um tipo de veículo entre dois meses de referência. Sem os preços (sincroniza com
+    precos=False), contém apenas as diferenças de marcas, modelos e anos/modelo """
+
+    tipo_veiculo: int
+    referencia: int
+    referencia_anterior: int
+    marcas_novas: Tuple[Dict, ...] = ()
+    marcas_removidas: Tuple[Dict, ...] = ()
+    # (marca, modelo)
+    modelos_novos: Tuple[Tuple[int, Dict], ...] = ()
+    modelos_removidos: Tuple[Tuple[int, Dict], ...] = ()
+    # (marca, modelo, ano/modelo)
+    anos_novos: Tuple[Tuple[int, int, Dict], ...] = ()
+    anos_removidos: Tuple[Tuple[int, int, Dict], ...] = ()
+    # (marca, modelo, ano, combustível, valor anterior ou None, valor atual) dos preços que mudaram e dos anos/modelo
+    # novos
+    precos: Tuple[Tuple[int, int, int, int, Optional[str], str], ...] = ()
+    # (marca, mensagem de erro)
+    falhas: Tuple[Tuple[int, str], ...] = ()
+
+    @property
+    def vazio(self) -> bool:
+        return not any((self.marcas_novas, self.marcas_removidas, self.modelos_novos, self.modelos_removidos,
+                        self.anos_novos, self.anos_removidos, self.precos))
+
+
+def _mes_anterior(mes: int, ano: int) -> Tuple[int, int]:
+    return (mes - 1, ano) if mes > 1 else (12, ano - 1)
+
+
+def _diferenca(atuais: List[Dict], anteriores: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """ Itens que entraram e que saíram da lista, comparados pelo código """
+    codigos_atuais = {item['codigo'] for item in atuais}
+    codigos_anteriores = {item['codigo'] for item in anteriores}
+    novos = [dict(item) for item in atuais if item['codigo'] not in codigos_anteriores]
+    removidos = [dict(item) for item in anteriores if item['codigo'] not in codigos_atuais]
+    return novos, removidos
+
+
+def _do_mes_anterior(api: Any, origem: str, chave: str, busca: Callable[[], List[Dict]]) -> List[Dict]:
+    """ Lista do mês anterior lida do cache ou, se não estiver em cache, da FIPE """
+    api.pre_carrega_cache(origem, [chave], renova=True)
+    return busca()
+
+
+def _compara_marca(api: Any, consulta: Consulta, anterior: Consulta, existia: bool,
+                   precos: bool) -> Dict[str, list]:
+    """ Compara os modelos, anos/modelo e preços de uma marca com o mês anterior """
+    delta = {'modelos_novos': [], 'modelos_removidos': [], 'anos_novos': [], 'anos_removidos': [], 'precos': []}
+    modelos = api.pega_modelos(consulta)
+    modelos_anteriores = _do_mes_anterior(api, chaves.MODELOS, protocolo.chave_modelos(anterior),
+                                          lambda: api.pega_modelos(anterior)) if existia else []
+    novos, removidos = _diferenca(modelos, modelos_anteriores)
+    delta['modelos_novos'] = [(consulta.marca, modelo) for modelo in novos]
+    delta['modelos_removidos'] = [(consulta.marca, modelo) for modelo in removidos]
+    codigos_anteriores = {int(modelo['codigo']) for modelo in modelos_anteriores}
+
+    for modelo in modelos:
+        codigo = int(modelo['codigo'])
+        consulta_modelo, anterior_modelo = consulta.com_modelo(codigo), anterior.com_modelo(codigo)
+        anos = api.pega_anos_modelo(consulta_modelo)
+        anos_anteriores = []
+        if codigo in codigos_anteriores:
+            anos_anteriores = _do_mes_anterior(api, chaves.ANOS_MODELO, protocolo.chave_anos_modelo(anterior_modelo),
+                                               lambda: api.pega_anos_modelo(anterior_modelo))
+        novos, removidos = _diferenca(anos, anos_anteriores)
+        delta['anos_novos'].extend((consulta.marca, codigo, ano) for ano in novos)
+        delta['anos_removidos'].extend((consulta.marca, codigo, ano) for ano in removidos)
+        if not precos:
+            continue
+
+        combinacoes_anteriores = {(ano['ano'], ano['combustivel']) for ano in anos_anteriores}
+        api.pre_carrega_cache(chaves.PRECO, [protocolo.chave_preco(consulta_modelo, ano=ano['ano'],
+                                                                   combustivel=ano['combustivel'])
+                                             for ano in anos])
+        api.pre_carrega_cache(chaves.PRECO, [protocolo.chave_preco(anterior_modelo, ano=ano, combustivel=combustivel)
+                                             for ano, combustivel in combinacoes_anteriores], renova=True)
+        for ano in anos:
+            valor = api.consulta_preco_veiculo(ano=ano['ano'], combustivel=ano['combustivel'],
+                                               consulta=consulta_modelo)['Valor']
+            valor_anterior = None
+            if (ano['ano'], ano['combustivel']) in combinacoes_anteriores:
+                valor_anterior = api.consulta_preco_veiculo(ano=ano['ano'], combustivel=ano['combustivel'],
+                                                            consulta=anterior_modelo)['Valor']
+            if valor != valor_anterior:
+                delta['precos'].append((consulta.marca, codigo, ano['ano'], ano['combustivel'], valor_anterior,
+                                        valor))
+    return delta
+
+
+def sincroniza(api: Any,
+               tipo_veiculo: int,
+               mes: int = None,
+               ano: int = None,
+               precos: bool = True,
+               max_workers: int = 4) -> Delta:
+    """ Sincroniza um mês de referência com o mês anterior. As listas e os preços do mês anterior são lidos do
+    cache e, o que não estiver em cache, consultado na FIPE; o que for encontrado em cache é salvo novamente com a
+    validade dos meses fechados (ttl_referencia_fechada), para que a próxima sincronização também o encontre. As
+    listas e os preços do novo mês são consultados e salvos em cache normalmente.
+
+    Parameters
+    ----------
+    api: FipeAPI
+        Cliente utilizado nas consultas
+    tipo_veiculo: int
+        Tipo de veículo (CARRO, MOTO ou CAMINHAO)
+    mes: int, optional
+        Mês de referência sincronizado. Default: mês atual
+    ano: int, optional
+        Ano de referência sincronizado. Default: ano atual
+    precos: bool, optional
+        Compara os preços de todos os anos/modelo com os do mês anterior. Com False, compara apenas marcas,
+        modelos e anos/modelo, sem nenhuma consulta de preço. Default: True
+    max_workers: int, optional
+        Número máximo de marcas comparadas ao mesmo tempo. Default: 4
+
+    Returns
+    --------
+    Delta:
+        Marcas, modelos e anos/modelo que entraram ou saíram e os preços que mudaram ou são de anos/modelo novos
+    """
+    hoje = datetime.today()
+    mes, ano = mes or hoje.month, ano or hoje.year
+    mes_anterior, ano_anterior = _mes_anterior(mes, ano)
+    consulta = api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes, ano=ano)
+    anterior = api.cria_consulta(tipo_veiculo=tipo_veiculo, mes=mes_anterior, ano=ano_anterior)
+
+    marcas = api.pega_marcas(consulta)
+    marcas_anteriores = _do_mes_anterior(api, chaves.MARCAS, protocolo.chave_marcas(anterior),
+                                         lambda: api.pega_marcas(anterior))
+    marcas_novas, marcas_removidas = _diferenca(marcas, marcas_anteriores)
+    codigos_anteriores = {int(marca['codigo']) for marca in marcas_anteriores}
+
+    logger.info(f'Sincronizando {len(marcas)} marcas da referência {consulta.referencia} com a referência '
+                f'{anterior.referencia} ...')
+
+    resultado = {'modelos_novos': [], 'modelos_removidos': [], 'anos_novos': [], 'anos_removidos': [], 'precos': []}
+    falhas = list()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(_compara_marca, api, consulta.com_marca(int(marca['codigo'])),
+                                   anterior.com_marca(int(marca['codigo'])),
+                                   int(marca['codigo']) in codigos_anteriores, precos):
+                   int(marca['codigo'])
+                   for marca in marcas}
+        # resultados na ordem das marcas, independente da ordem de conclusão
+        parciais = dict()
+        for futuro in as_completed(futuros):
+            codigo = futuros[futuro]
+            try:
+                parciais[codigo] = futuro.result()
+            except Exception as error:
+                logger.error(f'Falha na sincronização da marca {codigo}: {error}')
+                falhas.append((codigo, str(error).strip()))
+        for marca in marcas:
+            for campo, itens in parciais.get(int(marca['codigo']), {}).items():
+                resultado[campo].extend(itens)
+
+    return Delta(tipo_veiculo=consulta.tipo_veiculo, referencia=consulta.referencia,
+                 referencia_anterior=anterior.referencia, marcas_novas=tuple(marcas_novas),
+                 marcas_removidas=tuple(marcas_removidas), falhas=tuple(falhas),
+                 **{campo: tuple(itens) for campo, itens in resultado.items()})
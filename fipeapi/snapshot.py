@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2021 Deibson Carvalho.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+fipe-api.snapshot
+~~~~~~~~~~~~~~~~~
+Snapshot do catálogo coletado pelo Crawler em um diretório de arrays NumPy, aberto com memory mapping. Vários
+processos que abrem o mesmo snapshot compartilham as mesmas páginas de memória e a abertura não lê os dados.
+
+    meta.json             versão e tabela de referência dos meses incluídos
+    textos.npy            bytes UTF-8 de todos os textos (marcas, modelos, Código FIPE, etc.), sem repetição
+    textos_posicoes.npy   posição de cada texto em textos.npy
+    marcas_*.npy          marcas de cada tipo/referência
+    modelos_*.npy         modelos de cada marca
+    precos_*.npy          anos/modelo e preços em centavos de cada modelo
+
+As linhas de cada tabela são agrupadas por uma chave int64 com a referência, o tipo de veículo, a marca e o modelo,
+então as consultas são feitas com busca binária (numpy.searchsorted). Dentro de cada grupo, as linhas seguem a ordem
+das listas retornadas pela FIPE.
+"""
+import json
+import os
+
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .consulta import Consulta
+from .exceptions import IncorrectSettingsException, IncorrectValueException, ValueNotFoundException
+from .utils import meses_do_ano, formata_centavos, valor_em_centavos
+
+
+VERSAO = 1
+
+# Número de bits de cada código na chave int64
+_BITS_MODELO = 24
+_BITS_MARCA = 20
+_BITS_TIPO = 3
+_BITS_REFERENCIA = 16
+
+# Campos textuais do retorno da consulta de preço guardados na tabela de textos
+CAMPOS_TEXTO_PRECO = ('Marca', 'Modelo', 'Combustivel', 'CodigoFipe', 'MesReferencia', 'SiglaCombustivel',
+                      'DataConsulta')
+
+_COLUNAS = {
+    'marcas': ('grupo', 'codigo', 'nome'),
+    'modelos': ('grupo', 'codigo', 'nome'),
+    'precos': ('chave', 'ano', 'combustivel', 'centavos', 'descricao') + CAMPOS_TEXTO_PRECO,
+}
+
+_MESES = {nome: numero for numero, nome in meses_do_ano.items()}
+
+
+def chave_snapshot(referencia: int, tipo_veiculo: int, marca: int = 0, modelo: int = 0) -> int:
+    """ Monta a chave int64 que ordena as linhas do snapshot """
+    for valor, bits in ((referencia, _BITS_REFERENCIA), (tipo_veiculo, _BITS_TIPO), (marca, _BITS_MARCA),
+                        (modelo, _BITS_MODELO)):
+        if not 0 <= int(valor) < 1 << bits:
+            raise IncorrectValueException(
+                f"""
+                O código {valor} não cabe no formato do snapshot.
+                """
+            )
+    return (((int(referencia) << _BITS_TIPO | int(tipo_veiculo)) << _BITS_MARCA | int(marca))
+            << _BITS_MODELO | int(modelo))
+
+
+def _mes_da_referencia(mes_referencia: str) -> Optional[str]:
+    """ Converte "outubro de 2026" no formato da tabela de referência ("outubro/2026") """
+    partes = (mes_referencia or '').strip().split(' ')
+    if len(partes) == 3 and partes[0] in _MESES:
+        return f'{partes[0]}/{partes[2]}'
+    return None
+
+
+class _Textos:
+    """ Tabela de textos sem repetição utilizada na criação do snapshot """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = dict()
+        self._dados = bytearray()
+        self._posicoes = array('q', [0])
+
+    def id(self, texto: Any) -> int:
+        texto = '' if texto is None else str(texto)
+        codigo = self._ids.get(texto)
+        if codigo is None:
+            codigo = len(self._ids)
+            self._ids[texto] = codigo
+            self._dados.extend(texto.encode('utf-8'))
+            self._posicoes.append(len(self._dados))
+        return codigo
+
+    def salva(self, diretorio: str) -> None:
+        np.save(os.path.join(diretorio, 'textos.npy'), np.frombuffer(bytes(self._dados), dtype=np.uint8))
+        np.save(os.path.join(diretorio, 'textos_posicoes.npy'), np.array(self._posicoes, dtype=np.int64))
+
+
+class Snapshot:
+    """
+    Snapshot do catálogo, aberto com memory mapping. Criado a partir dos registros gravados pelo Crawler com
+    Snapshot.cria e aberto com Snapshot.abre. Pode ser utilizado pelo FipeAPI no modo offline.
+
+    Atributes:
+    ---------
+    diretorio : str
+        Diretório do snapshot
+    """
+
+    def __init__(self, diretorio: str):
+        self.diretorio = diretorio
+        caminho_meta = os.path.join(diretorio, 'meta.json')
+        if not os.path.exists(caminho_meta):
+            raise IncorrectSettingsException(f'O diretório {diretorio} não possui um snapshot.')
+        with open(caminho_meta, 'r', encoding='utf-8') as arquivo:
+            meta = json.load(arquivo)
+        if meta.get('versao') != VERSAO:
+            raise IncorrectSettingsException(f'Versão do snapshot não suportada: {meta.get("versao")}.')
+        self.tabela_referencia: List[Dict] = meta['tabela_referencia']
+        self._textos = self._abre('textos')
+        self._posicoes = self._abre('textos_posicoes')
+        self._colunas = {tabela: {coluna: self._abre(f'{tabela}_{coluna}') for coluna in colunas}
+                         for tabela, colunas in _COLUNAS.items()}
+        self._codigos_textos: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def abre(cls, diretorio: str) -> 'Snapshot':
+        return cls(diretorio)
+
+    def _abre(self, nome: str) -> np.ndarray:
+        return np.load(os.path.join(self.diretorio, f'{nome}.npy'), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self._colunas['precos']['chave'])
+
+    def texto(self, codigo: int) -> str:
+        """ Retorna o texto pelo seu código na tabela de textos """
+        return bytes(self._textos[self._posicoes[codigo]:self._posicoes[codigo + 1]]).decode('utf-8')
+
+    def _faixa(self, tabela: str, coluna: str, chave: int) -> range:
+        """ Linhas da tabela com a chave informada """
+        chaves = self._colunas[tabela][coluna]
+        return range(int(np.searchsorted(chaves, chave, side='left')),
+                     int(np.searchsorted(chaves, chave, side='right')))
+
+    def _lista(self, tabela: str, chave: int, campo: str) -> List[Dict]:
+        colunas = self._colunas[tabela]
+        return [{'codigo': int(colunas['codigo'][i]), campo: self.texto(colunas['nome'][i])}
+                for i in self._faixa(tabela, 'grupo', chave)]
+
+    def marcas(self, consulta: Consulta) -> List[Dict]:
+        """ Lista de marcas no mesmo formato de FipeAPI.pega_marcas """
+        return self._lista('marcas', chave_snapshot(consulta.referencia, consulta.tipo_veiculo), 'marca')
+
+    def modelos(self, consulta: Consulta) -> List[Dict]:
+        """ Lista de modelos no mesmo formato de FipeAPI.pega_modelos """
+        return self._lista('modelos', chave_snapshot(consulta.referencia, consulta.tipo_veiculo, consulta.marca),
+                           'modelo')
+
+    def _linhas_modelo(self, consulta: Consulta) -> range:
+        return self._faixa('precos', 'chave', chave_snapshot(consulta.referencia, consulta.tipo_veiculo,
+                                                              consulta.marca, consulta.modelo))
+
+    def anos_modelo(self, consulta: Consulta) -> List[Dict]:
+        """ Lista de anos/modelo no mesmo formato de FipeAPI.pega_anos_modelo """
+        colunas = self._colunas['precos']
+        anos = list()
+        for i in self._linhas_modelo(consulta):
+            ano, combustivel = int(colunas['ano'][i]), int(colunas['combustivel'][i])
+            anos.append({'ano': ano, 'combustivel': combustivel, 'descricao': self.texto(colunas['descricao'][i]),
+                         'codigo': f'{ano}-{combustivel}'})
+        return anos
+
+    def preco(self, consulta: Consulta, ano: int, combustivel: int) -> Dict:
+        """ Preço no mesmo formato de FipeAPI.consulta_preco_veiculo """
+        colunas = self._colunas['precos']
+        for i in self._linhas_modelo(consulta):
+            if colunas['ano'][i] == int(ano) and colunas['combustivel'][i] == int(combustivel):
+                return self._preco(i, consulta.tipo_veiculo)
+        raise ValueNotFoundException(f'{consulta} {ano}-{combustivel}')
+
+    def preco_por_codigo_fipe(self, consulta: Consulta, codigo_fipe: str, ano: int, combustivel: int) -> Dict:
+        """ Preço pelo Código FIPE, no mesmo formato de FipeAPI.consulta_preco_por_codigo_fipe """
+        if self._codigos_textos is None:
+            self._codigos_textos = {self.texto(codigo): codigo for codigo in range(len(self._posicoes) - 1)}
+        codigo = self._codigos_textos.get(str(codigo_fipe).strip())
+        colunas = self._colunas['precos']
+        chaves = colunas['chave']
+        inicio = int(np.searchsorted(chaves, chave_snapshot(consulta.referencia, consulta.tipo_veiculo)))
+        fim = int(np.searchsorted(chaves, chave_snapshot(consulta.referencia, consulta.tipo_veiculo + 1)))
+        if codigo is not None:
+            linhas = np.flatnonzero((colunas['CodigoFipe'][inicio:fim] == codigo) &
+                                    (colunas['ano'][inicio:fim] == int(ano)) &
+                                    (colunas['combustivel'][inicio:fim] == int(combustivel)))
+            if len(linhas):
+                return self._preco(inicio + int(linhas[0]), consulta.tipo_veiculo)
+        raise ValueNotFoundException(f'{consulta} {codigo_fipe} {ano}-{combustivel}')
+
+    def _preco(self, linha: int, tipo_veiculo: int) -> Dict:
+        colunas = self._colunas['precos']
+        preco = {campo: self.texto(colunas[campo][linha]) for campo in CAMPOS_TEXTO_PRECO}
+        preco.update({'Valor': formata_centavos(colunas['centavos'][linha]), 'AnoModelo': int(colunas['ano'][linha]),
+                      'TipoVeiculo': tipo_veiculo, 'Autenticacao': ''})
+        return preco
+
+    def colunas_precos(self) -> Dict[str, np.ndarray]:
+        """ Colunas de todos os preços do snapshot, com os códigos separados da chave (sem cópia dos demais) """
+        colunas = self._colunas['precos']
+        chave = colunas['chave']
+        return {'referencia': (chave >> (_BITS_MODELO + _BITS_MARCA + _BITS_TIPO)).astype(np.int32),
+                'tipo_veiculo': (chave >> (_BITS_MODELO + _BITS_MARCA) & ((1 << _BITS_TIPO) - 1)).astype(np.int32),
+                'marca': (chave >> _BITS_MODELO & ((1 << _BITS_MARCA) - 1)).astype(np.int32),
+                'modelo': (chave & ((1 << _BITS_MODELO) - 1)).astype(np.int32),
+                'ano': colunas['ano'],
+                'combustivel': colunas['combustivel'],
+                'centavos': colunas['centavos']}
+
+    @classmethod
+    def cria(cls, registros: Iterable[Dict], diretorio: str) -> 'Snapshot':
+        """ Cria o snapshot a partir dos registros gravados pelo Crawler (crawler.le_coleta) e o abre """
+        os.makedirs(diretorio, exist_ok=True)
+        textos = _Textos()
+        marcas: Dict[Tuple[int, int], Tuple[int, int]] = dict()
+        modelos: Dict[Tuple[int, int], Tuple[int, int]] = dict()
+        meses: Dict[int, str] = dict()
+        precos = {coluna: array('q') for coluna in _COLUNAS['precos'] + ('ordem',)}
+
+        for registro in registros:
+            referencia, tipo = int(registro['referencia']), int(registro['tipo_veiculo'])
+            marca, modelo = int(registro['codigo_marca']), int(registro['codigo_modelo'])
+            preco = registro['preco']
+            marcas.setdefault((chave_snapshot(referencia, tipo), marca),
+                              (registro.get('ordem_marca', marca), textos.id(registro['marca'])))
+            modelos.setdefault((chave_snapshot(referencia, tipo, marca), modelo),
+                               (registro.get('ordem_modelo', modelo), textos.id(registro['modelo'])))
+            mes = _mes_da_referencia(preco.get('MesReferencia'))
+            if mes:
+                meses.setdefault(referencia, mes)
+
+            precos['chave'].append(chave_snapshot(referencia, tipo, marca, modelo))
+            precos['ordem'].append(int(registro.get('ordem_ano', 0)))
+            precos['ano'].append(int(registro['ano']))
+            precos['combustivel'].append(int(registro['combustivel']))
+            precos['centavos'].append(valor_em_centavos(preco.get('Valor')))
+            precos['descricao'].append(textos.id(registro.get('descricao')
+                                                 or f'{registro["ano"]} {preco.get("Combustivel") or ""}'.strip()))
+            for campo in CAMPOS_TEXTO_PRECO:
+                precos[campo].append(textos.id(preco.get(campo)))
+
+        def salva(tabela: str, colunas: Dict[str, np.ndarray], ordem: np.ndarray) -> None:
+            for coluna in _COLUNAS[tabela]:
+                dados = colunas[coluna][ordem]
+                if coluna not in ('grupo', 'chave', 'centavos'):
+                    dados = dados.astype(np.int32)
+                np.save(os.path.join(diretorio, f'{tabela}_{coluna}.npy'), dados)
+
+        for tabela, itens in (('marcas', marcas), ('modelos', modelos)):
+            colunas = {'grupo': np.array([grupo for grupo, _ in itens], dtype=np.int64),
+                       'codigo': np.array([codigo for _, codigo in itens], dtype=np.int64),
+                       'ordem': np.array([ordem for ordem, _ in itens.values()], dtype=np.int64),
+                       'nome': np.array([nome for _, nome in itens.values()], dtype=np.int64)}
+            salva(tabela, colunas, np.lexsort((colunas['codigo'], colunas['ordem'], colunas['grupo'])))
+
+        colunas = {coluna: np.asarray(valores, dtype=np.int64) for coluna, valores in precos.items()}
+        salva('precos', colunas, np.lexsort((colunas['combustivel'], colunas['ano'], colunas['ordem'],
+                                             colunas['chave'])))
+        textos.salva(diretorio)
+
+        tabela_referencia = [{'Codigo': codigo, 'Mes': mes} for codigo, mes in sorted(meses.items(), reverse=True)]
+        with open(os.path.join(diretorio, 'meta.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump({'versao': VERSAO, 'tabela_referencia': tabela_referencia, 'linhas': len(colunas['chave'])},
+                      arquivo, ensure_ascii=False)
+        return cls(diretorio)
@@ -15,8 +15,19 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
+import re
 
 
 meses_do_ano = {1: 'janeiro', 2: 'fevereiro', 3: 'março', 4: 'abril', 5: 'maio', 6: 'junho', 7: 'julho',
                 8: 'agosto', 9: 'setembro', 10: 'outubro', 11: 'novembro', 12: 'dezembro'}
 
+
+def valor_em_centavos(valor: str) -> int:
+    """ Converte o valor retornado pela FIPE ("R$ 95.123,00") em centavos """
+    return int(re.sub(r'\D', '', valor or '') or 0)
+
+
+def formata_centavos(centavos: int) -> str:
+    """ Formata os centavos como o valor retornado pela FIPE ("R$ 95.123,00") """
+    reais = f'{int(centavos) // 100:,}'.replace(',', '.')
+    return f'R$ {reais},{int(centavos) % 100:02d}'
@@ -47,11 +47,16 @@ requires = [
     'numpy>=1.18'
 
 ]
+extras = {
+    'async': ['aiohttp>=3.7,<4', 'aioredis>=2,<3'],
+    'codec': ['msgpack>=1.0', 'zstandard>=0.15', 'orjson>=3'],
+}
 test_requirements = [
     'pytest-cov',
     'pytest-xdist',
     'pytest>=3',
     'pytest-redis',
+    'fakeredis',
 ]
 
 about = {}
@@ -76,6 +81,7 @@ setup(
     include_package_data=True,
     python_requires="!=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, !=3.4.*, !=3.5.*",
     install_requires=requires,
+    extras_require=extras,
     license=about['__license__'],
     zip_safe=False,
     classifiers=[
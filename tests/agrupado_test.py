@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import pytest
+from fipeapi import CARRO, GASOLINA, Consulta, FipeAPI, BackendRedisAgrupado, protocolo
+from fipeapi.chaves import completa
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+class TestRedisAgrupado:
+
+    def test_hashes_por_referencia_e_marca(self):
+        backend = BackendRedisAgrupado(cliente=fakeredis.FakeRedis())
+        consulta = Consulta(tipo_veiculo=1, referencia=300, marca=23, modelo=6100)
+        marcas = completa('fipeAPI', protocolo.chave_marcas(consulta))
+        preco = completa('fipeAPI', protocolo.chave_preco(consulta, ano=2020, combustivel=GASOLINA))
+        tabela = completa('fipeAPI', protocolo.chave_tabela_referencia())
+        backend.mset({marcas: b'm', preco: b'p', tabela: b't'}, ttl=60)
+
+        assert sorted(backend.cliente.keys()) == [b'fipeAPI:v2:grupo-ttl:1:300', b'fipeAPI:v2:grupo-ttl:1:300:23',
+                                                  b'fipeAPI:v2:grupo-ttl:1:300:marcas',
+                                                  b'fipeAPI:v2:tabela-referencia']
+        assert backend.mget([preco, 'nada', tabela, marcas]) == [b'p', None, b't', b'm']
+        assert backend.carrega_grupo(1, 300, 23) == {preco: b'p'}
+        assert backend.cliente.ttl('fipeAPI:v2:grupo-ttl:1:300:23') == 60
+
+        assert backend.invalida_referencia(1, 300) == 3
+        assert backend.cliente.keys() == [b'fipeAPI:v2:tabela-referencia']
+
+    def test_ttls_diferentes_no_mesmo_grupo(self):
+        backend = BackendRedisAgrupado(cliente=fakeredis.FakeRedis())
+        consulta = Consulta(tipo_veiculo=1, referencia=300, marca=23, modelo=6100)
+        atual = completa('fipeAPI', protocolo.chave_preco(consulta, ano=2020, combustivel=GASOLINA))
+        fechado = completa('fipeAPI', protocolo.chave_preco(consulta, ano=2019, combustivel=GASOLINA))
+        backend.set(atual, b'a', ttl=60)
+        backend.set(fechado, b'f')
+
+        # a entrada sem TTL não torna permanente a entrada do mês corrente, e vice-versa
+        assert backend.cliente.ttl('fipeAPI:v2:grupo-ttl:1:300:23') == 60
+        assert backend.cliente.ttl('fipeAPI:v2:grupo:1:300:23') == -1
+        assert backend.mget([atual, fechado]) == [b'a', b'f']
+        assert backend.carrega_grupo(1, 300, 23) == {atual: b'a', fechado: b'f'}
+
+        # regravada sem TTL, a entrada passa para o hash permanente
+        backend.set(atual, b'b')
+        assert backend.cliente.hkeys('fipeAPI:v2:grupo-ttl:1:300:23') == []
+        assert backend.get(atual) == b'b'
+        assert backend.invalida_referencia(1, 300) == 3
+        assert backend.cliente.keys() == []
+
+    def test_cliente_carrega_marca(self, fipe_falsa):
+        backend = BackendRedisAgrupado(cliente=fakeredis.FakeRedis())
+        api = FipeAPI(silently=True, cache=backend)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca=23, modelo=6100)
+        preco = api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta)
+
+        fipe_falsa.chamadas.clear()
+        api = FipeAPI(silently=True, cache=backend)
+        assert api.pre_carrega_grupo(consulta) == 2  # anos/modelo e preço
+        assert api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta) == preco
+        assert api.memoria.estatisticas()['preco'].acertos == 1
+        assert sum(fipe_falsa.chamadas.values()) == 0
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import numpy as np
+
+from fipeapi import CARRO, FipeAPI, Crawler, Snapshot
+from fipeapi.analise import MatrizPrecos
+from fipeapi.crawler import le_coleta
+
+
+class TestAnalise:
+
+    def test_matriz_de_precos(self, fipe_falsa, tmp_path):
+        hoje = datetime.today()
+        mes, ano = (hoje.month - 2, hoje.year) if hoje.month > 2 else (hoje.month + 10, hoje.year - 1)
+        saida = str(tmp_path / 'fipe.jsonl')
+        Crawler(FipeAPI(silently=True), saida=saida, tipos_veiculo=(CARRO,)).executa(mes, ano, hoje.month, hoje.year)
+        matriz = MatrizPrecos.dos_registros(le_coleta(saida))
+
+        assert matriz.referencias.tolist() == [298, 299, 300]
+        assert matriz.precos.shape == (5, 3)
+        onix = np.flatnonzero((matriz.modelo == 6100) & (matriz.ano == 2020))[0]
+        assert matriz.precos[onix].tolist() == [10858.0, 10859.0, 10860.0]
+        assert np.allclose(matriz.variacao_percentual()[onix], [100 / 10858, 100 / 10859])
+
+        media = matriz.media(por='marca')
+        assert media.grupos.tolist() == [[1, 23], [1, 25], [1, 59]]
+        assert np.isclose(media.valores[0, 2], (10860 + 10850 + 10200) / 3)
+        indice = matriz.indice(por='tipo_veiculo', base=299)
+        assert indice.valores[0, 1] == 100
+        assert 100 < indice.valores[0, 2] < 101
+
+        anos, fatores = matriz.depreciacao()
+        assert anos.tolist() == [2010, 2015, 2018, 2019, 2020]
+        assert fatores[3] == 10850 / 10860 and fatores[4] == 1
+
+        snapshot = Snapshot.cria(le_coleta(saida), str(tmp_path / 'snapshot'))
+        do_snapshot = MatrizPrecos.do_snapshot(snapshot, referencias=[299, 300])
+        assert np.array_equal(do_snapshot.precos, matriz.precos[:, 1:])
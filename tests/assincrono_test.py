@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import pytest
+from fipeapi import (CARRO, MOTO, GASOLINA, AsyncFipeAPI, CacheAssincrono, CacheMemoriaAssincrono, IndiceBusca,
+                     PoliticaCache)
+
+
+class TestAssincrono:
+
+    def test_consulta_preco(self, fipe_falsa_assincrona):
+        async def consulta():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona) as api:
+                c = await api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+                return await api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=c)
+
+        preco = asyncio.run(consulta())
+        assert preco['AnoModelo'] == 2020
+        assert preco['Valor'].startswith('R$')
+
+    def test_indice_de_referencias(self, fipe_falsa_assincrona):
+        async def consultas():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona) as api:
+                await api.cria_consulta(tipo_veiculo=CARRO)
+                indice = api._indice_referencias
+                consulta = await api.cria_consulta(tipo_veiculo=CARRO)
+                return consulta, indice is api._indice_referencias
+
+        consulta, mesmo_indice = asyncio.run(consultas())
+        assert consulta.referencia == 300 and mesmo_indice
+
+    def test_tabela_de_referencia_renovada(self, fipe_falsa_assincrona):
+        async def consultas():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona,
+                                    politica_cache=PoliticaCache(ttl_tabela_referencia=60)) as api:
+                await api.cria_consulta(tipo_veiculo=CARRO)
+                await api.cria_consulta(tipo_veiculo=CARRO)
+                # depois de ttl_tabela_referencia, a tabela em memória é carregada novamente
+                api._tabela_carregada_em -= 60
+                await api.cria_consulta(tipo_veiculo=CARRO)
+
+        asyncio.run(consultas())
+        assert fipe_falsa_assincrona.chamadas['ConsultarTabelaDeReferencia'] == 2
+
+    def test_indices_reutilizados(self, fipe_falsa_assincrona, monkeypatch):
+        montados = []
+
+        class IndiceContado(IndiceBusca):
+            def __init__(self, itens, campo):
+                montados.append(campo)
+                super().__init__(itens, campo)
+
+        monkeypatch.setattr('fipeapi.assincrono.IndiceBusca', IndiceContado)
+
+        async def consultas():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona) as api:
+                for _ in range(3):
+                    c = await api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+                return c
+
+        consulta = asyncio.run(consultas())
+        assert (consulta.marca, consulta.modelo) == (23, 6100)
+        assert montados == ['marca', 'modelo']
+
+    def test_consulta_preco_por_codigo_fipe(self, fipe_falsa_assincrona):
+        async def consulta():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona) as api:
+                c = await api.cria_consulta(tipo_veiculo=MOTO)
+                return await api.consulta_preco_por_codigo_fipe('007100-1', ano=2012, combustivel=GASOLINA,
+                                                                consulta=c)
+
+        assert asyncio.run(consulta())['AnoModelo'] == 2012
+        assert fipe_falsa_assincrona.chamadas['ConsultarModelos'] == 0
+
+    def test_consultas_concorrentes(self, fipe_falsa_assincrona):
+        cache = CacheMemoriaAssincrono()
+
+        async def consulta(api, tipo, marca, modelo, ano):
+            c = await api.cria_consulta(tipo_veiculo=tipo, marca=marca, modelo=modelo)
+            return await api.consulta_preco_veiculo(ano=ano, combustivel=GASOLINA, consulta=c)
+
+        async def todas():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona, cache=cache) as api:
+                return await asyncio.gather(*[consulta(api, CARRO, 'Honda', 'Civic', 2018),
+                                              consulta(api, MOTO, 'YAMAHA', 'YBR', 2012)] * 20)
+
+        precos = asyncio.run(todas())
+        assert len(precos) == 40
+        assert fipe_falsa_assincrona.chamadas['ConsultarTabelaDeReferencia'] == 1
+        assert json.loads(asyncio.run(cache.get('fipeAPI:v2:tabela-referencia')))[0]['Codigo'] == 300
+
+    def test_cache_incompleto(self):
+        class SemSet(CacheAssincrono):
+            async def get(self, chave):
+                return None
+
+        with pytest.raises(TypeError):
+            SemSet()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import time
+import pytest
+from fipeapi import CARRO, FipeAPI, BackendCache, BackendMemoria, BackendSQLite
+
+
+class TestBackends:
+
+    def test_memoria(self):
+        backend = BackendMemoria()
+        backend.mset({'a': '1', 'b': '2'}, ttl=1)
+        backend.set('c', '3')
+        assert backend.mget(['a', 'x', 'c']) == ['1', None, '3']
+        assert backend.delete('a', 'x') == 1
+        assert backend.get('a') is None
+
+    def test_backend_incompleto(self):
+        class SemDelete(BackendCache):
+            def get(self, chave):
+                return None
+
+            def set(self, chave, valor, ttl=None):
+                pass
+
+        with pytest.raises(TypeError):
+            SemDelete()
+
+    def test_sqlite(self, tmp_path):
+        backend = BackendSQLite(str(tmp_path / 'cache.sqlite3'))
+        backend.mset({f'chave-{i}': f'valor-{i}' for i in range(1200)})
+        backend.set('expira', 'x', ttl=1)
+        assert backend.mget(['chave-0', 'chave-1199', 'nada']) == ['valor-0', 'valor-1199', None]
+        assert backend.get('expira') == 'x'
+        assert backend.delete('chave-0') == 1
+        assert backend.get('chave-0') is None
+        time.sleep(1.1)
+        assert backend.get('expira') is None
+        assert backend.limpa_expirados() == 1
+        backend.fecha()
+
+    def test_sqlite_entre_reinicios(self, fipe_falsa, tmp_path):
+        caminho = str(tmp_path / 'cache.sqlite3')
+        api = FipeAPI(silently=True, cache=BackendSQLite(caminho))
+        modelos = api.pega_modelos(api.cria_consulta(tipo_veiculo=CARRO, marca=23))
+
+        fipe_falsa.chamadas.clear()
+        api = FipeAPI(silently=True, cache=BackendSQLite(caminho))
+        assert api.pega_modelos(api.cria_consulta(tipo_veiculo=CARRO, marca=23)) == modelos
+        assert fipe_falsa.chamadas['ConsultarModelos'] == 0
+        assert fipe_falsa.chamadas['ConsultarMarcas'] == 0
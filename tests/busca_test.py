@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from fipeapi import FipeAPI, CARRO, MOTO, IncorrectValueException
+from fipeapi.busca import IndiceBusca, normaliza
+
+
+MARCAS = [{'codigo': 1, 'marca': 'Citroën'}, {'codigo': 2, 'marca': 'GM - Chevrolet'}, {'codigo': 3, 'marca': 'Honda'},
+          {'codigo': 4, 'marca': 'Mercedes-Benz'}]
+
+
+class TestBusca:
+
+    def test_normaliza(self):
+        assert normaliza('Mercedes-Benz  C-180 Avantgarde 1.8') == 'mercedes benz c 180 avantgarde 1.8'
+
+    def test_indice(self):
+        indice = IndiceBusca(MARCAS, 'marca')
+        assert indice.melhor('citroen').codigo == 1
+        assert indice.melhor('CITROËN').pontuacao == 1.0
+        assert indice.melhor('gm').codigo == 2
+        assert indice.melhor('chevrolt').codigo == 2
+        assert indice.melhor('merc benz').codigo == 4
+        assert indice.melhor('hond').codigo == 3
+        assert indice.melhor('AAAAA') is None
+        assert indice.busca('') == []
+
+    def test_localiza_na_api(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca='chevrolet', modelo='onix hatch')
+        assert (consulta.marca, consulta.modelo) == (23, 6100)
+        with pytest.raises(IncorrectValueException):
+            api.cria_consulta(tipo_veiculo=CARRO, marca='AAAAA')
+
+        # o índice é montado uma vez por lista
+        assert api.indice_marcas(consulta) is api.indice_marcas(consulta)
+
+    def test_busca_modelos_de_todas_as_marcas(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        resultados = api.busca_modelos('civic', consulta=api.cria_consulta(tipo_veiculo=CARRO))
+        assert (resultados[0].codigo, resultados[0].marca) == (4000, 25)
+
+        assert api.busca_marcas('yamaha', consulta=api.cria_consulta(tipo_veiculo=MOTO))[0].codigo == 101
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+from fipeapi import CARRO, GASOLINA, AsyncFipeAPI, CacheMemoriaAssincrono, Consulta
+from fipeapi import chaves, protocolo
+
+
+class TestChaves:
+
+    def test_sem_colisao(self):
+        # no esquema antigo ambas as chaves eram "130123"
+        a = protocolo.chave_modelos(Consulta(tipo_veiculo=1, referencia=30, marca=123))
+        b = protocolo.chave_modelos(Consulta(tipo_veiculo=1, referencia=301, marca=23))
+        assert a == 'modelos:1:30:123'
+        assert b == 'modelos:1:301:23'
+        assert chaves.completa('fipeAPI', b) == 'fipeAPI:v2:modelos:1:301:23'
+        assert protocolo.chave_marcas(Consulta(tipo_veiculo=1, referencia=300)) != chaves.chave(chaves.MODELOS, 1, 300)
+
+    def test_chave_legada(self):
+        consulta = Consulta(tipo_veiculo=1, referencia=300, marca=23, modelo=6100)
+        chave = protocolo.chave_preco(consulta, ano=2020, combustivel=GASOLINA)
+        assert chaves.legada(chave) == '1300236100-2020-1'
+        assert chaves.referencia(chave) == 300
+        assert chaves.legada(protocolo.chave_tabela_referencia()) == 'TabelaReferencia'
+        assert chaves.separa(protocolo.chave_codigo_fipe('a:b')) == (chaves.CODIGO_FIPE, ['a:b'])
+
+    def test_valida_legado(self):
+        chave = protocolo.chave_marcas(Consulta(tipo_veiculo=1, referencia=300))
+        assert chaves.valida_legado(chave, [{'codigo': 23, 'marca': 'GM'}])
+        assert not chaves.valida_legado(chave, [{'codigo': 6100, 'modelo': 'Onix'}])
+
+    def test_migra_cache_legado(self, fipe_falsa_assincrona):
+        cache = CacheMemoriaAssincrono()
+        marcas = [{'codigo': 23, 'marca': 'GM - Chevrolet'}]
+
+        async def consulta():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona, cache=cache, le_chaves_legadas=True) as api:
+                c = await api.cria_consulta(tipo_veiculo=CARRO)
+                await cache.set(f'fipeAPI-{CARRO}{c.referencia}', json.dumps(marcas))
+                return c, await api.pega_marcas(c)
+
+        c, resultado = asyncio.run(consulta())
+        assert resultado == marcas
+        assert fipe_falsa_assincrona.chamadas['ConsultarMarcas'] == 0
+        chave = chaves.completa('fipeAPI', protocolo.chave_marcas(c))
+        assert json.loads(asyncio.run(cache.get(chave))) == marcas
+
+    def test_chaves_legadas_desativadas_por_padrao(self, fipe_falsa_assincrona, monkeypatch):
+        monkeypatch.delenv('FIPE_LE_CHAVES_LEGADAS', raising=False)
+        cache = CacheMemoriaAssincrono()
+
+        async def consulta():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona, cache=cache) as api:
+                c = await api.cria_consulta(tipo_veiculo=CARRO)
+                await cache.set(f'fipeAPI-{CARRO}{c.referencia}', json.dumps([{'codigo': 1, 'marca': 'Legada'}]))
+                return await api.pega_marcas(c)
+
+        assert {'codigo': 1, 'marca': 'Legada'} not in asyncio.run(consulta())
+        assert fipe_falsa_assincrona.chamadas['ConsultarMarcas'] == 1
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+import fipeapi
+from fipeapi import CARRO, GASOLINA, configura_cliente_padrao, define_cliente_padrao, pega_cliente_padrao
+
+
+class TestClientePadrao:
+
+    def test_funcoes_compartilham_o_cliente(self, fipe_falsa):
+        configura_cliente_padrao(silently=True)
+        try:
+            assert fipeapi.pega_marcas(CARRO)
+            assert fipeapi.pega_modelos('GM', tipo_veiculo=CARRO)
+            assert fipeapi.consulta_preco_veiculo('GM', 'Onix', ano_do_modelo=2020, combustivel=GASOLINA)
+            assert pega_cliente_padrao() is pega_cliente_padrao()
+        finally:
+            configura_cliente_padrao()
+            define_cliente_padrao(None)
+
+        # a tabela de referência e as marcas são consultadas uma única vez pelo cliente compartilhado
+        assert fipe_falsa.chamadas['ConsultarTabelaDeReferencia'] == 1
+        assert fipe_falsa.chamadas['ConsultarMarcas'] == 1
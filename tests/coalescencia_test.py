@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import pytest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fipeapi import CARRO, FipeAPI
+from fipeapi.coalescencia import Coalescedor, CoalescedorAssincrono
+
+
+class TestCoalescencia:
+
+    def test_uma_execucao_por_chave(self):
+        coalescedor = Coalescedor()
+        chamadas = []
+
+        def lenta():
+            chamadas.append(threading.get_ident())
+            time.sleep(0.1)
+            return 42
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            resultados = list(executor.map(lambda _: coalescedor.executa('chave', lenta), range(8)))
+
+        assert resultados == [42] * 8
+        assert len(chamadas) == 1
+
+    def test_erro_propagado(self):
+        coalescedor = Coalescedor()
+
+        def falha():
+            time.sleep(0.05)
+            raise ValueError('falhou')
+
+        def executa(_):
+            with pytest.raises(ValueError):
+                coalescedor.executa('chave', falha)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(executa, range(4)))
+        assert coalescedor.executa('chave', lambda: 1) == 1
+
+    def test_assincrono(self):
+        chamadas = []
+
+        async def lenta():
+            chamadas.append(1)
+            await asyncio.sleep(0.05)
+            return 'ok'
+
+        async def todas():
+            coalescedor = CoalescedorAssincrono()
+            return await asyncio.gather(*[coalescedor.executa('chave', lenta) for _ in range(10)])
+
+        assert asyncio.run(todas()) == ['ok'] * 10
+        assert len(chamadas) == 1
+
+    def test_cliente_coalesce_requisicoes(self, fipe_falsa, monkeypatch):
+        api = FipeAPI(silently=True)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca=23)
+        post = fipe_falsa.post
+
+        def post_lento(self, url, data=None, **kwargs):
+            time.sleep(0.05)
+            return post(self, url, data=data, **kwargs)
+
+        monkeypatch.setattr(fipe_falsa, 'post', post_lento)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: api.pega_modelos(consulta), range(8)))
+        assert fipe_falsa.chamadas['ConsultarModelos'] == 1
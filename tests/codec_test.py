@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import json
+import pytest
+from fipeapi import CARRO, FipeAPI, BackendMemoria, Codec, protocolo
+from fipeapi.chaves import completa
+
+MODELOS = [{'codigo': i, 'modelo': f'Modelo {i} 1.0 Flex 4p'} for i in range(100)]
+
+
+class TestCodec:
+
+    def test_json_puro_compativel(self):
+        codificado = Codec().codifica(MODELOS)
+        assert json.loads(codificado) == MODELOS
+        assert Codec.decodifica(json.dumps(MODELOS)) == MODELOS
+        assert Codec.decodifica(json.dumps(MODELOS).encode()) == MODELOS
+
+    def test_zlib(self):
+        codec = Codec.do_texto('json+zlib')
+        codificado = codec.codifica(MODELOS)
+        assert codificado[:3] == b'\xfajz'
+        assert len(codificado) < len(json.dumps(MODELOS)) / 4
+        assert Codec.decodifica(codificado) == MODELOS
+        assert codec.codifica([1])[:3] == b'\xfajn'  # valores pequenos não são comprimidos
+
+    def test_msgpack(self):
+        pytest.importorskip('msgpack')
+        codificado = Codec('msgpack', 'zlib').codifica(MODELOS)
+        assert codificado[:2] == b'\xfam'
+        assert Codec.decodifica(codificado) == MODELOS
+
+    def test_cliente_com_codec(self, fipe_falsa):
+        backend = BackendMemoria()
+        api = FipeAPI(silently=True, cache=backend, codec=Codec(compressao='zlib', min_compressao=0))
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca=23)
+        modelos = api.pega_modelos(consulta)
+        assert backend.get(completa('fipeAPI', protocolo.chave_modelos(consulta))).startswith(b'\xfa')
+
+        fipe_falsa.chamadas.clear()
+        api = FipeAPI(silently=True, cache=backend)
+        assert api.pega_modelos(consulta) == modelos
+        assert fipe_falsa.chamadas['ConsultarModelos'] == 0
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pytest
+
+from fipeapi import FipeAPI, BackendMemoria, CARRO, MOTO, GASOLINA, IncorrectValueException, ValueNotFoundException
+
+HOJE = datetime.today()
+MES_ANTERIOR, ANO_ANTERIOR = (HOJE.month - 1, HOJE.year) if HOJE.month > 1 else (12, HOJE.year - 1)
+
+
+class TestCodigoFipe:
+
+    def test_consulta_por_codigo_fipe(self, fipe_falsa):
+        cache = BackendMemoria()
+        api = FipeAPI(silently=True, cache=cache)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+        for ano in (2020, 2019):
+            api.consulta_preco_veiculo(ano=ano, combustivel=GASOLINA, consulta=consulta)
+        fipe_falsa.chamadas.clear()
+
+        resultado = FipeAPI(silently=True, cache=cache).consulta_por_codigo_fipe('006100-1')
+        assert (resultado['tipo_veiculo'], resultado['marca'], resultado['modelo']) == (CARRO, 23, 6100)
+        assert resultado['referencia'] == consulta.referencia
+        assert [preco['AnoModelo'] for preco in resultado['precos']] == [2020, 2019]
+        assert sum(fipe_falsa.chamadas.values()) == 0
+
+        with pytest.raises(ValueNotFoundException):
+            api.consulta_por_codigo_fipe('999999-9')
+
+    def test_indice_com_anos_modelo(self, fipe_falsa):
+        cache = BackendMemoria()
+        api = FipeAPI(silently=True, cache=cache)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+        api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta)
+        fipe_falsa.chamadas.clear()
+
+        # o índice guarda os anos/modelo: os anos não são consultados e o preço que falta vem pelo Código FIPE
+        outra = FipeAPI(silently=True, cache=cache)
+        assert [p['AnoModelo'] for p in outra.consulta_por_codigo_fipe('006100-1')['precos']] == [2020, 2019]
+        assert dict(fipe_falsa.chamadas) == {'ConsultarValorComTodosParametros': 1}
+
+        fipe_falsa.chamadas.clear()
+        FipeAPI(silently=True, cache=cache).consulta_por_codigo_fipe('006100-1')
+        assert sum(fipe_falsa.chamadas.values()) == 0
+
+    def test_codigo_fora_do_indice(self, fipe_falsa):
+        cache = BackendMemoria()
+        resultado = FipeAPI(silently=True, cache=cache).consulta_por_codigo_fipe('007100-1')
+        assert (resultado['tipo_veiculo'], resultado['marca'], resultado['modelo']) == (MOTO, None, None)
+        assert [preco['AnoModelo'] for preco in resultado['precos']] == [2012]
+        assert fipe_falsa.chamadas['ConsultarAnoModeloPeloCodigoFipe'] == 2  # carro e moto
+
+        fipe_falsa.chamadas.clear()
+        assert FipeAPI(silently=True, cache=cache).consulta_por_codigo_fipe('007100-1') == resultado
+        assert sum(fipe_falsa.chamadas.values()) == 0
+
+    def test_clientes_concorrentes(self, fipe_falsa):
+        cache = BackendMemoria()
+        consulta = FipeAPI(silently=True).cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+        # cada cliente salva um ano/modelo; nenhum sobrescreve o preço salvo pelo outro
+        for ano in (2020, 2019):
+            FipeAPI(silently=True, cache=cache).consulta_preco_veiculo(ano=ano, combustivel=GASOLINA, consulta=consulta)
+        fipe_falsa.chamadas.clear()
+
+        resultado = FipeAPI(silently=True, cache=cache).consulta_por_codigo_fipe('006100-1')
+        assert [preco['AnoModelo'] for preco in resultado['precos']] == [2020, 2019]
+        assert fipe_falsa.chamadas['ConsultarValorComTodosParametros'] == 0
+
+    def test_mes_sem_precos_salvos(self, fipe_falsa):
+        api = FipeAPI(silently=True, cache=BackendMemoria())
+        api.consulta_preco_veiculo(ano=2010, combustivel=GASOLINA,
+                                   consulta=api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Celta'))
+        fipe_falsa.chamadas.clear()
+
+        resultado = api.consulta_por_codigo_fipe('000500-1', mes=MES_ANTERIOR, ano=ANO_ANTERIOR)
+        assert resultado['referencia'] == 299
+        assert [preco['AnoModelo'] for preco in resultado['precos']] == [2010]
+        # os códigos vêm do índice: marcas e modelos não são consultados
+        assert fipe_falsa.chamadas['ConsultarMarcas'] == fipe_falsa.chamadas['ConsultarModelos'] == 0
+
+    def test_preco_por_codigo_fipe(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO)
+        fipe_falsa.chamadas.clear()
+
+        preco = api.consulta_preco_por_codigo_fipe(' 006100-1', ano=2020, combustivel=GASOLINA, consulta=consulta)
+        assert preco['Valor'] == 'R$ 10.860,00'
+        assert api.consulta_preco_por_codigo_fipe('006100-1', ano=2020, combustivel=GASOLINA,
+                                                  consulta=consulta) == preco
+        assert dict(fipe_falsa.chamadas) == {'ConsultarValorComTodosParametros': 1}
+
+        with pytest.raises(ValueNotFoundException):
+            api.consulta_preco_por_codigo_fipe('006100-1', ano=2005, combustivel=GASOLINA, consulta=consulta)
+        with pytest.raises(IncorrectValueException):
+            api.consulta_preco_por_codigo_fipe('abc', ano=2020, combustivel=GASOLINA, consulta=consulta)
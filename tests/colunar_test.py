@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import json
+from array import array
+
+from fipeapi import FipeAPI, BackendMemoria, Codec, CARRO, GASOLINA, EspecificacaoVeiculo
+from fipeapi.colunar import ListaColunar
+
+ANOS = [{'ano': 2020, 'combustivel': 1, 'descricao': '2020 Gasolina', 'codigo': '2020-1'},
+        {'ano': 2019, 'combustivel': 1, 'descricao': '2019 Gasolina', 'codigo': '2019-1'}]
+
+
+class TestColunar:
+
+    def test_lista(self):
+        lista = ListaColunar.da_lista(ANOS)
+        assert isinstance(lista.coluna('ano'), array)
+        assert lista == ANOS and ANOS == lista
+        assert lista[-1]['ano'] == 2019 and dict(lista[0]) == ANOS[0]
+        assert lista[1:].como_lista() == ANOS[1:]
+        assert lista.coluna('descricao')[0] is ListaColunar.da_lista(ANOS).coluna('descricao')[0]
+
+        for codec in (Codec(), Codec(compressao='zlib', min_compressao=0)):
+            lida = codec.decodifica(codec.codifica(lista))
+            assert type(lida) is list and lida == ANOS
+
+    def test_api_colunar(self, fipe_falsa):
+        cache = BackendMemoria()
+        api = FipeAPI(silently=True, cache=cache, colunar=True)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+        anos = api.pega_anos_modelo(consulta)
+        assert isinstance(anos, ListaColunar)
+        assert anos == FipeAPI(silently=True).pega_anos_modelo(consulta)
+        assert isinstance(api.pega_modelos(consulta), ListaColunar)
+
+        gravado = json.loads(cache.get(f'fipeAPI:v2:anos-modelo:1:{consulta.referencia}:23:6100'))
+        assert gravado['_colunar'] == ['ano', 'combustivel', 'descricao', 'codigo']
+
+        # lido do cache por outro cliente, continua em colunas
+        outro = FipeAPI(silently=True, cache=cache, colunar=True)
+        assert isinstance(outro.pega_anos_modelo(consulta), ListaColunar)
+        assert outro.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta)['AnoModelo'] == 2020
+        resultado = next(outro.consulta_precos_em_lote([EspecificacaoVeiculo(marca='GM', modelo='Celta', ano=2010)]))
+        assert resultado.erro is None
+
+    def test_cliente_sem_colunar(self, fipe_falsa):
+        cache = BackendMemoria()
+        consulta = FipeAPI(silently=True).cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+        FipeAPI(silently=True, cache=cache, colunar=True).pega_anos_modelo(consulta)
+
+        # quem não optou pelo modo colunar lê do mesmo cache listas de dicionários
+        anos = FipeAPI(silently=True, cache=cache, colunar=False).pega_anos_modelo(consulta)
+        assert type(anos) is list and type(anos[0]) is dict
+        assert json.loads(json.dumps(anos)) == anos
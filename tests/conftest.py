@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import pytest
+import threading
+from collections import Counter
+from datetime import datetime
+from fipeapi.utils import meses_do_ano
+
+
+def _tabela_referencia(meses=36, codigo_inicial=300):
+    hoje = datetime.today()
+    mes, ano = hoje.month, hoje.year
+    tabela = []
+    for i in range(meses):
+        tabela.append({'Codigo': codigo_inicial - i, 'Mes': f'{meses_do_ano[mes]}/{ano} '})
+        mes -= 1
+        if mes == 0:
+            mes, ano = 12, ano - 1
+    return tabela
+
+
+MARCAS = {1: [('GM - Chevrolet', 23), ('Honda', 25), ('VW - VolksWagen', 59)],
+          2: [('HONDA', 80), ('YAMAHA', 101)],
+          3: [('SCANIA', 102), ('VOLVO', 114)]}
+
+MODELOS = {23: [('Onix HATCH LT 1.0 12V Flex 5p Mec.', 6100), ('Celta 1.0', 500)],
+           25: [('Civic Sedan LXS 1.8', 4000)],
+           59: [('Gol 1.0', 600)],
+           80: [('CG 160 FAN', 7000)],
+           101: [('YBR 125', 7100)],
+           102: [('R-440 6x2', 8000)],
+           114: [('FH-540 6x4', 8100)]}
+
+ANOS = {6100: ['2020-1', '2019-1'], 500: ['2010-1'], 4000: ['2018-1'], 600: ['2015-1'], 7000: ['2021-1'],
+        7100: ['2012-1'], 8000: ['2019-3'], 8100: ['2020-3']}
+
+
+def valor_falso(referencia, modelo, ano):
+    return 1000000 + modelo * 10 + (ano - 2000) * 1000 + (referencia - 250) * 100
+
+
+class RespostaFalsa:
+
+    def __init__(self, conteudo, status_code=200):
+        self._conteudo = conteudo
+        self.status_code = status_code
+        self.headers = {}
+        self.cookies = {}
+
+    def __bool__(self):
+        return self.status_code < 400
+
+    def json(self):
+        return self._conteudo
+
+    def close(self):
+        pass
+
+
+class SessaoFalsa:
+    """ Simula os endpoints da API da FIPE utilizados pela biblioteca e conta as requisições por endpoint """
+
+    chamadas = Counter()
+    trava = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get(self, url, **kwargs):
+        return RespostaFalsa({})
+
+    def close(self):
+        pass
+
+    def post(self, url, data=None, **kwargs):
+        endpoint = url.rstrip('/').split('/')[-1]
+        data = data or {}
+        with self.trava:
+            self.chamadas[endpoint] += 1
+        if endpoint == 'ConsultarTabelaDeReferencia':
+            return RespostaFalsa(_tabela_referencia())
+        if endpoint == 'ConsultarMarcas':
+            return RespostaFalsa([{'Label': label, 'Value': str(valor)}
+                                  for label, valor in MARCAS[int(data['codigoTipoVeiculo'])]])
+        if endpoint == 'ConsultarModelos':
+            return RespostaFalsa({'Modelos': [{'Label': label, 'Value': valor}
+                                              for label, valor in MODELOS[int(data['codigoMarca'])]],
+                                  'Anos': []})
+        if endpoint == 'ConsultarAnoModelo':
+            return RespostaFalsa([{'Label': f'{v.split("-")[0]} Gasolina', 'Value': v}
+                                  for v in ANOS[int(data['codigoModelo'])]])
+        if endpoint == 'ConsultarAnoModeloPeloCodigoFipe':
+            modelo = int(data['modeloCodigoExterno'].split('-')[0])
+            modelos = {codigo for _, marca in MARCAS[int(data['codigoTipoVeiculo'])] for _, codigo in MODELOS[marca]}
+            if modelo not in modelos:
+                return RespostaFalsa({'codigo': '0', 'erro': 'nadaencontrado'})
+            return RespostaFalsa([{'Label': f'{v.split("-")[0]} Gasolina', 'Value': v} for v in ANOS[modelo]])
+        if endpoint == 'ConsultarValorComTodosParametros':
+            if data.get('tipoConsulta') == 'codigo':
+                # consulta pelo Código FIPE ("<modelo com 6 dígitos>-1" na simulação)
+                modelo = int(data['modeloCodigoExterno'].split('-')[0])
+                if f'{data["anoModelo"]}-{data["codigoTipoCombustivel"]}' not in ANOS.get(modelo, []):
+                    return RespostaFalsa({'codigo': '0', 'erro': 'nadaencontrado'})
+            else:
+                modelo = int(data['codigoModelo'])
+            ano = int(data['anoModelo'])
+            referencia = int(data['codigoTabelaReferencia'])
+            centavos = valor_falso(referencia, modelo, ano)
+            reais = f'{centavos // 100:,}'.replace(',', '.')
+            return RespostaFalsa({'Valor': f'R$ {reais},{centavos % 100:02d}',
+                                  'Marca': 'Marca', 'Modelo': f'Modelo {modelo}', 'AnoModelo': ano,
+                                  'Combustivel': 'Gasolina', 'CodigoFipe': f'{modelo:06d}-1',
+                                  'MesReferencia': 'outubro de 2026 ', 'Autenticacao': 'abc',
+                                  'TipoVeiculo': int(data['codigoTipoVeiculo']), 'SiglaCombustivel': 'G',
+                                  'DataConsulta': 'sexta-feira, 16 de outubro de 2026 10:00'})
+        return RespostaFalsa(None, status_code=404)
+
+
+@pytest.fixture
+def fipe_falsa(monkeypatch):
+    """ Substitui a sessão HTTP por uma simulação local dos endpoints da FIPE """
+    monkeypatch.setattr('fipeapi.api.requests.Session', SessaoFalsa)
+    monkeypatch.delenv('USE_REDIS', raising=False)
+    SessaoFalsa.chamadas.clear()
+    return SessaoFalsa
+
+
+class RespostaAssincronaFalsa:
+
+    def __init__(self, resposta):
+        self.status = resposta.status_code
+        self._conteudo = resposta.json()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def json(self, content_type=None):
+        return self._conteudo
+
+
+class SessaoAssincronaFalsa(SessaoFalsa):
+    """ Versão da simulação com a interface do aiohttp.ClientSession """
+
+    def get(self, url, **kwargs):
+        return RespostaAssincronaFalsa(super().get(url, **kwargs))
+
+    def post(self, url, data=None, **kwargs):
+        return RespostaAssincronaFalsa(super().post(url, data=data, **kwargs))
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fipe_falsa_assincrona(monkeypatch):
+    """ Sessão aiohttp simulada com os endpoints da FIPE """
+    monkeypatch.delenv('USE_REDIS', raising=False)
+    SessaoFalsa.chamadas.clear()
+    return SessaoAssincronaFalsa()
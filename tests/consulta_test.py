@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fipeapi import CARRO, MOTO, FipeAPI, Consulta, IncorrectValueException, GASOLINA
+
+
+class TestConsulta:
+
+    def test_cria_consulta_nao_altera_selecao(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+        assert consulta == Consulta(tipo_veiculo=CARRO, referencia=300, marca=23, modelo=6100)
+        assert api._codigo_marca_corrente is None
+        assert api._codigo_modelo_corrente is None
+
+    def test_consulta_imutavel(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO)
+        with pytest.raises(AttributeError):
+            consulta.marca = 10
+        assert consulta.com_marca(23).marca == 23
+        assert consulta.marca is None
+
+    def test_modelo_sem_marca(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        with pytest.raises(IncorrectValueException):
+            api.cria_consulta(tipo_veiculo=CARRO, modelo='Onix')
+
+    def test_consultas_concorrentes(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        parametros = [(CARRO, 'GM', 'Onix', 2020), (CARRO, 'Honda', 'Civic', 2018), (MOTO, 'YAMAHA', 'YBR', 2012)]
+
+        def consulta_preco(params):
+            tipo, marca, modelo, ano = params
+            consulta = api.cria_consulta(tipo_veiculo=tipo, marca=marca, modelo=modelo)
+            return api.consulta_preco_veiculo(ano=ano, combustivel=GASOLINA, consulta=consulta)
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            precos = list(executor.map(consulta_preco, parametros * 10))
+
+        assert [p['AnoModelo'] for p in precos[:3]] == [2020, 2018, 2012]
+        assert fipe_falsa.chamadas['ConsultarTabelaDeReferencia'] == 1
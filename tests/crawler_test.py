@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import os
+import pytest
+from datetime import datetime
+from fipeapi import FipeAPI, Crawler, IncorrectSettingsException
+from fipeapi.crawler import le_coleta, meses_entre
+
+
+class TestCrawler:
+
+    def test_meses_entre(self):
+        assert list(meses_entre(11, 2020, 2, 2021)) == [(11, 2020), (12, 2020), (1, 2021), (2, 2021)]
+
+    def test_coleta_retomada(self, fipe_falsa, monkeypatch, tmp_path):
+        saida = str(tmp_path / 'fipe.jsonl')
+        hoje = datetime.today()
+        mes, ano = (hoje.month - 1, hoje.year) if hoje.month > 1 else (12, hoje.year - 1)
+        post = fipe_falsa.post
+
+        def post_com_falha(self, url, data=None, **kwargs):
+            if url.endswith('ConsultarValorComTodosParametros') and int(data['codigoMarca']) == 25:
+                return post(self, 'falha', data=data, **kwargs)
+            return post(self, url, data=data, **kwargs)
+
+        monkeypatch.setattr(fipe_falsa, 'post', post_com_falha)
+        resumo = Crawler(FipeAPI(silently=True), saida=saida, max_workers=3).executa(mes, ano, hoje.month, hoje.year)
+        # a falha fica restrita aos anos/modelo com erro, sem descartar o restante da marca
+        assert not resumo.falhas and resumo.marcas_concluidas == 14
+        assert [f[1:5] for f in resumo.falhas_veiculos] == [(1, 25, 4000, 2018)] * 2
+        assert resumo.precos == 16
+
+        # registros gravados depois do último checkpoint são descartados na retomada
+        with open(saida, 'a') as arquivo:
+            arquivo.write('{"incompleto": ')
+
+        monkeypatch.setattr(fipe_falsa, 'post', post)
+        fipe_falsa.chamadas.clear()
+        resumo = Crawler(FipeAPI(silently=True), saida=saida).executa(mes, ano, hoje.month, hoje.year)
+        assert resumo.sucesso
+        assert (resumo.marcas_concluidas, resumo.marcas_retomadas, resumo.precos) == (2, 12, 2)
+        assert fipe_falsa.chamadas['ConsultarValorComTodosParametros'] == 2
+
+        registros = list(le_coleta(saida))
+        assert len(registros) == 18
+        assert len({(r['referencia'], r['codigo_modelo'], r['ano']) for r in registros}) == 18
+        assert {r['referencia'] for r in registros} == {299, 300}
+
+    def test_nao_sobrescreve_saida_sem_checkpoint(self, fipe_falsa, tmp_path):
+        saida = str(tmp_path / 'fipe.jsonl')
+        with open(saida, 'w') as arquivo:
+            arquivo.write('{"coleta": "anterior"}\n')
+
+        with pytest.raises(IncorrectSettingsException):
+            Crawler(FipeAPI(silently=True), saida=saida, tipos_veiculo=()).executa()
+        assert os.path.getsize(saida) > 0
+
+        Crawler(FipeAPI(silently=True), saida=saida, tipos_veiculo=(), sobrescreve=True).executa()
+        assert os.path.getsize(saida) == 0
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import numpy as np
+
+from fipeapi import CARRO, GASOLINA, FipeAPI
+
+
+class TestHistorico:
+
+    def test_historico_precos(self, fipe_falsa):
+        hoje = datetime.today()
+        mes, ano = (hoje.month - 2, hoje.year) if hoje.month > 2 else (hoje.month + 10, hoje.year - 1)
+        api = FipeAPI(silently=True)
+        historico = api.historico_precos(marca='GM - Chevrolet', modelo=6100, ano=2020, combustivel=GASOLINA,
+                                         tipo_veiculo=CARRO, mes_inicial=mes, ano_inicial=ano,
+                                         mes_final=hoje.month, ano_final=hoje.year)
+
+        assert len(historico) == 3
+        assert historico.datas[-1] == np.datetime64(f'{hoje.year:04d}-{hoje.month:02d}', 'M')
+        assert historico.referencias.tolist() == [298, 299, 300]
+        assert historico.precos.tolist() == [10858.0, 10859.0, 10860.0]
+        assert fipe_falsa.chamadas['ConsultarValorComTodosParametros'] == 3
+
+        # ano/modelo inexistente fica com NaN
+        historico = api.historico_precos(marca=23, modelo=500, ano=2011, mes_inicial=mes, ano_inicial=ano)
+        assert np.isnan(historico.precos).all()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import pytest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fipeapi import CARRO, AsyncFipeAPI, FipeAPI, LimitadorTaxa, LimitadorTaxaRedis, IncorrectSettingsException
+
+
+class TestLimitador:
+
+    def test_rajada_e_espera(self):
+        limitador = LimitadorTaxa(taxa=10, capacidade=2)
+        assert limitador.tenta_adquirir() == 0
+        assert limitador.tenta_adquirir() == 0
+        assert limitador.tenta_adquirir() == pytest.approx(0.1, abs=0.02)
+
+    def test_taxa_entre_threads(self):
+        limitador = LimitadorTaxa(taxa=50, capacidade=1)
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: limitador.adquire(), range(11)))
+        assert time.monotonic() - inicio >= 0.18
+
+    def test_timeout(self):
+        limitador = LimitadorTaxa(taxa=1, capacidade=1)
+        assert limitador.adquire()
+        assert not limitador.adquire(timeout=0.05)
+
+    def test_taxa_invalida(self):
+        with pytest.raises(IncorrectSettingsException):
+            LimitadorTaxa(taxa=0)
+
+    def test_limitador_redis(self):
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        cliente = fakeredis.FakeRedis()
+        # dois processos com a mesma chave dividem o mesmo balde
+        a, b = (LimitadorTaxaRedis(cliente, taxa=10, capacidade=2) for _ in range(2))
+        assert a.tenta_adquirir() == 0 and b.tenta_adquirir() == 0
+        assert a.tenta_adquirir() == pytest.approx(0.1, abs=0.02)
+        assert cliente.exists('fipeAPI:v2:limitador')
+        time.sleep(0.12)
+        assert b.tenta_adquirir() == 0
+        assert a.tenta_adquirir() > 0
+
+    def test_limitador_remoto_fora_do_event_loop(self, fipe_falsa_assincrona):
+        threads = []
+
+        class LimitadorRemoto(LimitadorTaxa):
+            remoto = True
+
+            def tenta_adquirir(self, tokens=1):
+                threads.append(threading.current_thread())
+                return super().tenta_adquirir(tokens)
+
+        async def consulta():
+            async with AsyncFipeAPI(sessao=fipe_falsa_assincrona, limitador=LimitadorRemoto(taxa=100)) as api:
+                await api.pega_marcas(await api.cria_consulta(tipo_veiculo=CARRO))
+
+        asyncio.run(consulta())
+        assert threads and threading.main_thread() not in threads
+
+    def test_limita_requisicoes_do_cliente(self, fipe_falsa):
+        assert FipeAPI(silently=True, requisicoes_por_segundo=20)._limitador.taxa == 20
+        api = FipeAPI(silently=True, limitador=LimitadorTaxa(taxa=20, capacidade=1))
+        inicio = time.monotonic()
+        api.pega_marcas(api.cria_consulta(tipo_veiculo=CARRO))
+        api.pega_modelos(api.cria_consulta(tipo_veiculo=CARRO, marca='GM'))
+        assert time.monotonic() - inicio >= 0.1
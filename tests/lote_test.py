@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+from fipeapi import MOTO, DIESEL, FipeAPI, BackendMemoria, EspecificacaoVeiculo, IncorrectValueException
+
+
+class TestLote:
+
+    def test_consulta_em_lote(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        especificacoes = [
+            EspecificacaoVeiculo(marca='GM', modelo='Onix', ano=2020),
+            EspecificacaoVeiculo(marca='GM', modelo='Onix', ano=2019),
+            EspecificacaoVeiculo(marca='GM', modelo='Celta', ano=2010),
+            EspecificacaoVeiculo(marca='AAAAA', modelo='Onix', ano=2020),
+            {'marca': 'YAMAHA', 'modelo': 'YBR', 'ano': 2012, 'tipo_veiculo': MOTO},
+            EspecificacaoVeiculo(marca='GM', modelo='Onix', ano=2020, combustivel=DIESEL),
+        ] * 5
+
+        resultados = list(api.consulta_precos_em_lote(especificacoes, max_workers=4))
+
+        assert [r.indice for r in resultados] == list(range(len(especificacoes)))
+        assert [r.preco['AnoModelo'] for r in resultados[:3]] == [2020, 2019, 2010]
+        assert isinstance(resultados[3].erro, IncorrectValueException)
+        assert not resultados[5].sucesso
+        assert resultados[4].preco['TipoVeiculo'] == MOTO
+        assert fipe_falsa.chamadas['ConsultarMarcas'] == 2
+        assert fipe_falsa.chamadas['ConsultarModelos'] == 2
+        assert fipe_falsa.chamadas['ConsultarAnoModelo'] == 3
+        assert fipe_falsa.chamadas['ConsultarValorComTodosParametros'] == 4
+
+    def test_lote_le_cache_em_lote(self, fipe_falsa):
+        class BackendContador(BackendMemoria):
+            def __init__(self):
+                super().__init__()
+                self.leituras = Counter()
+
+            def get(self, chave):
+                self.leituras['get'] += 1
+                return super().get(chave)
+
+            def mget(self, chaves):
+                self.leituras['mget'] += 1
+                return [BackendMemoria.get(self, chave) for chave in chaves]
+
+        backend = BackendContador()
+        especificacoes = [EspecificacaoVeiculo(marca='GM', modelo=modelo, ano=ano)
+                          for modelo, ano in [('Onix', 2020), ('Onix', 2019), ('Celta', 2010)]]
+        list(FipeAPI(silently=True, cache=backend).consulta_precos_em_lote(especificacoes))
+
+        fipe_falsa.chamadas.clear()
+        backend.leituras.clear()
+        resultados = list(FipeAPI(silently=True, cache=backend).consulta_precos_em_lote(especificacoes * 20))
+        assert all(r.sucesso for r in resultados)
+        assert sum(fipe_falsa.chamadas.values()) == 0
+        assert backend.leituras['mget'] == 4
+        assert backend.leituras['get'] == 1  # tabela de referência
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+from fipeapi import CARRO, FipeAPI, CacheLRU, CacheMemoria
+from fipeapi.memoria import tamanho_aproximado
+
+
+class TestMemoria:
+
+    def test_remove_menos_usado(self):
+        cache = CacheLRU(max_itens=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        assert cache['a'] == 1
+        cache['c'] = 3
+        assert 'b' not in cache
+        assert cache.get('a') == 1 and cache.get('c') == 3
+        estatisticas = cache.estatisticas()
+        assert estatisticas.remocoes == 1
+        assert estatisticas.itens == 2
+
+    def test_limite_bytes_e_ttl(self):
+        cache = CacheLRU(max_bytes=10, ttl=0.05)
+        cache['a'] = 'x' * 5
+        cache['b'] = 'y' * 5
+        assert 'a' not in cache
+        cache['grande'] = 'z' * 100
+        assert 'grande' not in cache
+        time.sleep(0.06)
+        assert cache.get('b') is None
+        assert cache.estatisticas().bytes == 0
+
+    def test_tamanho_estimado_sem_serializar(self):
+        anos = [{'ano': 2000 + i, 'combustivel': 1, 'descricao': f'{2000 + i} Gasolina', 'codigo': f'{2000 + i}-1'}
+                for i in range(1000)]
+        # a estimativa fica próxima do tamanho do JSON
+        assert 0.8 < tamanho_aproximado(anos) / len(json.dumps(anos, separators=(',', ':'))) < 1.2
+
+    def test_compartilhado_pelas_consultas(self, fipe_falsa):
+        api = FipeAPI(silently=True, memoria=CacheMemoria({'modelos': {'max_itens': 1}}))
+        consulta = api.cria_consulta(tipo_veiculo=CARRO)
+        api.pega_modelos(consulta.com_marca(23))
+        api.pega_modelos(consulta.com_marca(25))
+        api.pega_modelos(consulta.com_marca(25))
+        estatisticas = api.memoria.estatisticas()
+        assert estatisticas['modelos'].acertos == 1
+        assert estatisticas['modelos'].remocoes == 1
+        assert estatisticas['modelos'].itens == 1
+        assert fipe_falsa.chamadas['ConsultarModelos'] == 2
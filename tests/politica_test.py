@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from fipeapi.politica import PoliticaCache, segundos_ate_fim_do_mes, TABELA_REFERENCIA
+
+
+class TestPoliticaCache:
+
+    def test_fim_do_mes(self):
+        assert segundos_ate_fim_do_mes(datetime(2020, 12, 31, 23, 0, 0)) == 3600
+        assert segundos_ate_fim_do_mes(datetime(2021, 2, 28, 0, 0, 0)) == 24 * 3600
+
+    def test_referencia_fechada_permanente(self):
+        politica = PoliticaCache()
+        assert politica.ttl('preco', referencia=250, referencia_atual=300) is None
+        assert PoliticaCache(ttl_referencia_fechada=60).ttl('marcas', referencia=1, referencia_atual=2) == 60
+
+    def test_referencia_atual_expira_no_fim_do_mes(self):
+        agora = datetime(2021, 3, 31, 22, 0, 0)
+        politica = PoliticaCache(ttls={'modelos': None, 'preco': 600})
+        assert politica.ttl('modelos', referencia=300, referencia_atual=300, agora=agora) == 2 * 3600
+        assert politica.ttl('preco', referencia=300, referencia_atual=300, agora=agora) == 600
+        assert politica.ttl('marcas', referencia=300, referencia_atual=300, agora=agora) == 2 * 3600
+
+    def test_tabela_referencia(self):
+        assert PoliticaCache(ttl_tabela_referencia=120).ttl(TABELA_REFERENCIA) == 120
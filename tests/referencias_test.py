@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import datetime
+
+import pytest
+
+from fipeapi import FipeAPI, BackendMemoria, IncorrectValueException, ValueNotFoundException
+from fipeapi.referencias import IndiceReferencias
+
+HOJE = datetime.today()
+MES_ANTERIOR, ANO_ANTERIOR = (HOJE.month - 1, HOJE.year) if HOJE.month > 1 else (12, HOJE.year - 1)
+
+
+def _cache_com_tabela_desatualizada():
+    """ Cache com a tabela de referência sem o mês atual """
+    cache = BackendMemoria()
+    FipeAPI(silently=True, cache=cache).cria_consulta()
+    chave = 'fipeAPI:v2:tabela-referencia'
+    cache.set(chave, json.dumps(json.loads(cache.get(chave))[1:]))
+    return cache
+
+
+class TestReferencias:
+
+    def test_indice(self):
+        indice = IndiceReferencias([{'Codigo': 300, 'Mes': 'fevereiro/2021 '}, {'Codigo': 299, 'Mes': 'janeiro/2021 '},
+                                    {'Codigo': 298, 'Mes': 'dezembro/2020 '}])
+        assert indice.codigo(1, 2021) == 299
+        assert indice.mes_ano(298) == (12, 2020)
+        assert [r.codigo for r in indice.entre(11, 2020, 1, 2021)] == [298, 299]
+        assert indice.infere(6, 2021) == 304
+        with pytest.raises(IncorrectValueException):
+            indice.codigo(1, 2019)
+        with pytest.raises(ValueNotFoundException):
+            indice.codigo(3, 2021)
+
+    def test_tabela_desatualizada_em_cache(self, fipe_falsa):
+        cache = _cache_com_tabela_desatualizada()
+        fipe_falsa.chamadas.clear()
+
+        api = FipeAPI(silently=True, cache=cache)
+        assert api.cria_consulta(mes=MES_ANTERIOR, ano=ANO_ANTERIOR).referencia == 299
+        assert fipe_falsa.chamadas['ConsultarTabelaDeReferencia'] == 0
+        assert api.cria_consulta().referencia == 300
+        assert fipe_falsa.chamadas['ConsultarTabelaDeReferencia'] == 1
+
+    def test_infere_referencia(self, fipe_falsa):
+        cache = _cache_com_tabela_desatualizada()
+        fipe_falsa.chamadas.clear()
+
+        api = FipeAPI(silently=True, cache=cache, infere_referencia=True)
+        assert api.cria_consulta().referencia == 300
+        if HOJE.month < 12:
+            # meses futuros não são inferidos
+            with pytest.raises(ValueNotFoundException):
+                api.cria_consulta(mes=HOJE.month + 1)
+        assert api.indice_referencias.mes_ano(300) == (HOJE.month, HOJE.year)
+        assert fipe_falsa.chamadas['ConsultarTabelaDeReferencia'] == 1
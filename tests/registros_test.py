@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import date
+
+from fipeapi import FipeAPI, CARRO, GASOLINA, Marca, AnoModelo, Preco
+
+
+class TestRegistros:
+
+    def test_compatibilidade_com_dict(self):
+        conteudo = {'Valor': 'R$ 1.095.123,45', 'Marca': 'GM - Chevrolet', 'Modelo': 'Onix', 'AnoModelo': 2020,
+                    'Combustivel': 'Gasolina', 'CodigoFipe': '006100-1', 'MesReferencia': 'outubro de 2026 ',
+                    'Autenticacao': 'abc', 'TipoVeiculo': 1, 'SiglaCombustivel': 'G',
+                    'DataConsulta': 'sexta-feira, 16 de outubro de 2026 10:00'}
+        preco = Preco.do_dict(conteudo)
+        assert preco.centavos == 109512345
+        assert preco.mes_referencia == date(2026, 10, 1)
+        assert preco['Valor'] == conteudo['Valor']
+        assert preco.get('Inexistente') is None and 'CodigoFipe' in preco
+        assert preco.como_dict() == conteudo
+        assert json.loads(json.dumps(preco.como_dict())) == conteudo
+
+        ano = AnoModelo.do_dict({'ano': 2020, 'combustivel': 1, 'descricao': '2020 Gasolina', 'codigo': '2020-1'})
+        assert ano['codigo'] == '2020-1' and ano[0] == 2020
+        assert not hasattr(ano, '__dict__')
+
+    def test_tipado_na_api(self, fipe_falsa):
+        api = FipeAPI(silently=True)
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+        marcas = api.pega_marcas(consulta, tipado=True)
+        assert marcas[0] == Marca(codigo=23, nome='GM - Chevrolet')
+        assert [m.como_dict() for m in marcas] == api.pega_marcas(consulta)
+
+        preco = api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta, tipado=True)
+        assert preco.centavos == 1086000
+        # o padrão continua sendo o dicionário retornado pela FIPE
+        assert api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta) == preco.como_dict()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import pytest
+import requests
+
+from fipeapi import (FipeAPI, AsyncFipeAPI, BackendRedis, CARRO, GASOLINA, PoliticaRequisicao,
+                     RequestTimeoutException, RequestThrottledException, ServerErrorException)
+
+
+class RespostaErro:
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = self.status = status_code
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class SessaoInstavel:
+    """ Responde com as falhas informadas antes de repassar as requisições à sessão simulada """
+
+    def __init__(self, sessao, falhas):
+        self._sessao = sessao
+        self.falhas = list(falhas)
+        self.timeouts = []
+
+    def post(self, url, **kwargs):
+        self.timeouts.append(kwargs.get('timeout'))
+        if self.falhas:
+            falha = self.falhas.pop(0)
+            if isinstance(falha, Exception):
+                raise falha
+            return falha
+        return self._sessao.post(url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self._sessao.get(url, **kwargs)
+
+
+def politica(**kwargs):
+    return PoliticaRequisicao(espera_inicial=0.01, **kwargs)
+
+
+class TestRequisicao:
+
+    def test_espera(self):
+        p = PoliticaRequisicao(espera_inicial=1, espera_maxima=3)
+        assert all(0 <= p.espera(1) <= 1 and 0 <= p.espera(5) <= 3 for _ in range(50))
+        assert p.espera(1, minimo=2) >= 2
+        assert PoliticaRequisicao(timeouts={'ConsultarMarcas': (1, 2)}).timeout('ConsultarMarcas') == (1, 2)
+
+    def test_validade_da_trava(self, fipe_falsa):
+        fakeredis = pytest.importorskip('fakeredis')
+        p = PoliticaRequisicao(timeout_conexao=1, timeout_leitura=2, timeouts={'ConsultarMarcas': (1, 9)},
+                               tentativas=3, espera_maxima=4)
+        api = FipeAPI(silently=True, cache=BackendRedis(cliente=fakeredis.FakeRedis()), politica_requisicao=p)
+        # 3 tentativas de até 10s (maior tempo limite) e 2 esperas de até 4s
+        assert api._trava_redis._validade_ms == 38000 and api._trava_redis._espera == 38
+
+    def test_tenta_novamente(self, fipe_falsa, monkeypatch):
+        esperas = []
+        monkeypatch.setattr('fipeapi.api.time.sleep', esperas.append)
+        api = FipeAPI(silently=True, politica_requisicao=politica(timeouts={'ConsultarMarcas': (1, 2)}))
+        consulta = api.cria_consulta(tipo_veiculo=CARRO)
+        api._session = SessaoInstavel(api._session, [RespostaErro(503), RespostaErro(429, {'Retry-After': '0.5'})])
+        assert api.pega_marcas(consulta)
+        assert api._session.timeouts == [(1, 2)] * 3
+        assert len(esperas) == 2 and esperas[1] >= 0.5
+
+    def test_falhas_esgotadas(self, fipe_falsa, monkeypatch):
+        monkeypatch.setattr('fipeapi.api.time.sleep', lambda espera: None)
+        api = FipeAPI(silently=True, politica_requisicao=politica(tentativas=2))
+        consulta = api.cria_consulta(tipo_veiculo=CARRO, marca='GM', modelo='Onix')
+        sessao = api._session = SessaoInstavel(api._session, [requests.exceptions.ReadTimeout()] * 2)
+        with pytest.raises(RequestTimeoutException):
+            api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta)
+        assert not sessao.falhas
+
+        sessao.falhas = [RespostaErro(502)] * 2
+        with pytest.raises(ServerErrorException):
+            api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta)
+        assert api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta)['AnoModelo'] == 2020
+
+    def test_assincrono(self, fipe_falsa_assincrona):
+        sessao = SessaoInstavel(fipe_falsa_assincrona, [RespostaErro(500), asyncio.TimeoutError()])
+
+        async def consulta(tentativas):
+            async with AsyncFipeAPI(sessao=sessao, politica_requisicao=politica(tentativas=tentativas)) as api:
+                c = await api.cria_consulta(tipo_veiculo=CARRO)
+                return await api.pega_marcas(c)
+
+        assert asyncio.run(consulta(3))
+        sessao.falhas = [RespostaErro(429)]
+        with pytest.raises(RequestThrottledException):
+            asyncio.run(consulta(1))
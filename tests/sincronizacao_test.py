@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from fipeapi import CARRO, FipeAPI, BackendMemoria, PoliticaCache, sincroniza, chaves, protocolo
+from fipeapi.crawler import Crawler
+
+
+class TestSincronizacao:
+
+    def test_delta_do_mes(self, fipe_falsa, monkeypatch, tmp_path):
+        hoje = datetime.today()
+        mes, ano = (hoje.month - 1, hoje.year) if hoje.month > 1 else (12, hoje.year - 1)
+        cache = BackendMemoria()
+        # coletado com validade, como se o mês ainda fosse o corrente
+        api = FipeAPI(silently=True, cache=cache, politica_cache=PoliticaCache(ttl_referencia_fechada=3600))
+        Crawler(api, saida=str(tmp_path / 'anterior.jsonl'), tipos_veiculo=(CARRO,)).executa(mes, ano)
+
+        post = fipe_falsa.post
+
+        def post_com_modelo_novo(self, url, data=None, **kwargs):
+            if url.endswith('ConsultarAnoModelo') and int(data['codigoModelo']) == 4100:
+                return type(post(self, 'falha'))([{'Label': '2022 Gasolina', 'Value': '2022-1'}])
+            resposta = post(self, url, data=data, **kwargs)
+            if url.endswith('ConsultarModelos') and int(data['codigoMarca']) == 25:
+                resposta.json()['Modelos'].append({'Label': 'Fit 1.5', 'Value': 4100})
+            return resposta
+
+        monkeypatch.setattr(fipe_falsa, 'post', post_com_modelo_novo)
+        fipe_falsa.chamadas.clear()
+        delta = sincroniza(FipeAPI(silently=True, cache=cache), CARRO)
+
+        assert (delta.referencia, delta.referencia_anterior) == (300, 299)
+        assert not delta.marcas_novas and not delta.marcas_removidas and not delta.falhas
+        assert delta.modelos_novos == ((25, {'codigo': 4100, 'modelo': 'Fit 1.5'}),)
+        assert [(marca, modelo, item['ano']) for marca, modelo, item in delta.anos_novos] == [(25, 4100, 2022)]
+        assert len(delta.precos) == 6
+        assert delta.precos[0] == (23, 6100, 2020, 1, 'R$ 10.859,00', 'R$ 10.860,00')
+        assert (25, 4100, 2022, 1, None) in [preco[:5] for preco in delta.precos]
+        # o mês anterior vem todo do cache e são consultadas apenas as listas e os preços do novo mês
+        assert fipe_falsa.chamadas['ConsultarMarcas'] == 1
+        assert fipe_falsa.chamadas['ConsultarModelos'] == 3
+        assert fipe_falsa.chamadas['ConsultarAnoModelo'] == 4  # o modelo novo é respondido pela simulação
+        assert fipe_falsa.chamadas['ConsultarValorComTodosParametros'] == 6
+        # as entradas do mês anterior lidas do cache passam a não expirar, como as de um mês fechado
+        anterior = FipeAPI(silently=True).cria_consulta(tipo_veiculo=CARRO, mes=mes, ano=ano)
+        assert cache._dados[chaves.completa('fipeAPI', protocolo.chave_marcas(anterior))][1] is None
+
+        fipe_falsa.chamadas.clear()
+        estrutura = sincroniza(FipeAPI(silently=True, cache=cache), CARRO, precos=False)
+        assert not estrutura.precos and estrutura.modelos_novos == delta.modelos_novos
+        assert fipe_falsa.chamadas['ConsultarValorComTodosParametros'] == 0
+
+    def test_mes_anterior_fora_do_cache(self, fipe_falsa):
+        delta = sincroniza(FipeAPI(silently=True, cache=BackendMemoria()), CARRO)
+        # o mês anterior é consultado na FIPE, em vez de ser tratado como vazio
+        assert not delta.marcas_novas and not delta.modelos_novos and not delta.anos_novos
+        assert all(preco[4] is not None for preco in delta.precos)
+        assert fipe_falsa.chamadas['ConsultarMarcas'] == 2
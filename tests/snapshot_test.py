@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from fipeapi import CARRO, MOTO, GASOLINA, FipeAPI, Crawler, Snapshot
+from fipeapi.crawler import le_coleta
+from fipeapi.utils import formata_centavos, valor_em_centavos
+
+
+class TestSnapshot:
+
+    def test_centavos(self):
+        assert valor_em_centavos('R$ 1.095.123,45') == 109512345
+        assert formata_centavos(109512345) == 'R$ 1.095.123,45'
+        assert formata_centavos(5) == 'R$ 0,05'
+
+    def test_modo_offline(self, fipe_falsa, tmp_path):
+        api = FipeAPI(silently=True)
+        saida = str(tmp_path / 'fipe.jsonl')
+        Crawler(api, saida=saida, tipos_veiculo=(CARRO, MOTO)).executa()
+        snapshot = Snapshot.cria(le_coleta(saida), str(tmp_path / 'snapshot'))
+        assert len(snapshot) == 7
+
+        fipe_falsa.chamadas.clear()
+        offline = FipeAPI(silently=True, snapshot=snapshot.diretorio)
+        # o MesReferencia da FIPE falsa é sempre outubro de 2026
+        consulta = offline.cria_consulta(tipo_veiculo=CARRO, mes=10, ano=2026)
+        online = api.cria_consulta(tipo_veiculo=CARRO)
+        assert offline.pega_marcas(consulta) == api.pega_marcas(online)
+        assert offline.pega_modelos(consulta.com_marca(23)) == api.pega_modelos(online.com_marca(23))
+
+        consulta, online = consulta.com_marca(23).com_modelo(6100), online.com_marca(23).com_modelo(6100)
+        assert offline.pega_anos_modelo(consulta) == api.pega_anos_modelo(online)
+        preco = offline.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=consulta)
+        esperado = api.consulta_preco_veiculo(ano=2020, combustivel=GASOLINA, consulta=online)
+        assert preco == dict(esperado, Autenticacao='')
+        assert offline.consulta_preco_por_codigo_fipe('006100-1', ano=2020, combustivel=GASOLINA,
+                                                      consulta=consulta) == preco
+        assert offline.pega_marcas(offline.cria_consulta(tipo_veiculo=MOTO, mes=10, ano=2026)) == \
+            api.pega_marcas(api.cria_consulta(tipo_veiculo=MOTO))
+        assert sum(fipe_falsa.chamadas.values()) == 0